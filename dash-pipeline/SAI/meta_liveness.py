@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+
+try:
+    import os
+    import argparse
+    from utils.p4ir import P4IRAnalysis, P4MetaLiveness
+except ImportError as ie:
+    print("Import failed for " + ie.name)
+    exit(1)
+
+
+if __name__ == "__main__":
+    # CLI
+    parser = argparse.ArgumentParser(description="P4 metadata field liveness report")
+    parser.add_argument("ir", type=str, help="Path to P4 program IR JSON file")
+    parser.add_argument("--ir-cache-dir", type=str, help="Directory of the P4 IR analysis cache")
+    parser.add_argument("--controls", type=str, default="dash_ingress", help="Comma separated list of the root controls to analyze")
+    parser.add_argument("--meta-type", type=str, default="metadata_t", help="Name of the metadata struct")
+    parser.add_argument("--field", type=str, action="append", default=[], help="Print the def-use chains of a field, e.g. meta.eni_id")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.ir):
+        print("File " + args.ir + " does not exist")
+        exit(1)
+
+    analysis = P4IRAnalysis.load(args.ir, args.ir_cache_dir)
+    liveness = P4MetaLiveness(analysis, args.controls.split(","), args.meta_type)
+    print(liveness.summary())
+
+    for path in args.field:
+        print(liveness.fields[path])
+        for position, uses in liveness.def_use(path):
+            write = liveness.trace[position][2] if position >= 0 else "(initial value)"
+            print(f"    {write} -> " + ", ".join(liveness.trace[use][2] for use in uses))
@@ -14,7 +14,7 @@ try:
     import jsonpath_ng.ext as jsonpath_ext
     import jsonpath_ng as jsonpath
     from utils.dash_p4 import DashP4SAIExtensions
-    from utils.p4ir import P4IRTree, P4VarRefGraph
+    from utils.p4ir import P4IRAnalysis, P4IRTree, P4VarRefGraph
     from utils.sai_spec import SaiSpec
     from utils.sai_gen import SAIGenerator, SaiHeaderGenerator, SaiImplGenerator
 except ImportError as ie:
@@ -28,6 +28,7 @@ if __name__ == "__main__":
     parser.add_argument("filepath", type=str, help="Path to P4 program RUNTIME JSON file")
     parser.add_argument("apiname", type=str, help="Name of the new SAI API")
     parser.add_argument("--ir", type=str, help="Path to P4 program IR JSON file")
+    parser.add_argument("--ir-cache-dir", type=str, help="Directory of the P4 IR analysis cache, the IR is analyzed on every run if not set")
     parser.add_argument("--print-sai-lib", type=bool)
     parser.add_argument("--ignore-tables", type=str, default="", help="Comma separated list of tables to ignore")
     parser.add_argument("--sai-spec-dir", type=str, required=True, help="Path to output SAI spec file")
@@ -40,8 +41,11 @@ if __name__ == "__main__":
         print("File " + p4rt_file_path + " does not exist")
         exit(1)
 
-    p4ir = P4IRTree.from_file(args.ir)
-    var_ref_graph = P4VarRefGraph(p4ir)
+    if args.ir_cache_dir:
+        var_ref_graph = P4VarRefGraph.from_analysis(P4IRAnalysis.load(os.path.realpath(args.ir), os.path.realpath(args.ir_cache_dir)))
+    else:
+        p4ir = P4IRTree.from_file(args.ir)
+        var_ref_graph = P4VarRefGraph(p4ir)
 
     # Parse SAI data from P4 runtime json file
     dash_sai_exts = DashP4SAIExtensions.from_p4rt_file(
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+try:
+    import os
+    import json
+    import argparse
+    from utils.dash_p4 import DashP4SAIExtensions, DashP4TableFootprintEstimator
+    from utils.dash_p4.dash_p4_table_footprint import HERO_SCALE_PROFILE
+    from utils.p4ir import P4VarRefGraph
+except ImportError as ie:
+    print("Import failed for " + ie.name)
+    exit(1)
+
+
+if __name__ == "__main__":
+    # CLI
+    parser = argparse.ArgumentParser(description="P4 table resource footprint estimator")
+    parser.add_argument("filepath", type=str, help="Path to P4 program RUNTIME JSON file")
+    parser.add_argument("--ignore-tables", type=str, default="", help="Comma separated list of tables to ignore")
+    parser.add_argument("--profile", type=str, help="Path to a JSON file of entries by SAI API name, HERO test scale if not set")
+    parser.add_argument("--range-expansion", type=int, default=2, help="TCAM entries per port range")
+    args = parser.parse_args()
+
+    p4rt_file_path = os.path.realpath(args.filepath)
+    if not os.path.isfile(p4rt_file_path):
+        print("File " + p4rt_file_path + " does not exist")
+        exit(1)
+
+    profile = HERO_SCALE_PROFILE
+    if args.profile:
+        with open(args.profile) as f:
+            profile = json.load(f)
+
+    # Counters are only sized here, so the action references from the IR are not needed.
+    dash_sai_exts = DashP4SAIExtensions.from_p4rt_file(
+        p4rt_file_path, args.ignore_tables.split(","), P4VarRefGraph(None)
+    )
+    estimator = DashP4TableFootprintEstimator(dash_sai_exts, range_expansion=args.range_expansion)
+    print(estimator.summary(profile))
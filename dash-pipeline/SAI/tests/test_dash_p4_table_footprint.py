@@ -0,0 +1,76 @@
+import os
+import pytest
+from utils.dash_p4 import DashP4SAIExtensions, DashP4TableFootprintEstimator
+from utils.dash_p4.dash_p4_table_footprint import HERO_SCALE_PROFILE
+from utils.p4ir import P4VarRefGraph
+
+# Trimmed P4Runtime JSON with an SRAM table (exact and LPM keys, two actions, direct counter),
+# a TCAM table (exact, list and range list keys) and an indexed counter.
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "p4rt_footprint.json")
+
+PROFILE = {"outbound_routing_entry": 100000, "dash_acl_rule": 1000}
+
+
+@pytest.fixture(scope="module")
+def estimator() -> DashP4TableFootprintEstimator:
+    sai_extensions = DashP4SAIExtensions.from_p4rt_file(FIXTURE, [], P4VarRefGraph(None))
+    return DashP4TableFootprintEstimator(sai_extensions)
+
+
+@pytest.fixture(scope="module")
+def tables(estimator):
+    return {table.name: table for table in estimator.tables}
+
+
+def test_sram_table(tables):
+    table = tables["outbound_routing_entry"]
+    assert table.memory == "sram"
+    assert table.size == 4096
+    # eni_id 16 + destination 128, the _is_v6 key is folded into the prefix
+    assert table.key_bits == 144
+    # route_vnet params 16 + 32, and 1 bit to select one of 2 actions
+    assert table.action_bits == 49
+    assert table.counter_bits == 128
+    assert table.sram_bits == 144 + 49 + 128
+    assert table.tcam_bits == 0
+
+
+def test_tcam_table(tables):
+    table = tables["dash_acl_rule"]
+    assert table.memory == "tcam"
+    assert table.key_bits == 16 + 128 + 16
+    # 100 prefixes x 10 port ranges, 2 TCAM entries per range
+    assert table.tcam_entries == 100 * 10 * 2
+    assert table.tcam_bits == 2 * 160 * 2000
+    assert table.sram_bits == 1
+
+
+def test_list_sizes_and_range_expansion():
+    sai_extensions = DashP4SAIExtensions.from_p4rt_file(FIXTURE, [], P4VarRefGraph(None))
+    estimator = DashP4TableFootprintEstimator(sai_extensions, list_sizes={}, range_expansion=4)
+    table = next(table for table in estimator.tables if table.name == "dash_acl_rule")
+    assert table.tcam_entries == 4
+
+
+def test_counters(estimator):
+    assert [(counter.name, counter.bitwidth, counter.size) for counter in estimator.counters] == [("meter_bucket_bytes", 64, 1024)]
+
+
+def test_project_and_undersized(estimator):
+    assert {table.name: entries for table, entries in estimator.project(PROFILE)} == PROFILE
+    assert {table.name: entries for table, entries in estimator.project({})} == {"outbound_routing_entry": 4096, "dash_acl_rule": 2048}
+    assert [(table.name, entries) for table, entries in estimator.undersized(PROFILE)] == [("outbound_routing_entry", 100000)]
+
+
+def test_summary_totals(estimator):
+    lines = estimator.summary(PROFILE).splitlines()
+    sram = 321 * 100000 + 1 * 1000 + 64 * 1024
+    tcam = 640000 * 1000
+    assert f"Total: SRAM {sram / 8 / 2**20:.2f} MB, TCAM {tcam / 8 / 2**20:.2f} MB" in lines
+    assert lines[-1] == "Undersized: outbound_routing_entry (1) has size 4096, profile needs 100000"
+
+
+def test_summary_hero_profile(estimator):
+    lines = estimator.summary(HERO_SCALE_PROFILE).splitlines()
+    assert "Undersized: dash_acl_rule (2) has size 2048, profile needs 320000" in lines
+    assert "Undersized: outbound_routing_entry (1) has size 4096, profile needs 3200000" in lines
@@ -0,0 +1,63 @@
+import os
+import pytest
+from utils.p4ir import P4IRAnalysis, P4MetaLiveness
+
+# Trimmed IR of a dash_ingress control with metadata_t fields written and read in
+# straight code, on both branches of an if/else, under an if only, in the actions
+# of a table and around a switch without default.
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "p4ir_meta.json")
+
+
+@pytest.fixture(scope="module")
+def liveness() -> P4MetaLiveness:
+    return P4MetaLiveness(P4IRAnalysis.load(FIXTURE))
+
+
+def test_fields(liveness):
+    assert len(liveness.fields) == 9
+    assert liveness.fields["meta.dropped"].width == 1
+    assert liveness.fields["meta.unused"].width == 64
+
+
+def test_unused_write_only_read_only(liveness):
+    assert [f.path for f in liveness.unused()] == ["meta.unused"]
+    assert [f.path for f in liveness.write_only()] == ["meta.dropped", "meta.stage"]
+    assert liveness.read_only() == []
+
+
+def test_branch_steps(liveness):
+    steps = liveness.analysis.blocks["dash_ingress"].steps
+    markers = [step for step in steps if step[0] in ["branch", "or", "end"]]
+    # if/else, if without else, switch without default
+    assert markers == [["branch", True], ["or"], ["end"], ["branch", False], ["end"], ["branch", False], ["or"], ["end"]]
+
+
+def test_def_use_straight(liveness):
+    assert liveness.def_use("meta.y") == [(4, [5])]
+    assert liveness.def_use("meta.flag") == [(6, [7, 12]), (17, []), (18, [])]
+
+
+def test_def_use_if_else(liveness):
+    # Both writes may reach the read, the initial value does not
+    assert liveness.def_use("meta.x") == [(8, [10]), (9, [10])]
+
+
+def test_def_use_initial_value(liveness):
+    # Written under an if without else, or by one of the actions of a table
+    assert liveness.def_use("meta.tmp_b") == [(-1, [14]), (13, [14])]
+    assert liveness.def_use("meta.vnet_id") == [(-1, [16]), (2, [16])]
+
+
+def test_live_range(liveness):
+    end = len(liveness.trace)
+    assert liveness.fields["meta.y"].live_range(end) == (4, 5)
+    assert liveness.fields["meta.x"].live_range(end) == (8, 10)
+    assert liveness.fields["meta.tmp_b"].live_range(end) == (0, 14)
+    assert liveness.fields["meta.vnet_id"].live_range(end) == (0, 16)
+    assert liveness.fields["meta.dropped"].live_range(end) is None
+
+
+def test_shared_groups(liveness):
+    groups = [[f.path for f in group] for group in liveness.shared_groups()]
+    # tmp_b may hold its initial value from the start, so it shares with none of them
+    assert groups == [["meta.eni_id", "meta.y", "meta.x"]]
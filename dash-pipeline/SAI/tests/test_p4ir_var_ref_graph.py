@@ -0,0 +1,44 @@
+import os
+import pytest
+from utils.p4ir import P4IRAnalysis, P4IRTree, P4VarRefGraph
+
+# Trimmed IR with two counters, counted in an action and in a control body,
+# and a meter whose count() calls must not be taken as counter references.
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "p4ir_counters.json")
+
+
+def graph_summary(graph: P4VarRefGraph):
+    counters = {
+        name: (var.ir_id, var.ir_name, var.code_name, var.type_name)
+        for name, var in graph.counters.items()
+    }
+    var_refs = {
+        name: sorted((ref.var.code_name, ref.caller_id, ref.caller_type, ref.caller) for ref in refs)
+        for name, refs in graph.var_refs.items()
+    }
+    return counters, var_refs
+
+
+@pytest.fixture
+def ir_graph() -> P4VarRefGraph:
+    return P4VarRefGraph(P4IRTree.from_file(FIXTURE))
+
+
+def test_from_analysis_matches_ir_walk(ir_graph, tmp_path):
+    analysis = P4IRAnalysis.load(FIXTURE, str(tmp_path))
+    assert graph_summary(P4VarRefGraph.from_analysis(analysis)) == graph_summary(ir_graph)
+
+
+def test_from_cached_analysis_matches_ir_walk(ir_graph, tmp_path):
+    P4IRAnalysis.load(FIXTURE, str(tmp_path))
+    cached = P4IRAnalysis.load(FIXTURE, str(tmp_path))
+    assert graph_summary(P4VarRefGraph.from_analysis(cached)) == graph_summary(ir_graph)
+
+
+def test_fixture_counter_refs(ir_graph):
+    counters, var_refs = graph_summary(ir_graph)
+    assert sorted(counters) == ["flow_counter", "meter_bucket_inbound"]
+    assert {name: [ref[2:] for ref in refs] for name, refs in var_refs.items()} == {
+        "meter_bucket_inbound": [("P4Action", "update_meter_bucket")],
+        "flow_counter": [("P4Control", "routing_ctl")],
+    }
@@ -26,4 +26,5 @@ from .dash_p4_table_key import DashP4TableKey
 from .dash_p4_table_action_param import DashP4TableActionParam
 from .dash_p4_counter import DashP4Counter
 from .dash_p4_enum import DashP4Enum
-from .dash_p4_enum_member import DashP4EnumMember
\ No newline at end of file
+from .dash_p4_enum_member import DashP4EnumMember
+from .dash_p4_table_footprint import DashP4TableFootprint, DashP4TableFootprintEstimator
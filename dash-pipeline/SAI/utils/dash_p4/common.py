@@ -30,6 +30,10 @@ KV_PAIR_LIST_TAG: str = "kvPairList"
 SAI_VAL_TAG: str = "SaiVal"
 SAI_COUNTER_TAG: str = "SaiCounter"
 SAI_TABLE_TAG: str = "SaiTable"
+SIZE_TAG: str = "size"
+
+# P4 tables without a size property get the default size of p4c
+DEFAULT_TABLE_SIZE: int = 1024
 
 
 #
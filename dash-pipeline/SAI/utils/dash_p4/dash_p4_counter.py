@@ -20,6 +20,7 @@ class DashP4Counter(DashP4TableAttribute):
         self.attr_type: str = "stats"
         self.no_suffix: bool = ""
         self.param_actions: List[str] = []
+        self.size: int = 0
 
     def parse_p4rt(
         self, p4rt_counter: Dict[str, Any], var_ref_graph: P4VarRefGraph
@@ -42,6 +43,7 @@ class DashP4Counter(DashP4TableAttribute):
             }
         """
         print("Parsing counter: " + self.name)
+        self.size = int(p4rt_counter.get(SIZE_TAG, 0))
         self.__parse_sai_counter_annotation(p4rt_counter)
 
         # If this counter needs to be generated as SAI attributes, we need to figure out the data type for the counter value.
@@ -28,6 +28,7 @@ class DashP4Table(DashP4Object):
         self.with_counters: str = "false"
         self.sai_attributes: List[DashP4TableAttribute] = []
         self.sai_stats: List[DashP4TableAttribute] = []
+        self.size: int = DEFAULT_TABLE_SIZE
 
         # Extra properties from annotations
         self.stage: Optional[str] = None
@@ -84,6 +85,7 @@ class DashP4Table(DashP4Object):
             return
 
         print("Parsing table: " + self.name)
+        self.size = int(p4rt_table.get(SIZE_TAG, DEFAULT_TABLE_SIZE))
         self.with_counters = self.__table_with_counters(program)
         self.__parse_table_keys(p4rt_table)
         self.__parse_table_actions(p4rt_table, all_actions)
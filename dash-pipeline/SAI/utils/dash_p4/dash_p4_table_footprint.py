@@ -0,0 +1,145 @@
+import math
+from typing import Dict, List, Optional, Tuple
+from .dash_p4_table import DashP4Table
+from .dash_p4_counter import DashP4Counter
+from .dash_sai_extensions import DashP4SAIExtensions
+
+
+# Match types that need a TCAM. The other keys of a table with any of them are matched in the same TCAM entry.
+# LPM is taken as algorithmic LPM in SRAM.
+TCAM_MATCH_TYPES: List[str] = ["ternary", "optional", "range", "list", "range_list"]
+
+# Match types holding a list of values per SAI entry, each value taking its own TCAM entry.
+LIST_MATCH_TYPES: List[str] = ["list", "range_list"]
+
+# Match types holding port ranges, each range taking more than one TCAM entry when split into prefixes.
+RANGE_MATCH_TYPES: List[str] = ["range", "range_list"]
+
+# Direct counters keep a 64-bit byte count and a 64-bit packet count per entry.
+DIRECT_COUNTER_BITS: int = 128
+
+# HERO test object counts of a single DPU with 32 ENIs,
+# see documentation/general/program-scale-testing-requirements/README.md.
+HERO_SCALE_PROFILE: Dict[str, int] = {
+    "vnet": 1024,
+    "eni": 32,
+    "eni_ether_address_map_entry": 32,
+    "dash_acl_group": 320,
+    "dash_acl_rule": 320000,
+    "outbound_routing_entry": 3200000,
+    "inbound_routing_entry": 320000,
+    "outbound_ca_to_pa_entry": 8000000,
+    "flow_entry": 32000000,
+}
+
+# Values per SAI entry of the list keys in the HERO test: 100 remote prefixes and 10 remote ports per ACL rule,
+# the local side of the rule matching any.
+HERO_LIST_SIZES: Dict[str, Dict[str, int]] = {
+    "dash_acl_rule": {"dip": 100, "dst_port": 10},
+}
+
+
+class DashP4TableFootprint:
+    """
+    This class holds the estimated memory of a single P4 table: the bits of a SAI entry in TCAM and SRAM,
+    from the key bitwidths and match types, the widest action data and the direct counter.
+
+    A table with any TCAM key keeps its whole key in TCAM, as value and mask, and one TCAM entry per
+    combination of list values and per prefix of a range. The action data and the counter of the SAI entry
+    stay in SRAM, shared by its TCAM entries.
+    """
+
+    def __init__(self, table: DashP4Table, list_sizes: Optional[Dict[str, int]] = None, range_expansion: int = 2) -> None:
+        self.name: str = table.name
+        self.id: int = table.id
+        self.size: int = table.size
+        self.match_types: List[str] = [key.match_type for key in table.keys]
+        self.memory: str = "tcam" if any(match_type in TCAM_MATCH_TYPES for match_type in self.match_types) else "sram"
+
+        self.key_bits: int = sum(key.bitwidth for key in table.keys)
+        self.action_bits: int = max([sum(param.bitwidth for param in action.params) for action in table.actions], default=0)
+        if len(table.actions) > 1:
+            self.action_bits += math.ceil(math.log2(len(table.actions)))
+        self.counter_bits: int = DIRECT_COUNTER_BITS if table.with_counters == "true" else 0
+
+        self.tcam_entries: int = 1
+        for key in table.keys:
+            if key.match_type in LIST_MATCH_TYPES:
+                self.tcam_entries *= (list_sizes or {}).get(key.name, 1)
+            if key.match_type in RANGE_MATCH_TYPES:
+                self.tcam_entries *= range_expansion
+
+    @property
+    def sram_bits(self) -> int:
+        """
+        SRAM bits of a single SAI entry.
+        """
+        key_bits = self.key_bits if self.memory == "sram" else 0
+        return key_bits + self.action_bits + self.counter_bits
+
+    @property
+    def tcam_bits(self) -> int:
+        """
+        TCAM bits of a single SAI entry, value and mask of every TCAM entry it takes.
+        """
+        return 2 * self.key_bits * self.tcam_entries if self.memory == "tcam" else 0
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.id}): Size = {self.size}, Memory = {self.memory}, Keys = {self.match_types}, SRAM bits = {self.sram_bits}, TCAM bits = {self.tcam_bits}"
+
+
+class DashP4TableFootprintEstimator:
+    """
+    This class estimates the memory of all tables and indexed counters parsed from the P4Runtime JSON file,
+    projects it for a scale profile, a number of SAI entries by SAI API name, and finds the tables whose
+    declared size is below the profile.
+
+    Tables of the same SAI API, e.g. the ACL stages, are each projected with the full number of entries.
+    Indexed counters, e.g. the meter buckets, are projected at their declared size.
+    """
+
+    def __init__(
+        self,
+        sai_extensions: DashP4SAIExtensions,
+        list_sizes: Optional[Dict[str, Dict[str, int]]] = None,
+        range_expansion: int = 2,
+    ) -> None:
+        list_sizes = HERO_LIST_SIZES if list_sizes is None else list_sizes
+        self.tables: List[DashP4TableFootprint] = [
+            DashP4TableFootprint(table, list_sizes.get(table.name), range_expansion)
+            for table_group in sai_extensions.table_groups
+            for table in table_group.tables
+        ]
+        self.counters: List[DashP4Counter] = [counter for counter in sai_extensions.counters if counter.size > 0]
+
+    def project(self, profile: Dict[str, int]) -> List[Tuple[DashP4TableFootprint, int]]:
+        """
+        Tables with the number of entries of the profile, the declared size for tables not in the profile.
+        """
+        return [(table, profile.get(table.name, table.size)) for table in self.tables]
+
+    def undersized(self, profile: Dict[str, int]) -> List[Tuple[DashP4TableFootprint, int]]:
+        return [(table, entries) for table, entries in self.project(profile) if table.size < entries]
+
+    def summary(self, profile: Dict[str, int] = HERO_SCALE_PROFILE) -> str:
+        lines = [f"{'Table':<40} {'Memory':<6} {'Key':>5} {'Action':>6} {'SRAM/entry':>10} {'TCAM/entry':>10} {'Size':>10} {'Entries':>10} {'SRAM MB':>9} {'TCAM MB':>9}"]
+        total_sram = total_tcam = 0
+        for table, entries in self.project(profile):
+            sram = table.sram_bits * entries
+            tcam = table.tcam_bits * entries
+            total_sram += sram
+            total_tcam += tcam
+            lines.append(
+                f"{table.name:<40} {table.memory:<6} {table.key_bits:>5} {table.action_bits:>6} {table.sram_bits:>10} {table.tcam_bits:>10} "
+                f"{table.size:>10} {entries:>10} {sram / 8 / 2**20:>9.2f} {tcam / 8 / 2**20:>9.2f}"
+            )
+
+        for counter in self.counters:
+            sram = counter.bitwidth * counter.size
+            total_sram += sram
+            lines.append(f"{counter.name + ' (counter)':<40} {'sram':<6} {'':>5} {'':>6} {counter.bitwidth:>10} {0:>10} {counter.size:>10} {counter.size:>10} {sram / 8 / 2**20:>9.2f} {0:>9.2f}")
+
+        lines.append(f"Total: SRAM {total_sram / 8 / 2**20:.2f} MB, TCAM {total_tcam / 8 / 2**20:.2f} MB")
+        for table, entries in self.undersized(profile):
+            lines.append(f"Undersized: {table.name} ({table.id}) has size {table.size}, profile needs {entries}")
+        return "\n".join(lines)
@@ -5,3 +5,5 @@ from .p4ir_var_ref_graph import *
 from .p4ir_var_info import *
 from .p4ir_var_ref_info import *
 from .p4ir_tree import *
+from .p4ir_analysis import *
+from .p4ir_meta_liveness import *
@@ -0,0 +1,485 @@
+import gzip
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Set
+from .p4ir_tree import P4IRTree
+from .p4ir_var_info import P4IRVarInfo
+
+P4IR_ANALYSIS_CACHE_VERSION = 3
+
+COUNTER_TYPES = ["counter", "direct_counter"]
+
+# Parameter directions of the callee that make an argument written by the call
+WRITE_DIRECTIONS = ["out", "inout"]
+
+# Pseudo field of the validity bit of headers, e.g. "meta.rx_encap.$valid"
+VALID_FIELD = "$valid"
+
+
+class P4IRBlockInfo:
+    """
+    This class represents what a single parser, control, action or table of the P4 IR refers to:
+    tables and control instances applied, actions called or listed, counters updated and
+    the fields read and written, as paths from the parameter or variable name, e.g. "meta.eni_id".
+
+    Steps keep the reads, writes, applies and calls in program order, as ["read", path],
+    ["write", path, source width or None], ["apply", name] and ["call", name]. The branches of
+    an if or switch are nested in ["branch", exhaustive], ["or"] between branches and ["end"],
+    exhaustive when one of the branches always runs, i.e. the if has an else or the switch a default.
+    """
+
+    def __init__(self, ir_id: int, node_type: str, name: str, qualified_name: str) -> None:
+        self.ir_id = ir_id
+        self.node_type = node_type
+        self.name = name
+        self.qualified_name = qualified_name
+        self.applies: List[str] = []
+        self.instances: Dict[str, str] = {}
+        self.actions: List[str] = []
+        self.counters: List[str] = []
+        self.reads: Set[str] = set()
+        self.writes: Set[str] = set()
+        # Parameter name to type name, or width of bits and bool parameters
+        self.parameters: Dict[str, Any] = {}
+        self.keys: List[List[Any]] = []
+        self.steps: List[List[Any]] = []
+
+    @staticmethod
+    def from_dict(value: Dict[str, Any]) -> "P4IRBlockInfo":
+        block = P4IRBlockInfo(value["ir_id"], value["node_type"], value["name"], value["qualified_name"])
+        block.applies = value["applies"]
+        block.instances = value["instances"]
+        block.actions = value["actions"]
+        block.counters = value["counters"]
+        block.reads = set(value["reads"])
+        block.writes = set(value["writes"])
+        block.parameters = value["parameters"]
+        block.keys = value["keys"]
+        block.steps = value["steps"]
+        return block
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ir_id": self.ir_id,
+            "node_type": self.node_type,
+            "name": self.name,
+            "qualified_name": self.qualified_name,
+            "applies": self.applies,
+            "instances": self.instances,
+            "actions": self.actions,
+            "counters": self.counters,
+            "reads": sorted(self.reads),
+            "writes": sorted(self.writes),
+            "parameters": self.parameters,
+            "keys": self.keys,
+            "steps": self.steps,
+        }
+
+    def __str__(self) -> str:
+        return f"{self.node_type} {self.qualified_name}: Applies = {self.applies}, Actions = {self.actions}, Counters = {self.counters}, Reads = {len(self.reads)}, Writes = {len(self.writes)}"
+
+
+class P4IRAnalysis:
+    """
+    This class holds the per-control, per-action and per-table subgraphs of the P4 IR, extracted in
+    a single pass over the IR, and caches them by the hash of the IR file, so tools using them do not
+    need to reload the IR JSON.
+
+    Nodes the IR refers to again by Node_ID only are indexed once, as where they first appear.
+    Blocks are keyed by qualified name: "control.action" for actions and tables local to a control,
+    the name for top level ones. Types keeps the widths of typedefs and serializable enums and the
+    fields of structs and headers, headers with their validity bit as the last field.
+    """
+
+    @staticmethod
+    def ir_hash(path: str) -> str:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    @staticmethod
+    def load(ir_path: str, cache_dir: Optional[str] = None) -> "P4IRAnalysis":
+        """
+        Load the analysis of the IR file from the cache, or analyze the IR and save it to the cache.
+        """
+        ir_hash = P4IRAnalysis.ir_hash(ir_path)
+        cache_path = os.path.join(cache_dir, f"p4ir_analysis_{ir_hash}.json.gz") if cache_dir else None
+        if cache_path and os.path.isfile(cache_path):
+            with gzip.open(cache_path, "rt") as f:
+                cached = json.load(f)
+            if cached.get("version") == P4IR_ANALYSIS_CACHE_VERSION:
+                print(f"Loaded P4 IR analysis from {cache_path}")
+                return P4IRAnalysis.from_dict(cached)
+
+        analysis = P4IRAnalysis(P4IRTree.from_file(ir_path), ir_hash)
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            with gzip.open(cache_path, "wt") as f:
+                json.dump(analysis.to_dict(), f, separators=(",", ":"))
+            print(f"Saved P4 IR analysis to {cache_path}")
+        return analysis
+
+    @staticmethod
+    def from_dict(value: Dict[str, Any]) -> "P4IRAnalysis":
+        analysis = P4IRAnalysis(None, value["ir_hash"])
+        analysis.counters = {
+            counter["ir_name"]: P4IRVarInfo(counter["ir_id"], counter["ir_name"], counter["code_name"], counter["type_name"])
+            for counter in value["counters"]
+        }
+        analysis.counter_refs = [tuple(ref) for ref in value["counter_refs"]]
+        analysis.blocks = {block["qualified_name"]: P4IRBlockInfo.from_dict(block) for block in value["blocks"]}
+        analysis.types = value["types"]
+        return analysis
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": P4IR_ANALYSIS_CACHE_VERSION,
+            "ir_hash": self.ir_hash,
+            "counters": [var.__dict__ for var in self.counters.values()],
+            "counter_refs": self.counter_refs,
+            "blocks": [block.to_dict() for block in self.blocks.values()],
+            "types": self.types,
+        }
+
+    def __init__(self, ir: Optional[P4IRTree], ir_hash: str = "") -> None:
+        self.ir_hash = ir_hash
+        self.counters: Dict[str, P4IRVarInfo] = {}
+        # (counter IR name, qualified name of the closest action or control), in IR order
+        self.counter_refs: List[Any] = []
+        self.blocks: Dict[str, P4IRBlockInfo] = {}
+        # Width of bits, bool and enum types, type name of named types, fields of structs and headers
+        self.types: Dict[str, Any] = {}
+        self.__parameters: Dict[str, List[str]] = {}
+        self.__type_nodes: Dict[int, Any] = {}
+        if ir is not None:
+            self.__visit(ir.program, [])
+
+    def controls(self) -> Iterator[P4IRBlockInfo]:
+        return (block for block in self.blocks.values() if block.node_type == "P4Control")
+
+    def actions(self) -> Iterator[P4IRBlockInfo]:
+        return (block for block in self.blocks.values() if block.node_type == "P4Action")
+
+    def tables(self) -> Iterator[P4IRBlockInfo]:
+        return (block for block in self.blocks.values() if block.node_type == "P4Table")
+
+    def find(self, name: str, scope: Optional[P4IRBlockInfo] = None) -> Optional[P4IRBlockInfo]:
+        """
+        Block of a name as referred from the scope: local to the control of the scope first, then top level.
+        """
+        if scope is not None:
+            control = scope.qualified_name.split(".")[0]
+            if f"{control}.{name}" in self.blocks:
+                return self.blocks[f"{control}.{name}"]
+        return self.blocks.get(name)
+
+    def width(self, type_name: Any) -> Optional[int]:
+        """
+        Width in bits of a type name or width, None for structs, headers and unknown types.
+        """
+        resolved = self.__resolve(type_name)
+        return resolved if isinstance(resolved, int) else None
+
+    def leaf_fields(self, type_name: str, prefix: str = "") -> List[Any]:
+        """
+        Paths and widths of the fields of a struct or header, nested structs and headers flattened,
+        e.g. leaf_fields("metadata_t", "meta") -> [("meta.packet_source", 8), ...].
+        """
+        declared = self.types.get(type_name)
+        if not isinstance(declared, list):
+            return []
+        fields = []
+        for name, field_type in declared:
+            path = f"{prefix}.{name}" if prefix else name
+            resolved = self.__resolve(field_type)
+            if isinstance(resolved, str) and isinstance(self.types.get(resolved), list):
+                fields += self.leaf_fields(resolved, path)
+            else:
+                fields.append((path, self.width(field_type)))
+        return fields
+
+    def __resolve(self, type_name: Any) -> Any:
+        # Follow typedefs to a width, or to the name of a struct or header
+        seen: Set[str] = set()
+        while isinstance(type_name, str) and type_name not in seen and isinstance(self.types.get(type_name), (str, int)):
+            seen.add(type_name)
+            type_name = self.types[type_name]
+        return type_name
+
+    def usage(self, qualified_name: str) -> P4IRBlockInfo:
+        """
+        Everything a block refers to, transitively: tables applied with their keys and actions,
+        control instances applied, actions called.
+        """
+        root = self.blocks[qualified_name]
+        total = P4IRBlockInfo(root.ir_id, root.node_type, root.name, root.qualified_name)
+        seen: Set[str] = set()
+        pending = [root]
+        while pending:
+            block = pending.pop()
+            if block.qualified_name in seen:
+                continue
+            seen.add(block.qualified_name)
+            total.reads |= block.reads
+            total.writes |= block.writes
+            total.counters += [c for c in block.counters if c not in total.counters]
+            for name in block.applies + block.actions:
+                target = self.find(block.instances.get(name, name), block)
+                if target is not None:
+                    pending.append(target)
+                    if target.node_type == "P4Table" and target.qualified_name not in total.applies:
+                        total.applies.append(target.qualified_name)
+                    if target.node_type == "P4Action" and target.qualified_name not in total.actions:
+                        total.actions.append(target.qualified_name)
+        return total
+
+    def __visit(self, node: Any, scopes: List[P4IRBlockInfo]) -> None:
+        if isinstance(node, list):
+            for item in node:
+                self.__visit(item, scopes)
+            return
+        if not isinstance(node, dict):
+            return
+
+        node_type = node.get("Node_Type")
+        if "type" in node:
+            self.__type_width(node["type"])
+
+        if node_type in ["P4Parser", "P4Control", "P4Action", "P4Table"]:
+            scopes = scopes + [self.__add_block(node, scopes)]
+            if node_type == "P4Action":
+                params = node.get("parameters", {}).get("parameters", {}).get("vec", [])
+                self.__parameters[scopes[-1].qualified_name] = [param.get("direction", "") for param in params]
+                self.__add_parameters(scopes[-1], params)
+            elif node_type in ["P4Parser", "P4Control"]:
+                params = node.get("type", {}).get("applyParams", {}).get("parameters", {}).get("vec", [])
+                self.__add_parameters(scopes[-1], params)
+            elif node_type == "P4Table":
+                self.__visit_table(node, scopes)
+                return
+        elif node_type in ["Type_Struct", "Type_Header", "Type_HeaderUnion", "Type_Typedef", "Type_Newtype", "Type_SerEnum"]:
+            self.__type_width(node)
+            return
+        elif node_type == "Declaration_Instance" and "name" in node:
+            type_name = self.__type_name(node.get("type"))
+            if type_name in COUNTER_TYPES:
+                self.counters[node["name"]] = P4IRVarInfo(
+                    node["Node_ID"], node["name"], node.get("Source_Info", {}).get("source_fragment", node["name"]), type_name
+                )
+            elif type_name and scopes:
+                scopes[-1].instances[node["name"]] = type_name
+        elif node_type == "AssignmentStatement" and scopes:
+            left = node.get("left")
+            self.__visit(node.get("right"), scopes)
+            self.__visit_indexes(left, scopes)
+            if isinstance(left, dict) and left.get("Node_Type") == "Slice":
+                # A slice needs the field up to its high bit
+                width = left.get("e1", {}).get("value")
+                width = int(width) + 1 if width is not None else None
+            else:
+                width = self.__source_width(node.get("right"))
+            self.__add_field(scopes[-1], self.__field_path(left), True, width)
+            return
+        elif node_type == "IfStatement" and scopes:
+            self.__visit(node.get("condition"), scopes)
+            branches = [node.get("ifTrue")] + ([node["ifFalse"]] if node.get("ifFalse") else [])
+            self.__visit_branches(branches, len(branches) == 2, scopes)
+            return
+        elif node_type == "SwitchStatement" and scopes:
+            self.__visit(node.get("expression"), scopes)
+            cases = node.get("cases", {}).get("vec", [])
+            exhaustive = any(case.get("label", {}).get("Node_Type") == "DefaultExpression" for case in cases)
+            self.__visit_branches([case.get("statement") for case in cases], exhaustive, scopes)
+            return
+        elif node_type in ["MethodCallStatement", "MethodCallExpression"] and scopes:
+            self.__visit_call(node.get("methodCall", node), scopes)
+            return
+        elif node_type == "Member" and scopes and self.__field_path(node):
+            self.__add_field(scopes[-1], self.__field_path(node))
+            return
+
+        for key, value in node.items():
+            if key not in ["Node_ID", "Node_Type", "Source_Info", "type"]:
+                self.__visit(value, scopes)
+
+    def __add_block(self, node: Dict[str, Any], scopes: List[P4IRBlockInfo]) -> P4IRBlockInfo:
+        name = node.get("name", "")
+        controls = [scope for scope in scopes if scope.node_type == "P4Control"]
+        qualified_name = f"{controls[-1].qualified_name}.{name}" if controls else name
+        block = P4IRBlockInfo(node.get("Node_ID", 0), node["Node_Type"], name, qualified_name)
+        self.blocks[qualified_name] = block
+        return block
+
+    def __add_parameters(self, block: P4IRBlockInfo, params: List[Dict[str, Any]]) -> None:
+        for param in params:
+            if "name" in param:
+                block.parameters[param["name"]] = self.__type_width(param.get("type"))
+
+    def __visit_table(self, node: Dict[str, Any], scopes: List[P4IRBlockInfo]) -> None:
+        table = scopes[-1]
+        for prop in node.get("properties", {}).get("properties", {}).get("vec", []):
+            value = prop.get("value", {})
+            if prop.get("name") == "key":
+                for element in value.get("keyElements", {}).get("vec", []):
+                    self.__visit(element.get("expression"), scopes)
+                    match_type = element.get("matchType", {}).get("path", {}).get("name")
+                    table.keys.append([self.__field_path(element.get("expression")), match_type])
+            elif prop.get("name") == "actions":
+                for element in value.get("actionList", {}).get("vec", []):
+                    name = self.__callee_name(element.get("expression", {}))
+                    if name and name not in table.actions:
+                        table.actions.append(name)
+            elif prop.get("name") == "default_action":
+                name = self.__callee_name(value.get("expression", {}))
+                if name and name not in table.actions:
+                    table.actions.append(name)
+
+    def __visit_call(self, call: Dict[str, Any], scopes: List[P4IRBlockInfo]) -> None:
+        block = scopes[-1]
+        method = call.get("method", {})
+        arguments = [arg.get("expression", arg) for arg in call.get("arguments", {}).get("vec", [])]
+        directions: List[str] = []
+        step: Optional[List[Any]] = None
+
+        if method.get("Node_Type") == "Member":
+            target = self.__callee_name(method.get("expr", {}))
+            member = method.get("member")
+            path = self.__field_path(method.get("expr"))
+            if member == "apply" and target:
+                block.applies.append(target)
+                step = ["apply", target]
+            elif member == "count" and target in self.counters:
+                block.counters.append(target)
+                caller = next((s for s in reversed(scopes) if s.node_type in ["P4Action", "P4Control"]), block)
+                self.counter_refs.append((target, caller.qualified_name))
+            elif member in ["isValid", "setValid", "setInvalid"] and path:
+                self.__add_field(block, f"{path}.{VALID_FIELD}", member != "isValid", 1)
+            else:
+                self.__visit(method.get("expr"), scopes)
+        elif method.get("Node_Type") == "PathExpression":
+            name = self.__callee_name(method)
+            callee = self.find(name, block)
+            if callee is not None and callee.node_type == "P4Action":
+                block.actions.append(callee.name)
+                directions = self.__parameters.get(callee.qualified_name, [])
+                step = ["call", callee.name]
+
+        # Arguments are read before the call, out and inout arguments written by it
+        for index, argument in enumerate(arguments):
+            if index >= len(directions) or directions[index] != "out":
+                self.__visit(argument, scopes)
+        if step is not None:
+            block.steps.append(step)
+        for index, argument in enumerate(arguments):
+            if index < len(directions) and directions[index] in WRITE_DIRECTIONS:
+                self.__add_field(block, self.__field_path(argument), True)
+
+    def __visit_branches(self, branches: List[Any], exhaustive: bool, scopes: List[P4IRBlockInfo]) -> None:
+        # Cases falling through to the next one are kept as empty branches
+        steps = scopes[-1].steps
+        steps.append(["branch", exhaustive])
+        for index, branch in enumerate(branches):
+            if index > 0:
+                steps.append(["or"])
+            self.__visit(branch, scopes)
+        steps.append(["end"])
+
+    def __visit_indexes(self, node: Any, scopes: List[P4IRBlockInfo]) -> None:
+        # Index expressions of written slices and arrays are read
+        if isinstance(node, dict) and node.get("Node_Type") in ["Slice", "ArrayIndex"]:
+            for key in ["e1", "e2", "right"]:
+                self.__visit(node.get(key), scopes)
+            self.__visit_indexes(node.get("e0", node.get("left")), scopes)
+
+    def __add_field(self, block: P4IRBlockInfo, path: Optional[str], write: bool = False, width: Optional[int] = None) -> None:
+        # Fields only, not whole parameters or local variables
+        if not path or "." not in path:
+            return
+        if write:
+            block.writes.add(path)
+            block.steps.append(["write", path, width])
+        else:
+            block.reads.add(path)
+            block.steps.append(["read", path])
+
+    def __field_path(self, node: Any) -> Optional[str]:
+        if not isinstance(node, dict):
+            return None
+        node_type = node.get("Node_Type")
+        if node_type == "Member":
+            base = self.__field_path(node.get("expr"))
+            return f"{base}.{node['member']}" if base else None
+        if node_type == "PathExpression":
+            return node.get("path", {}).get("name")
+        if node_type in ["Slice", "ArrayIndex"]:
+            return self.__field_path(node.get("e0", node.get("left")))
+        if node_type == "Cast":
+            return self.__field_path(node.get("expr"))
+        return None
+
+    def __source_width(self, node: Any) -> Optional[int]:
+        # Bits the assigned value needs: a widening cast or a constant narrower than its type needs less than the type
+        if not isinstance(node, dict):
+            return None
+        node_type = node.get("Node_Type")
+        if node_type == "Constant":
+            return max(int(node.get("value", 0)).bit_length(), 1)
+        if node_type == "BoolLiteral":
+            return 1
+        if node_type == "Cast":
+            inner = self.__source_width(node.get("expr"))
+            outer = self.width(self.__type_width(node.get("destType", node.get("type"))))
+            return outer if inner is None else inner if outer is None else min(inner, outer)
+        if node_type == "Mux":
+            widths = [self.__source_width(node.get(key)) for key in ["e1", "e2"]]
+            return None if None in widths else max(widths)
+        return self.width(self.__type_width(node.get("type")))
+
+    def __type_width(self, node: Any) -> Any:
+        # Width of bits, bool and enum types, name of named types; declarations are added to types.
+        # Types are shared and referred again by Node_ID, so results are kept by Node_ID.
+        if not isinstance(node, dict):
+            return None
+        node_type = node.get("Node_Type")
+        if node_type is None:
+            return self.__type_nodes.get(node.get("Node_ID"))
+
+        width: Any = None
+        if node_type == "Type_Bits":
+            width = node.get("size")
+        elif node_type == "Type_Boolean":
+            width = 1
+        elif node_type == "Type_Name":
+            width = node.get("path", {}).get("name")
+        elif node_type in ["Type_Typedef", "Type_Newtype", "Type_SerEnum"]:
+            width = self.__type_width(node.get("type"))
+            if "name" in node:
+                self.types[node["name"]] = width
+        elif node_type in ["Type_Struct", "Type_Header", "Type_HeaderUnion"] and "name" in node:
+            fields = [[field.get("name"), self.__type_width(field.get("type"))] for field in node.get("fields", {}).get("vec", [])]
+            if node_type == "Type_Header":
+                fields.append([VALID_FIELD, 1])
+            self.types[node["name"]] = fields
+            width = node["name"]
+        if "Node_ID" in node:
+            self.__type_nodes[node["Node_ID"]] = width
+        return width
+
+    @staticmethod
+    def __callee_name(node: Dict[str, Any]) -> Optional[str]:
+        if node.get("Node_Type") == "MethodCallExpression":
+            node = node.get("method", {})
+        if node.get("Node_Type") == "PathExpression":
+            return node.get("path", {}).get("name")
+        return None
+
+    @staticmethod
+    def __type_name(node: Any) -> Optional[str]:
+        if not isinstance(node, dict):
+            return None
+        if node.get("Node_Type") == "Type_Specialized":
+            node = node.get("baseType", {})
+        return node.get("path", {}).get("name")
@@ -0,0 +1,252 @@
+from typing import Dict, List, Optional, Set, Tuple
+from .p4ir_analysis import P4IRAnalysis, P4IRBlockInfo
+
+META_PREFIX = "meta"
+
+
+class P4MetaFieldInfo:
+    """
+    This class represents the def-use summary of a single leaf field of the metadata struct:
+    positions of its writes and reads in the steps of the analyzed controls, the widest value
+    written to it and the table keys it is matched in.
+    """
+
+    def __init__(self, path: str, width: Optional[int]) -> None:
+        self.path = path
+        self.width = width
+        self.defs: List[int] = []
+        self.uses: List[int] = []
+        # Writes that may reach each read, -1 for the initial value
+        self.reaching: Dict[int, List[int]] = {}
+        # Widest value written, None once any write has an unknown width
+        self.source_width: Optional[int] = 0
+        self.keys: List[Tuple[str, str]] = []
+        # Referred by blocks outside of the analyzed controls, e.g. the parser or the deparser
+        self.external = False
+
+    def live_range(self, end: int) -> Optional[Tuple[int, int]]:
+        """
+        First and last step the field holds a value in, None if it is never read.
+        The range starts at the first write only if the writes dominate every read,
+        at 0 if any read may see the initial value.
+        """
+        if not self.uses and not self.external:
+            return None
+        if self.external:
+            return (0, end)
+        start = 0 if not self.defs or any(-1 in defs for defs in self.reaching.values()) else self.defs[0]
+        return (start, max(self.uses[-1], self.defs[-1] if self.defs else 0))
+
+    def __str__(self) -> str:
+        return f"{self.path}: Width = {self.width}, Defs = {len(self.defs)}, Uses = {len(self.uses)}, Keys = {[table for table, _ in self.keys]}"
+
+
+class P4MetaLiveness:
+    """
+    This class computes def-use chains and live ranges of the metadata fields over the controls
+    applied from the root controls, e.g. dash_ingress, to find metadata bits that can be dropped
+    or shared, and table keys wider than any value written to them.
+
+    The controls are flattened into one sequence of steps in program order: applied tables with
+    their key reads followed by all of their actions, control instances and called actions inlined.
+    The branches of an if or switch, and the actions of a table, are in the sequence one after the
+    other, so a live range covers every path. The writes reaching each read are tracked over the
+    branches, so a write that does not run on every path to a read does not start a live range.
+    Fields referred by blocks not reached from the roots (parser, deparser, other pipelines) are
+    kept live over the whole sequence.
+    """
+
+    def __init__(self, analysis: P4IRAnalysis, roots: Optional[List[str]] = None, meta_type: str = "metadata_t") -> None:
+        self.analysis = analysis
+        self.meta_type = meta_type
+        self.fields: Dict[str, P4MetaFieldInfo] = {
+            path: P4MetaFieldInfo(path, width) for path, width in analysis.leaf_fields(meta_type, META_PREFIX)
+        }
+        # (read or write, field path, block qualified name), in program order
+        self.trace: List[Tuple[str, str, str]] = []
+        self.__leaves: Dict[str, List[str]] = {}
+        self.__reached: Set[str] = set()
+        # Writes that may reach the current step by field, the initial value if missing,
+        # and for every open branch: the state at the branch, if it is exhaustive, the states at the branch ends
+        self.__reaching: Dict[str, Set[int]] = {}
+        self.__branches: List[Tuple[Dict[str, Set[int]], bool, List[Dict[str, Set[int]]]]] = []
+
+        for root in roots or ["dash_ingress"]:
+            self.__expand(analysis.blocks[root], [])
+        self.__add_keys()
+        self.__add_external()
+
+    def unused(self) -> List[P4MetaFieldInfo]:
+        return [f for f in self.fields.values() if not f.defs and not f.uses and not f.external]
+
+    def write_only(self) -> List[P4MetaFieldInfo]:
+        return [f for f in self.fields.values() if f.defs and not f.uses and not f.external]
+
+    def read_only(self) -> List[P4MetaFieldInfo]:
+        """
+        Fields read but never written, so always holding their initial value.
+        """
+        return [f for f in self.fields.values() if f.uses and not f.defs and not f.external]
+
+    def def_use(self, path: str) -> List[Tuple[int, List[int]]]:
+        """
+        Def-use chains of a field: every write with the reads it may reach.
+        Reads the initial value may reach are chained to position -1.
+        """
+        field = self.fields[path]
+        chains = []
+        for position in [-1] + field.defs:
+            uses = [use for use in field.uses if position in field.reaching[use]]
+            if position >= 0 or uses:
+                chains.append((position, uses))
+        return chains
+
+    def shared_groups(self) -> List[List[P4MetaFieldInfo]]:
+        """
+        Live fields grouped so that the live ranges in a group do not overlap, so a group can share
+        the storage of its widest field. Groups of a single field are left out.
+        """
+        end = len(self.trace)
+        live = [f for f in self.fields.values() if f.width is not None and f.live_range(end) is not None]
+        live.sort(key=lambda f: (-f.width, f.live_range(end)))
+        groups: List[List[P4MetaFieldInfo]] = []
+        for field in live:
+            start, stop = field.live_range(end)
+            for group in groups:
+                if all(stop < other.live_range(end)[0] or other.live_range(end)[1] < start for other in group):
+                    group.append(field)
+                    break
+            else:
+                groups.append([field])
+        return [group for group in groups if len(group) > 1]
+
+    def over_wide_keys(self) -> List[Tuple[P4MetaFieldInfo, int]]:
+        """
+        Fields used in table keys with every value written to them narrower than the field, with the needed width.
+        """
+        return [
+            (f, f.source_width) for f in self.fields.values()
+            if f.keys and f.defs and f.width is not None and f.source_width is not None and f.source_width < f.width
+        ]
+
+    def summary(self) -> str:
+        total = sum(f.width or 0 for f in self.fields.values())
+        lines = [f"{self.meta_type}: {len(self.fields)} fields, {total} bits, {len(self.trace)} steps"]
+        removable = 0
+        for title, fields in [("Unused", self.unused()), ("Write only", self.write_only()), ("Read only", self.read_only())]:
+            bits = sum(f.width or 0 for f in fields)
+            removable += bits
+            lines.append(f"{title}: {len(fields)} fields, {bits} bits")
+            lines += [f"    {f.path} ({f.width} bits)" for f in fields]
+
+        groups = self.shared_groups()
+        shared = sum(sum(f.width for f in group) - group[0].width for group in groups)
+        lines.append(f"Non-overlapping live ranges: {len(groups)} groups, {shared} bits")
+        lines += [f"    {group[0].width} bits: " + ", ".join(f.path for f in group) for group in groups]
+
+        keys = self.over_wide_keys()
+        lines.append(f"Over-wide key fields: {len(keys)}")
+        lines += [
+            f"    {f.path} ({f.width} bits, values fit in {needed}): " + ", ".join(f"{table} ({match})" for table, match in f.keys)
+            for f, needed in keys
+        ]
+        lines.append(f"Removable: {removable} bits, shareable: {shared} bits, of {total} bits")
+        return "\n".join(lines)
+
+    def __expand(self, block: P4IRBlockInfo, stack: List[str]) -> None:
+        if block.qualified_name in stack:
+            return
+        stack.append(block.qualified_name)
+        self.__reached.add(block.qualified_name)
+        for step in block.steps:
+            if step[0] == "branch":
+                self.__open_branch(step[1])
+                continue
+            if step[0] == "or":
+                self.__next_branch()
+                continue
+            if step[0] == "end":
+                self.__close_branch()
+                continue
+            if step[0] in ["read", "write"]:
+                for path in self.__meta_leaves(block, step[1]):
+                    self.__add_access(path, step[0], step[2] if step[0] == "write" else None, block)
+                continue
+            target = self.analysis.find(block.instances.get(step[1], step[1]), block)
+            if target is None:
+                continue
+            self.__expand(target, stack)
+            if target.node_type == "P4Table":
+                # One of the actions runs, taken as not exhaustive, the default action may not be listed
+                self.__open_branch(False)
+                for index, action in enumerate(target.actions):
+                    callee = self.analysis.find(action, target)
+                    if index > 0:
+                        self.__next_branch()
+                    if callee is not None:
+                        self.__expand(callee, stack)
+                self.__close_branch()
+        stack.pop()
+
+    def __open_branch(self, exhaustive: bool) -> None:
+        self.__branches.append((dict(self.__reaching), exhaustive, []))
+
+    def __next_branch(self) -> None:
+        entry, _, ends = self.__branches[-1]
+        ends.append(self.__reaching)
+        self.__reaching = dict(entry)
+
+    def __close_branch(self) -> None:
+        entry, exhaustive, ends = self.__branches.pop()
+        ends.append(self.__reaching)
+        if not exhaustive:
+            ends.append(entry)
+        self.__reaching = {
+            path: set().union(*[state.get(path, {-1}) for state in ends])
+            for path in set().union(*ends)
+        }
+
+    def __add_access(self, path: str, kind: str, width: Optional[int], block: P4IRBlockInfo) -> None:
+        field = self.fields[path]
+        position = len(self.trace)
+        self.trace.append((kind, path, block.qualified_name))
+        if kind == "read":
+            field.uses.append(position)
+            field.reaching[position] = sorted(self.__reaching.get(path, {-1}))
+            return
+        field.defs.append(position)
+        self.__reaching[path] = {position}
+        if width is None or field.source_width is None:
+            field.source_width = None
+        else:
+            field.source_width = max(field.source_width, width)
+
+    def __add_keys(self) -> None:
+        for table in self.analysis.tables():
+            if table.qualified_name not in self.__reached:
+                continue
+            for path, match_type in table.keys:
+                for leaf in self.__meta_leaves(table, path):
+                    self.fields[leaf].keys.append((table.qualified_name, match_type))
+
+    def __add_external(self) -> None:
+        for block in self.analysis.blocks.values():
+            if block.qualified_name in self.__reached:
+                continue
+            for path in block.reads | block.writes:
+                for leaf in self.__meta_leaves(block, path):
+                    self.fields[leaf].external = True
+
+    def __meta_leaves(self, block: P4IRBlockInfo, path: Optional[str]) -> List[str]:
+        # Leaf fields of a path from a metadata parameter of the block or of its control
+        if not path:
+            return []
+        root, _, rest = path.partition(".")
+        control = self.analysis.blocks.get(block.qualified_name.split(".")[0], block)
+        type_name = block.parameters.get(root, control.parameters.get(root))
+        if type_name != self.meta_type:
+            return []
+        path = f"{META_PREFIX}.{rest}"
+        if path not in self.__leaves:
+            self.__leaves[path] = [leaf for leaf in self.fields if leaf == path or leaf.startswith(path + ".")]
+        return self.__leaves[path]
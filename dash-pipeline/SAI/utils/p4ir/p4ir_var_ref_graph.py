@@ -1,18 +1,36 @@
 import json
 import jsonpath_ng as jsonpath
 import jsonpath_ng.ext as jsonpath_ext
-from typing import Any, Dict, Callable, List
+from typing import Any, Dict, Callable, List, Optional
 from .p4ir_tree import P4IRTree
+from .p4ir_analysis import P4IRAnalysis
 from .p4ir_var_info import P4IRVarInfo
 from .p4ir_var_ref_info import P4IRVarRefInfo
 
 
 class P4VarRefGraph:
-    def __init__(self, ir: P4IRTree) -> None:
+    @staticmethod
+    def from_analysis(analysis: P4IRAnalysis) -> "P4VarRefGraph":
+        """
+        Build the graph from a (cached) IR analysis instead of walking the IR.
+        """
+        graph = P4VarRefGraph(None)
+        graph.counters = {name: var for name, var in analysis.counters.items() if var.type_name == "counter"}
+        for var_ir_name, caller_name in analysis.counter_refs:
+            if var_ir_name not in graph.counters:
+                continue
+            var = graph.counters[var_ir_name]
+            caller = analysis.blocks[caller_name]
+            var_ref = P4IRVarRefInfo(var, caller.ir_id, caller.node_type, caller.name)
+            graph.var_refs.setdefault(var.code_name, []).append(var_ref)
+        return graph
+
+    def __init__(self, ir: Optional[P4IRTree]) -> None:
         self.ir = ir
         self.counters: Dict[str, P4IRVarInfo] = {}
         self.var_refs: Dict[str, List[P4IRVarRefInfo]] = {}
-        self.__build_graph()
+        if ir is not None:
+            self.__build_graph()
 
     def __build_graph(self) -> None:
         self.__build_counter_list()
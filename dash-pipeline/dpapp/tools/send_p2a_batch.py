@@ -0,0 +1,303 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Scapy-free batch sender of DASH P2A (pipeline to dpapp) frames.
+
+Frames carry the same headers as send_p2a_pkt.py (DASH_PACKET_META,
+DASH_FLOW_KEY, DASH_FLOW_DATA and the customer packet), but are encoded
+with struct into a preallocated buffer. Every flow key is encoded once,
+the flow action only patches the packet_subtype byte, and frames are sent
+through a raw AF_PACKET socket in sendmmsg() batches at a target rate.
+
+Flow key file: one key per line, same format as --flow-key of
+send_p2a_pkt.py, e.g.
+    eni_mac=00:cc:cc:cc:cc:cc,vnet_id=343,src_ip=10.1.1.10,dst_ip=10.1.2.50,src_port=1234,dst_port=80
+"""
+import argparse
+import ctypes
+import ipaddress
+import socket
+import struct
+import sys
+import time
+
+DPAPP_ETHER_TYPE = 0x876D
+FLOW_ACTIONS = { "CREATE":1, "UPDATE":2, "DELETE":3 }
+IP_PROTO_TCP = 6
+IP_PROTO_UDP = 17
+
+ETHER = struct.Struct("!6s6sH")
+# packet_source, packet_type:4|packet_subtype:4, length
+PACKET_META = struct.Struct("!BBH")
+# eni_mac, vnet_id, src_ip, dst_ip, src_port, dst_port, ip_proto, reserved:7|is_ip_v6:1
+FLOW_KEY = struct.Struct("!6sH16s16sHHBB")
+# reserved:7|is_unidirectional:1, direction, version, actions, meter_class
+FLOW_DATA = struct.Struct("!BHIII")
+IPV4 = struct.Struct("!BBHHHBBH4s4s")
+IPV6 = struct.Struct("!IHBB16s16s")
+UDP = struct.Struct("!HHHH")
+TCP = struct.Struct("!HHIIBBHHH")
+
+PACKET_META_OFFSET = ETHER.size
+PACKET_SUBTYPE_OFFSET = PACKET_META_OFFSET + 1
+DASH_META_LENGTH = PACKET_META.size + FLOW_KEY.size + FLOW_DATA.size
+
+CUSTOMER_DMAC = "00:02:02:02:02:02"
+PAYLOAD = b"a" * 16
+
+FLOW_KEY_DEFAULTS = {
+    "eni_mac": "0:0:0:0:0:0",
+    "vnet_id": "2",
+    "src_ip": "::1.1.1.1",
+    "dst_ip": "::2.2.2.2",
+    "src_port": "0x5566",
+    "dst_port": "0x6677",
+    "ip_proto": str(IP_PROTO_UDP),
+    "is_ip_v6": "0",
+}
+
+
+def get_mac(interface):
+    try:
+        mac = open('/sys/class/net/'+interface+'/address').readline().strip()
+    except:
+        mac = "00:00:00:00:00:00"
+    return mac
+
+
+def mac_in_bytes(mac):
+    return bytes(int(b, 16) for b in mac.split(":"))
+
+
+def ip6_in_bytes(ip):
+    """
+    Flow key IP field is 128 bits wide, IPv4 addresses are stored as ::a.b.c.d
+    """
+
+    addr = ipaddress.ip_address(ip)
+    if addr.version == 4:
+        return bytes(12) + addr.packed
+    return addr.packed
+
+
+def checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack("!%dH" % (len(data) // 2), data))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def parse_flow_key(text):
+    """
+    Parse "eni_mac=...,vnet_id=...,..." string into a dict with default values for missing fields
+    """
+
+    flow_key = dict(FLOW_KEY_DEFAULTS)
+    if text:
+        flow_key.update(kv.strip().split("=") for kv in text.split(","))
+    return flow_key
+
+
+class P2AFrameEncoder:
+    """
+    Encode P2A frames, copied into FrameBatch slots for sending
+    """
+
+    def __init__(self, dst_mac, src_mac):
+        self.ether = ETHER.pack(mac_in_bytes(dst_mac), mac_in_bytes(src_mac), DPAPP_ETHER_TYPE)
+
+    def encode_customer_packet(self, key):
+        is_ip_v6 = int(key["is_ip_v6"])
+        ip_proto = int(key["ip_proto"])
+        src_ip = ip6_in_bytes(key["src_ip"])
+        dst_ip = ip6_in_bytes(key["dst_ip"])
+        sport = int(key["src_port"], 0)
+        dport = int(key["dst_port"], 0)
+
+        if ip_proto == IP_PROTO_TCP:
+            # SYN with 8K window, as scapy TCP() defaults
+            l4_len = TCP.size + len(PAYLOAD)
+            l4 = bytearray(TCP.pack(sport, dport, 0, 0, (TCP.size // 4) << 4, 0x02, 8192, 0, 0) + PAYLOAD)
+            csum_offset = 16
+        else:
+            ip_proto = IP_PROTO_UDP
+            l4_len = UDP.size + len(PAYLOAD)
+            l4 = bytearray(UDP.pack(sport, dport, l4_len, 0) + PAYLOAD)
+            csum_offset = 6
+
+        if is_ip_v6:
+            pseudo = src_ip + dst_ip + struct.pack("!IxxxB", l4_len, ip_proto)
+            l3 = IPV6.pack(6 << 28, l4_len, ip_proto, 64, src_ip, dst_ip)
+            ether_type = 0x86DD
+        else:
+            src_ip, dst_ip = src_ip[12:], dst_ip[12:]
+            pseudo = src_ip + dst_ip + struct.pack("!xBH", ip_proto, l4_len)
+            header = IPV4.pack(0x45, 0, IPV4.size + l4_len, 1, 0, 64, ip_proto, 0, src_ip, dst_ip)
+            l3 = header[:10] + struct.pack("!H", checksum(header)) + header[12:]
+            ether_type = 0x0800
+
+        struct.pack_into("!H", l4, csum_offset, checksum(pseudo + bytes(l4)))
+
+        return ETHER.pack(mac_in_bytes(CUSTOMER_DMAC), bytes(6), ether_type) + l3 + bytes(l4)
+
+    def encode(self, key, flow_action=FLOW_ACTIONS["CREATE"]):
+        """
+        Encode complete frame for a parsed flow key
+        """
+
+        frame = bytearray(self.ether)
+        frame += PACKET_META.pack(0, flow_action & 0xF, DASH_META_LENGTH)
+        frame += FLOW_KEY.pack(mac_in_bytes(key["eni_mac"]), int(key["vnet_id"]),
+                               ip6_in_bytes(key["src_ip"]), ip6_in_bytes(key["dst_ip"]),
+                               int(key["src_port"], 0), int(key["dst_port"], 0),
+                               int(key["ip_proto"]), int(key["is_ip_v6"]) & 1)
+        # direction OUTBOUND
+        frame += FLOW_DATA.pack(0, 1, 0, 0, 0)
+        frame += self.encode_customer_packet(key)
+        return frame
+
+
+class iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class msghdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p), ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.c_void_p), ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p), ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+
+class mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", msghdr), ("msg_len", ctypes.c_uint)]
+
+
+class FrameBatch:
+    """
+    Preallocated buffer of fixed-size frame slots with sendmmsg() descriptors
+    """
+
+    def __init__(self, size, slot_len):
+        self.size = size
+        self.slot_len = slot_len
+        self.buffer = bytearray(size * slot_len)
+        self.count = 0
+
+        # Keep the exported view alive: slots are addressed by sendmmsg() descriptors
+        self.view = (ctypes.c_char * len(self.buffer)).from_buffer(self.buffer)
+        base = ctypes.addressof(self.view)
+        self.iovecs = (iovec * size)()
+        self.msgs = (mmsghdr * size)()
+        for i in range(size):
+            self.iovecs[i].iov_base = base + i * slot_len
+            self.msgs[i].msg_hdr.msg_iov = ctypes.addressof(self.iovecs[i])
+            self.msgs[i].msg_hdr.msg_iovlen = 1
+
+    def add(self, frame):
+        offset = self.count * self.slot_len
+        self.buffer[offset:offset + len(frame)] = frame
+        self.iovecs[self.count].iov_len = len(frame)
+        self.count += 1
+
+    def full(self):
+        return self.count == self.size
+
+
+class P2ASender:
+    """
+    Send frame batches through a raw AF_PACKET socket at a target rate
+    """
+
+    def __init__(self, interface, rate=0):
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW)
+        self.sock.bind((interface, 0))
+        self.rate = rate
+        self.sent = 0
+        self.start = time.monotonic()
+
+        try:
+            self.libc = ctypes.CDLL(None, use_errno=True)
+            self.sendmmsg = self.libc.sendmmsg
+        except (OSError, AttributeError):
+            self.sendmmsg = None
+
+    def send(self, batch):
+        if self.rate:
+            delay = self.start + (self.sent + batch.count) / self.rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        if self.sendmmsg is not None:
+            done = 0
+            while done < batch.count:
+                ret = self.sendmmsg(self.sock.fileno(), ctypes.byref(batch.msgs, done * ctypes.sizeof(mmsghdr)),
+                                    batch.count - done, 0)
+                if ret < 0:
+                    raise OSError(ctypes.get_errno(), "sendmmsg failed")
+                done += ret
+        else:
+            view = memoryview(batch.buffer)
+            for i in range(batch.count):
+                self.sock.send(view[i * batch.slot_len:i * batch.slot_len + batch.iovecs[i].iov_len])
+
+        self.sent += batch.count
+        batch.count = 0
+
+
+def read_flow_keys(path):
+    with open(path) as f:
+        return [parse_flow_key(line.strip()) for line in f
+                if line.strip() and not line.lstrip().startswith("#")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch packet generator on behalf of DASH pipeline")
+    parser.add_argument("--flow-actions", type=str, default="CREATE,UPDATE,DELETE",
+                        help="Comma separated flow actions applied in order to all keys, CREATE|UPDATE|DELETE")
+    parser.add_argument("--flow-key-file", type=str,
+                        help="File with flow keys, one eni_mac=,vnet_id=,src_ip=,dst_ip=,... key per line")
+    parser.add_argument("--flow-key", type=str,
+                        help="Single flow key, string style eni_mac=,vnet_id=,src_ip=,dst_ip=,...")
+    parser.add_argument("--from-port", type=str, default="veth4",
+                        help="DASH pipeline port name")
+    parser.add_argument("--to-port", type=str, default="veth5",
+                        help="cpu port name")
+    parser.add_argument("--rate", type=int, default=0,
+                        help="Target rate in packets per second, 0 - as fast as possible")
+    parser.add_argument("--batch", type=int, default=64,
+                        help="Frames per sendmmsg() call")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Number of times the flow action sequence is repeated")
+    args = parser.parse_args()
+
+    try:
+        flow_actions = [FLOW_ACTIONS[name.strip()] for name in args.flow_actions.split(",")]
+    except KeyError as e:
+        print(f"Invalid flow action name: {e}")
+        sys.exit(1)
+
+    if args.flow_key_file:
+        flow_keys = read_flow_keys(args.flow_key_file)
+    else:
+        flow_keys = [parse_flow_key(args.flow_key)]
+
+    encoder = P2AFrameEncoder(get_mac(args.to_port), get_mac(args.from_port))
+    frames = [encoder.encode(key) for key in flow_keys]
+
+    batch = FrameBatch(args.batch, max(len(frame) for frame in frames))
+    sender = P2ASender(args.from_port, args.rate)
+
+    for _ in range(args.repeat):
+        for flow_action in flow_actions:
+            for frame in frames:
+                frame[PACKET_SUBTYPE_OFFSET] = flow_action & 0xF
+                batch.add(frame)
+                if batch.full():
+                    sender.send(batch)
+            if batch.count:
+                sender.send(batch)
+
+    elapsed = time.monotonic() - sender.start
+    print(f"Sent {sender.sent} frames in {elapsed:.3f}s ({sender.sent / max(elapsed, 1e-9):.0f} pps)")
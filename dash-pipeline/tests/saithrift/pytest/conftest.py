@@ -1,5 +1,5 @@
 import pytest
-from saithrift_rpc_client import SaithriftRpcClient
+from saithrift_rpc_client import SaithriftRpcClient, SaithriftClientPool
 
 myclient = None
 @pytest.fixture
@@ -10,4 +10,10 @@ def saithrift_client():
         myclient = SaithriftRpcClient().client
     return myclient
 
+@pytest.fixture(scope="session")
+def saithrift_client_pool():
+    print ("Called fixture saithrift_client_pool()")
+    pool = SaithriftClientPool()
+    yield pool
+    pool.close()
 
@@ -1,17 +1,37 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 import pytest
 
 from thrift.transport import TSocket
 from thrift.transport import TTransport
 from thrift.protocol import TBinaryProtocol
+from thrift.protocol import TCompactProtocol
 from sai_thrift import sai_rpc
+from sai_thrift.sai_headers import SAI_STATUS_SUCCESS
+from sai_thrift.ttypes import sai_thrift_exception
 
 THRIFT_PORT = 9092
 
+TRANSPORTS = {
+    "buffered": TTransport.TBufferedTransport,
+    "framed": TTransport.TFramedTransport,
+}
+
+PROTOCOLS = {
+    "binary": TBinaryProtocol.TBinaryProtocol,
+    "compact": TCompactProtocol.TCompactProtocol,
+}
+
 class SaithriftRpcClient:
-    def __init__(self, port=THRIFT_PORT, server = 'localhost'):
+    def __init__(self, port=THRIFT_PORT, server = 'localhost', transport="buffered", protocol="binary"):
         self.transport = None
         self.port = port
         self.server = server
+        self.transport_type = transport
+        self.protocol_type = protocol
         self.createRpcClient()
 
     def createRpcClient(self):
@@ -20,11 +40,125 @@ class SaithriftRpcClient:
         """
 
         print ("making thrift connection to %s:%d" % (self.server, self.port))
-        self.transport = TSocket.TSocket(self.server, THRIFT_PORT)
-        self.transport = TTransport.TBufferedTransport(self.transport)
-        self.protocol = TBinaryProtocol.TBinaryProtocol(self.transport)
+        self.transport = TSocket.TSocket(self.server, self.port)
+        self.transport = TRANSPORTS[self.transport_type](self.transport)
+        self.protocol = PROTOCOLS[self.protocol_type](self.transport)
 
         self.client = sai_rpc.Client(self.protocol)
-        self.transport.open()    
+        self.transport.open()
         print ("sai-thrift connection established with %s:%d" % (self.server, self.port))
-       
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+
+class SaithriftStatusClient:
+    """
+    sai_rpc client proxy recording the status of the RPCs made through it.
+
+    sai_thrift adapter functions report the status in the module-global
+    sai_adapter.status, which is shared by all threads. The proxy records it
+    from the RPC itself, so a connection held by one thread has its own status.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.status = SAI_STATUS_SUCCESS
+
+    def __getattr__(self, name):
+        rpc = getattr(self.client, name)
+        if not callable(rpc):
+            return rpc
+
+        def call(*args, **kwargs):
+            try:
+                return rpc(*args, **kwargs)
+            except sai_thrift_exception as e:
+                self.status = e.status
+                raise
+
+        return call
+
+
+class SaithriftClientPool:
+    """
+    Pool of saithrift connections with a thread-safe dispatcher.
+
+    A thrift connection carries one outstanding call at a time, so concurrency
+    comes from the number of connections: every call dispatched to the pool runs
+    on a worker thread which holds one connection for the duration of the call.
+    The framed transport must match the saithrift server configuration.
+
+    Every call returns its result together with its own SAI status, the global
+    sai_adapter.status is not meaningful for calls made through the pool.
+
+    Usage:
+        pool = SaithriftClientPool(size=8)
+        futures = [pool.submit(sai_thrift_create_vnet, vni=vni) for vni in range(100, 200)]
+        vnets = [f.result() for f in futures]  # (oid, status) tuples
+    """
+
+    def __init__(self, size=4, port=THRIFT_PORT, server='localhost', transport="buffered", protocol="binary"):
+        self.size = size
+        self.connections = [SaithriftRpcClient(port=port, server=server, transport=transport, protocol=protocol)
+                            for _ in range(size)]
+        self.idle = queue.Queue()
+        for connection in self.connections:
+            self.idle.put(SaithriftStatusClient(connection.client))
+
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="saithrift")
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    @contextmanager
+    def client(self):
+        """
+        Borrow an idle connection, blocks until one is available.
+        The connection is held exclusively until it is given back.
+        """
+
+        client = self.idle.get()
+        try:
+            yield client
+        finally:
+            self.idle.put(client)
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call sai_thrift adapter function (e.g. sai_thrift_create_vnet) on a pooled connection
+        in the calling thread.
+        Returns tuple: (result, SAI status of the call)
+        """
+
+        with self.client() as client:
+            client.status = SAI_STATUS_SUCCESS
+            result = func(client, *args, **kwargs)
+            status = client.status
+
+        with self.lock:
+            self.calls += 1
+
+        return result, status
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Dispatch sai_thrift adapter function to a worker thread,
+        returns a Future of (result, status)
+        """
+
+        return self.executor.submit(self.call, func, *args, **kwargs)
+
+    def map(self, func, *iterables):
+        """
+        Dispatch func for every set of positional arguments,
+        (result, status) tuples are returned in order
+        """
+
+        return list(self.executor.map(lambda *args: self.call(func, *args), *iterables))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for connection in self.connections:
+            connection.close()
@@ -0,0 +1,32 @@
+import pytest
+
+from sai_thrift.sai_headers import *
+from sai_thrift.sai_adapter import *
+from sai_thrift.ttypes  import *
+
+from saithrift_poller import SaithriftPoller
+
+@pytest.mark.saithrift
+@pytest.mark.bmv2
+@pytest.mark.switch
+def test_sai_thrift_poll_port_stats(saithrift_client):
+    attr = sai_thrift_get_switch_attribute(
+        saithrift_client, number_of_active_ports=True)
+    number_of_active_ports = attr['number_of_active_ports']
+
+    attr = sai_thrift_get_switch_attribute(
+        saithrift_client,
+        port_list=sai_thrift_object_list_t(idlist=[], count=int(number_of_active_ports)))
+    port_list = attr['port_list'].idlist
+
+    counter_ids = [SAI_PORT_STAT_IF_IN_UCAST_PKTS, SAI_PORT_STAT_IF_OUT_UCAST_PKTS]
+    poller = SaithriftPoller(saithrift_client, "port", port_list)
+    timestamps, values = poller.poll_stats_series(counter_ids, samples=3, interval=0.5)
+    assert(values.shape == (3, len(port_list), len(counter_ids)))
+    assert((timestamps[1:] > timestamps[:-1]).all())
+
+    rates = SaithriftPoller.rates(timestamps, values)
+    assert(rates.shape == (2, len(port_list), len(counter_ids)))
+    assert((rates >= 0).all())
+
+    print ("test_sai_thrift_poll_port_stats OK")
@@ -0,0 +1,19 @@
+import pytest
+
+from sai_thrift.sai_headers import *
+from sai_thrift.sai_adapter import *
+from sai_thrift.ttypes  import *
+
+@pytest.mark.saithrift
+@pytest.mark.bmv2
+def test_saithrift_client_pool(saithrift_client_pool):
+    """ Test concurrent get calls dispatched over pooled connections"""
+    futures = [saithrift_client_pool.submit(sai_thrift_get_switch_attribute, number_of_active_ports=True)
+               for _ in range(4 * saithrift_client_pool.size)]
+    results = [f.result() for f in futures]
+
+    assert(all(status == SAI_STATUS_SUCCESS for _, status in results))
+    results = [attr['number_of_active_ports'] for attr, _ in results]
+    assert(len(set(results)) == 1)
+    assert(results[0] != 0)
+    print ("test_saithrift_client_pool OK")
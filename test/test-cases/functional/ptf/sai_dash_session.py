@@ -0,0 +1,167 @@
+# Copyright 2022-present Intel Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+SAI objects shared between test cases of one PTF run.
+
+Underlay objects (RIF, next hop, neighbor, route) are created once and kept
+in a reference-counted cache. Overlay objects (VNET, ENI and their entries)
+are kept between tests by the applied VnetTopology state. A test acquires an object in place of
+creating it and the reference is released by a test cleanup, which runs even
+if setUp fails; the object stays on the switch with zero references until a
+later test acquires it again or the session ends. At the end of the test
+module all unreferenced objects are removed and cached objects still
+referenced are reported as leaks.
+"""
+
+import unittest
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sai_thrift.sai_headers import *
+from sai_base_test import *
+
+from sai_dash_topology import applied_topology
+
+
+@dataclass
+class SharedObject:
+    """
+    Cached SAI object
+
+    handle: OID or entry structure
+    attrs: representation of create attributes, an object is reused
+           only when requested with the same attributes
+    remove: function removing the object, called with client and handle
+    """
+
+    handle: object
+    attrs: str
+    remove: object
+    refcount: int = 0
+
+
+class SharedObjectCache:
+    """
+    Reference-counted SAI objects shared between test cases
+    """
+
+    def __init__(self):
+        self.objects = OrderedDict()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, test, key, attrs, create, remove):
+        """
+        Return handle of the object identified by key, create it if needed.
+        The reference is released by a cleanup of the acquiring test.
+        """
+
+        attrs = repr(attrs)
+        obj = self.objects.get(key)
+        if obj is not None and obj.attrs != attrs:
+            # Same object is required with other attributes: recreate it together
+            # with everything created after it, since those objects may depend on it
+            keys = list(self.objects)
+            keys = keys[keys.index(key):]
+            held = [k for k in keys if self.objects[k].refcount > 0]
+            test.assertFalse(held, f"Shared object {key} is requested with other attributes "
+                                   f"while {held} are in use")
+            self.remove(test, keys)
+            obj = None
+
+        if obj is None:
+            obj = SharedObject(handle=create(), attrs=attrs, remove=remove)
+            self.objects[key] = obj
+            self.created += 1
+        else:
+            self.reused += 1
+
+        obj.refcount += 1
+        test.addCleanup(self.release, obj)
+
+        return obj.handle
+
+    @staticmethod
+    def release(obj):
+        obj.refcount -= 1
+
+    def leaks(self):
+        return [(key, obj.refcount) for key, obj in self.objects.items() if obj.refcount > 0]
+
+    def remove(self, test, keys=None):
+        """
+        Remove objects (all unreferenced cached objects by default) in reverse creation order
+        """
+
+        if keys is None:
+            keys = [key for key, obj in self.objects.items() if obj.refcount == 0]
+
+        for key in reversed(keys):
+            obj = self.objects[key]
+            test.assertEqual(obj.refcount, 0, f"Shared object {key} is still in use")
+            obj.remove(test.client, obj.handle)
+            test.assertEqual(test.status(), SAI_STATUS_SUCCESS)
+            del self.objects[key]
+
+
+class SessionState:
+    """
+    State kept on the switch between test cases of one PTF run
+    """
+
+    def __init__(self):
+        self.shared_objects = SharedObjectCache()
+        self.topology = applied_topology
+        self.cleanup_registered = False
+
+    def flush(self, test):
+        """
+        Remove all objects kept between test cases and no longer referenced
+        """
+
+        self.topology.remove(test)
+        self.shared_objects.remove(test)
+
+    def register_cleanup(self, test):
+        """
+        Remove objects left by the last test of the module and check for leaks
+        """
+
+        if self.cleanup_registered:
+            return
+
+        def cleanup():
+            self.cleanup_registered = False
+            leaks = self.shared_objects.leaks()
+
+            print(f"Shared objects: {self.shared_objects.created} created, "
+                  f"{self.shared_objects.reused} reused")
+
+            if self.shared_objects.objects or self.topology.objects:
+                test.createRpcClient()
+                try:
+                    self.flush(test)
+                finally:
+                    test.transport.close()
+
+            if leaks:
+                raise AssertionError(f"Shared objects not released by tests: {leaks}")
+
+        unittest.addModuleCleanup(cleanup)
+        self.cleanup_registered = True
+
+
+# State shared by all tests of the PTF run
+session_state = SessionState()
@@ -0,0 +1,374 @@
+# Copyright 2022-present Intel Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Declarative DASH VNET topology description and dependency-aware apply.
+
+A VnetTopology describes SAI objects by name. Objects may reference each
+other with TopologyRef values placed in the key or attribute dicts, which
+makes the topology a DAG. The DAG is applied level by level, every level
+holding only objects whose dependencies already exist. A VnetTopologyState
+remembers what was applied, so the next topology is applied as a diff:
+unchanged objects are reused, stale ones are removed, new ones created.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from sai_thrift.sai_headers import *
+from sai_base_test import *
+
+
+# Object types supported by the topology and whether they are entries
+# (key structure) or OID based objects
+TOPOLOGY_OBJECT_TYPES = {
+    "vip_entry": True,
+    "direction_lookup_entry": True,
+    "global_trusted_vni_entry": True,
+    "vnet": False,
+    "outbound_routing_group": False,
+    "eni": False,
+    "eni_ether_address_map_entry": True,
+    "inbound_routing_entry": True,
+    "pa_validation_entry": True,
+    "outbound_routing_entry": True,
+    "outbound_ca_to_pa_entry": True,
+}
+
+
+def eni_default_attrs():
+    """
+    Default ENI attributes used by the VNET tests
+    """
+
+    return {
+        "cps": 10000,
+        "pps": 100000,
+        "flows": 100000,
+        "admin_state": True,
+        "ha_scope_id": 0,
+        "vm_underlay_dip": sai_ipaddress("0.0.0.0"),
+        "vm_vni": 1,
+        "vnet_id": 1,
+        "pl_sip" : sai_ipaddress("2001:0db8:85a3:0000:0000:8a2e:0370:7334"),
+        "pl_sip_mask": sai_ipaddress("2001:0db8:85a3:0000:0000:0000:0000:0000"),
+        "pl_underlay_sip": sai_ipaddress("10.0.0.18"),
+        "v4_meter_policy_id": 0,
+        "v6_meter_policy_id": 0,
+        "dash_tunnel_dscp_mode": SAI_DASH_TUNNEL_DSCP_MODE_PRESERVE_MODEL,
+        "dscp": 0,
+        "inbound_v4_stage1_dash_acl_group_id": 0,
+        "inbound_v4_stage2_dash_acl_group_id": 0,
+        "inbound_v4_stage3_dash_acl_group_id": 0,
+        "inbound_v4_stage4_dash_acl_group_id": 0,
+        "inbound_v4_stage5_dash_acl_group_id": 0,
+        "outbound_v4_stage1_dash_acl_group_id": 0,
+        "outbound_v4_stage2_dash_acl_group_id": 0,
+        "outbound_v4_stage3_dash_acl_group_id": 0,
+        "outbound_v4_stage4_dash_acl_group_id": 0,
+        "outbound_v4_stage5_dash_acl_group_id": 0,
+        "inbound_v6_stage1_dash_acl_group_id": 0,
+        "inbound_v6_stage2_dash_acl_group_id": 0,
+        "inbound_v6_stage3_dash_acl_group_id": 0,
+        "inbound_v6_stage4_dash_acl_group_id": 0,
+        "inbound_v6_stage5_dash_acl_group_id": 0,
+        "outbound_v6_stage1_dash_acl_group_id": 0,
+        "outbound_v6_stage2_dash_acl_group_id": 0,
+        "outbound_v6_stage3_dash_acl_group_id": 0,
+        "outbound_v6_stage4_dash_acl_group_id": 0,
+        "outbound_v6_stage5_dash_acl_group_id": 0,
+        "disable_fast_path_icmp_flow_redirection": 0,
+        "outbound_routing_group_id": 0,
+        "full_flow_resimulation_requested": False,
+        "max_resimulated_flow_per_second": 0
+    }
+
+
+@dataclass(frozen=True)
+class TopologyRef:
+    """
+    Reference to another topology object by name.
+    Resolved to the object OID when the topology is applied.
+    """
+
+    name: str
+
+
+@dataclass
+class TopologyNode:
+    """
+    Single SAI object of the topology
+
+    name: unique object name inside the topology
+    obj_type: SAI object type name (e.g. "eni", "vip_entry")
+    key: entry key fields, None for OID based objects
+    attrs: create attributes
+    """
+
+    name: str
+    obj_type: str
+    key: dict = None
+    attrs: dict = field(default_factory=dict)
+
+    def refs(self):
+        values = list(self.attrs.values())
+        if self.key is not None:
+            values += list(self.key.values())
+        return [value.name for value in values if isinstance(value, TopologyRef)]
+
+
+class VnetTopology:
+    """
+    Declarative description of the DASH VNET objects required by a test
+    """
+
+    def __init__(self):
+        self.nodes = OrderedDict()
+
+    def add(self, name, obj_type, key=None, **attrs):
+        """
+        Add object to the topology and return a reference to it
+        """
+
+        if obj_type not in TOPOLOGY_OBJECT_TYPES:
+            raise ValueError(f"Unsupported topology object type: {obj_type}")
+        if name in self.nodes:
+            raise ValueError(f"Duplicate topology object name: {name}")
+        if TOPOLOGY_OBJECT_TYPES[obj_type] != (key is not None):
+            raise ValueError(f"Object {name} of type {obj_type}: wrong key definition")
+
+        self.nodes[name] = TopologyNode(name=name, obj_type=obj_type, key=key, attrs=attrs)
+        return TopologyRef(name)
+
+    def vip(self, vip, name="vip"):
+        return self.add(name, "vip_entry", key={"vip": sai_ipaddress(vip)},
+                        action=SAI_VIP_ENTRY_ACTION_ACCEPT)
+
+    def direction_lookup(self, vni, name=None):
+        return self.add(name or f"direction_lookup_{vni}", "direction_lookup_entry", key={"vni": vni},
+                        action=SAI_DIRECTION_LOOKUP_ENTRY_ACTION_SET_OUTBOUND_DIRECTION)
+
+    def global_trusted_vni(self, vni, name=None):
+        return self.add(name or f"trusted_vni_{vni}", "global_trusted_vni_entry",
+                        key={"vni_range": sai_thrift_u32_range_t(min=vni, max=vni)})
+
+    def vnet(self, vni, name=None):
+        return self.add(name or f"vnet_{vni}", "vnet", vni=vni)
+
+    def outbound_routing_group(self, name, disabled=False):
+        return self.add(name, "outbound_routing_group", disabled=disabled)
+
+    def eni(self, name, **kwargs):
+        attrs = eni_default_attrs()
+        attrs.update(kwargs)
+        return self.add(name, "eni", **attrs)
+
+    def eni_mac_map(self, eni, mac, name=None):
+        return self.add(name or f"{eni.name}_mac_{mac}", "eni_ether_address_map_entry",
+                        key={"address": mac}, eni_id=eni)
+
+    def inbound_routing(self, name, eni, vni, sip, sip_mask, src_vnet=None):
+        """
+        Inbound routing entry with TUNNEL_DECAP_PA_VALIDATE action if src_vnet
+        is defined, otherwise with TUNNEL_DECAP action
+        """
+
+        attrs = {"meter_class_or": 0, "meter_class_and": -1}
+        if src_vnet is not None:
+            attrs.update(action=SAI_INBOUND_ROUTING_ENTRY_ACTION_TUNNEL_DECAP_PA_VALIDATE,
+                         src_vnet_id=src_vnet)
+        else:
+            attrs.update(action=SAI_INBOUND_ROUTING_ENTRY_ACTION_TUNNEL_DECAP)
+
+        key = {"vni": vni, "eni_id": eni, "sip": sai_ipaddress(sip),
+               "sip_mask": sai_ipaddress(sip_mask), "priority": 1}
+        return self.add(name, "inbound_routing_entry", key=key, **attrs)
+
+    def pa_validation(self, sip, vnet, name=None):
+        return self.add(name or f"pa_validation_{vnet.name}_{sip}", "pa_validation_entry",
+                        key={"sip": sai_ipaddress(sip), "vnet_id": vnet},
+                        action=SAI_PA_VALIDATION_ENTRY_ACTION_PERMIT)
+
+    def outbound_routing(self, name, routing_group, lpm, dst_vnet=None, overlay_ip=None,
+                         counter_id=None, dash_tunnel_id=0):
+        """
+        Outbound routing entry with ROUTE_VNET_DIRECT action if overlay_ip is defined,
+        ROUTE_VNET if only dst_vnet is defined and ROUTE_DIRECT otherwise
+        """
+
+        attrs = {"counter_id": counter_id, "meter_class_or": 0, "meter_class_and": -1,
+                 "dash_tunnel_id": dash_tunnel_id, "routing_actions_disabled_in_flow_resimulation": 0}
+        if dst_vnet is None:
+            attrs.update(action=SAI_OUTBOUND_ROUTING_ENTRY_ACTION_ROUTE_DIRECT)
+        elif overlay_ip is None:
+            attrs.update(action=SAI_OUTBOUND_ROUTING_ENTRY_ACTION_ROUTE_VNET, dst_vnet_id=dst_vnet)
+        else:
+            attrs.update(action=SAI_OUTBOUND_ROUTING_ENTRY_ACTION_ROUTE_VNET_DIRECT, dst_vnet_id=dst_vnet,
+                         overlay_ip=sai_ipaddress(overlay_ip))
+
+        key = {"outbound_routing_group_id": routing_group, "destination": sai_ipprefix(lpm)}
+        return self.add(name, "outbound_routing_entry", key=key, **attrs)
+
+    def outbound_ca_to_pa(self, dst_vnet, dip, underlay_dip, use_dst_vnet_vni=True,
+                          overlay_dmac=None, dash_tunnel_id=0, name=None):
+        return self.add(name or f"ca_to_pa_{dst_vnet.name}_{dip}", "outbound_ca_to_pa_entry",
+                        key={"dst_vnet_id": dst_vnet, "dip": sai_ipaddress(dip)},
+                        action=SAI_OUTBOUND_CA_TO_PA_ENTRY_ACTION_SET_TUNNEL_MAPPING,
+                        underlay_dip=sai_ipaddress(underlay_dip),
+                        use_dst_vnet_vni=use_dst_vnet_vni,
+                        overlay_dmac=overlay_dmac,
+                        meter_class_or=0,
+                        dash_tunnel_id=dash_tunnel_id,
+                        flow_resimulation_requested=False,
+                        routing_actions_disabled_in_flow_resimulation=0)
+
+    def levels(self):
+        """
+        Resolve the topology into DAG levels.
+        Returns dict: node name -> level, where level 0 objects have no dependencies.
+        """
+
+        levels = {}
+        visiting = set()
+
+        def resolve(name):
+            if name in levels:
+                return levels[name]
+            if name not in self.nodes:
+                raise ValueError(f"Reference to undefined topology object: {name}")
+            if name in visiting:
+                raise ValueError(f"Dependency cycle detected at topology object: {name}")
+
+            visiting.add(name)
+            levels[name] = 1 + max((resolve(dep) for dep in self.nodes[name].refs()), default=-1)
+            visiting.discard(name)
+            return levels[name]
+
+        for name in self.nodes:
+            resolve(name)
+
+        return levels
+
+    def fingerprints(self):
+        """
+        Compute identity of every object: name, object type, key and attributes
+        including identities of referenced objects. An object is reused between
+        two topologies only if its fingerprint is the same. The name keeps two
+        objects with the same attributes from sharing one handle.
+        """
+
+        fingerprints = {}
+
+        def substitute(values):
+            return tuple(sorted((k, fingerprints[v.name] if isinstance(v, TopologyRef) else repr(v))
+                                for k, v in values.items()))
+
+        for name in sorted(self.nodes, key=self.levels().get):
+            node = self.nodes[name]
+            key = substitute(node.key) if node.key is not None else None
+            fingerprints[name] = (name, node.obj_type, key, substitute(node.attrs))
+
+        return fingerprints
+
+
+@dataclass
+class AppliedObject:
+    """
+    Object created on the switch by a topology apply
+    """
+
+    obj_type: str
+    level: int
+    handle: object
+
+
+class VnetTopologyState:
+    """
+    Objects applied by the previous topology, keyed by fingerprint
+    """
+
+    def __init__(self):
+        self.objects = {}
+
+    def apply(self, test, topology):
+        """
+        Apply topology as a diff against the currently applied objects.
+        Returns dict: topology object name -> OID or entry structure.
+        """
+
+        levels = topology.levels()
+        fingerprints = topology.fingerprints()
+        required = set(fingerprints.values())
+
+        stale = {fp: obj for fp, obj in self.objects.items() if fp not in required}
+        self.remove(test, stale)
+
+        handles = {}
+        for level in range(max(levels.values(), default=-1) + 1):
+            batch = [topology.nodes[name] for name in topology.nodes if levels[name] == level]
+            for node in batch:
+                fp = fingerprints[node.name]
+                if fp in self.objects:
+                    handles[node.name] = self.objects[fp].handle
+                    continue
+
+                handle = self.create(test, node, handles)
+                self.objects[fp] = AppliedObject(obj_type=node.obj_type, level=level, handle=handle)
+                handles[node.name] = handle
+
+        return handles
+
+    @staticmethod
+    def create(test, node, handles):
+        def resolve(values):
+            return {k: handles[v.name] if isinstance(v, TopologyRef) else v for k, v in values.items()}
+
+        create_func = globals()["sai_thrift_create_" + node.obj_type]
+        attrs = resolve(node.attrs)
+        if node.key is None:
+            handle = create_func(test.client, **attrs)
+            test.assertNotEqual(handle, SAI_NULL_OBJECT_ID)
+        else:
+            handle = globals()[f"sai_thrift_{node.obj_type}_t"](switch_id=test.switch_id, **resolve(node.key))
+            create_func(test.client, handle, **attrs)
+        test.assertEqual(test.status(), SAI_STATUS_SUCCESS)
+
+        return handle
+
+    def remove(self, test, objects=None):
+        """
+        Remove objects (all applied objects by default) from the highest DAG level down
+        """
+
+        if objects is None:
+            objects = dict(self.objects)
+
+        for fp, obj in sorted(objects.items(), key=lambda item: item[1].level, reverse=True):
+            globals()["sai_thrift_remove_" + obj.obj_type](test.client, obj.handle)
+            test.assertEqual(test.status(), SAI_STATUS_SUCCESS)
+            del self.objects[fp]
+
+
+# Topology applied by the previous test of the PTF run
+applied_topology = VnetTopologyState()
+
+
+def appliesTopology(func):
+    """
+    Mark configureTest method as fully described by a VnetTopology,
+    so objects applied by it may be reused by the next test
+    """
+
+    func.applies_topology = True
+    return func
@@ -19,6 +19,8 @@ Thrift SAI interface basic DASH utils.
 import functools
 from sai_thrift.sai_headers import *
 from sai_base_test import *
+from sai_dash_topology import *
+from sai_dash_session import *
 
 from random import randint
 from copy import deepcopy
@@ -90,13 +92,58 @@ class VnetObjects(SaiHelperSimplified):
 
 
 class VnetAPI(VnetObjects):
+    # Acquire underlay objects from the session cache
+    # instead of creating them for every test
+    share_objects = False
+
     def setUp(self):
         super(VnetAPI, self).setUp()
 
+        # Objects kept by previous tests are reused only by tests configured for it
+        if not self.reuses_topology():
+            session_state.topology.remove(self)
+        if not self.share_objects:
+            session_state.shared_objects.remove(self)
+
     def tearDown(self):
         self.destroy_teardown_obj()
+        if not self.reuses_topology():
+            session_state.topology.remove(self)
         super(VnetAPI, self).tearDown()
 
+    def reuses_topology(self):
+        configure_test = getattr(self, "configureTest", None)
+        return getattr(configure_test, "applies_topology", False)
+
+    def topology_apply(self, topology):
+        """
+        Apply VnetTopology as a diff against objects applied by the previous test.
+        Returns dict: topology object name -> OID or entry structure.
+        """
+
+        handles = session_state.topology.apply(self, topology)
+        if self.reuses_topology():
+            session_state.register_cleanup(self)
+
+        return handles
+
+    def shared_object_create(self, key, attrs, create, remove):
+        """
+        Create object owned by the test or, if the test shares objects,
+        acquire it from the session cache.
+        create: function creating the object and returning its OID or entry
+        remove: sai_thrift remove function of the object
+        """
+
+        if self.share_objects:
+            session_state.register_cleanup(self)
+            return session_state.shared_objects.acquire(self, key, attrs, create, remove)
+
+        obj = create()
+        self.add_teardown_obj(functools.partial(remove, self.client), obj)
+
+        return obj
+
     def vip_create(self, vip):
         """
         Add VIP for Appliance
@@ -136,47 +183,7 @@ class VnetAPI(VnetObjects):
         Create ENI
         """
 
-        default_kwargs = {
-            "cps": 10000,
-            "pps": 100000,
-            "flows": 100000,
-            "admin_state": True,
-            "ha_scope_id": 0,
-            "vm_underlay_dip": sai_ipaddress("0.0.0.0"),
-            "vm_vni": 1,
-            "vnet_id": 1,
-            "pl_sip" : sai_ipaddress("2001:0db8:85a3:0000:0000:8a2e:0370:7334"),
-            "pl_sip_mask": sai_ipaddress("2001:0db8:85a3:0000:0000:0000:0000:0000"),
-            "pl_underlay_sip": sai_ipaddress("10.0.0.18"),
-            "v4_meter_policy_id": 0,
-            "v6_meter_policy_id": 0,
-            "dash_tunnel_dscp_mode": SAI_DASH_TUNNEL_DSCP_MODE_PRESERVE_MODEL,
-            "dscp": 0,
-            "inbound_v4_stage1_dash_acl_group_id": 0,
-            "inbound_v4_stage2_dash_acl_group_id": 0,
-            "inbound_v4_stage3_dash_acl_group_id": 0,
-            "inbound_v4_stage4_dash_acl_group_id": 0,
-            "inbound_v4_stage5_dash_acl_group_id": 0,
-            "outbound_v4_stage1_dash_acl_group_id": 0,
-            "outbound_v4_stage2_dash_acl_group_id": 0,
-            "outbound_v4_stage3_dash_acl_group_id": 0,
-            "outbound_v4_stage4_dash_acl_group_id": 0,
-            "outbound_v4_stage5_dash_acl_group_id": 0,
-            "inbound_v6_stage1_dash_acl_group_id": 0,
-            "inbound_v6_stage2_dash_acl_group_id": 0,
-            "inbound_v6_stage3_dash_acl_group_id": 0,
-            "inbound_v6_stage4_dash_acl_group_id": 0,
-            "inbound_v6_stage5_dash_acl_group_id": 0,
-            "outbound_v6_stage1_dash_acl_group_id": 0,
-            "outbound_v6_stage2_dash_acl_group_id": 0,
-            "outbound_v6_stage3_dash_acl_group_id": 0,
-            "outbound_v6_stage4_dash_acl_group_id": 0,
-            "outbound_v6_stage5_dash_acl_group_id": 0,
-            "disable_fast_path_icmp_flow_redirection": 0,
-            "outbound_routing_group_id": 0,
-            "full_flow_resimulation_requested": False,
-            "max_resimulated_flow_per_second": 0
-        }
+        default_kwargs = eni_default_attrs()
         default_kwargs.update(kwargs)
 
         eni_id = sai_thrift_create_eni(self.client, **default_kwargs)
@@ -399,14 +406,16 @@ class VnetAPI(VnetObjects):
         RIF create
         """
 
-        rif = sai_thrift_create_router_interface(self.client,
-                                                 type=SAI_ROUTER_INTERFACE_TYPE_PORT,
-                                                 virtual_router_id=self.default_vrf,
-                                                 src_mac_address=src_mac, port_id=port)
-        self.assertEqual(self.status(), SAI_STATUS_SUCCESS)
-        self.add_teardown_obj(self.router_interface_remove, rif)
+        def create():
+            rif = sai_thrift_create_router_interface(self.client,
+                                                     type=SAI_ROUTER_INTERFACE_TYPE_PORT,
+                                                     virtual_router_id=self.default_vrf,
+                                                     src_mac_address=src_mac, port_id=port)
+            self.assertEqual(self.status(), SAI_STATUS_SUCCESS)
+            return rif
 
-        return rif
+        return self.shared_object_create(("router_interface", port), src_mac,
+                                         create, sai_thrift_remove_router_interface)
 
     def router_interface_remove(self, rif):
         sai_thrift_remove_router_interface(self.client, rif)
@@ -416,15 +425,17 @@ class VnetAPI(VnetObjects):
         Nexthop create
         """
 
-        nhop = sai_thrift_create_next_hop(
-            self.client,
-            ip=sai_ipaddress(ip),
-            router_interface_id=rif,
-            type=SAI_NEXT_HOP_TYPE_IP)
-        self.assertEqual(self.status(), SAI_STATUS_SUCCESS)
-        self.add_teardown_obj(self.nexthop_remove, nhop)
+        def create():
+            nhop = sai_thrift_create_next_hop(
+                self.client,
+                ip=sai_ipaddress(ip),
+                router_interface_id=rif,
+                type=SAI_NEXT_HOP_TYPE_IP)
+            self.assertEqual(self.status(), SAI_STATUS_SUCCESS)
+            return nhop
 
-        return nhop
+        return self.shared_object_create(("next_hop", rif, ip), None,
+                                         create, sai_thrift_remove_next_hop)
 
     def nexthop_remove(self, nhop):
         sai_thrift_remove_next_hop(self.client, nhop)
@@ -434,12 +445,16 @@ class VnetAPI(VnetObjects):
         Neighbor create
         """
 
-        neighbor_entry = sai_thrift_neighbor_entry_t(
-            rif_id=rif, ip_address=sai_ipaddress(ip))
-        sai_thrift_create_neighbor_entry(
-            self.client, neighbor_entry, dst_mac_address=dmac)
-        self.assertEqual(self.status(), SAI_STATUS_SUCCESS)
-        self.add_teardown_obj(self.neighbor_remove, neighbor_entry)
+        def create():
+            neighbor_entry = sai_thrift_neighbor_entry_t(
+                rif_id=rif, ip_address=sai_ipaddress(ip))
+            sai_thrift_create_neighbor_entry(
+                self.client, neighbor_entry, dst_mac_address=dmac)
+            self.assertEqual(self.status(), SAI_STATUS_SUCCESS)
+            return neighbor_entry
+
+        self.shared_object_create(("neighbor_entry", rif, ip), dmac,
+                                  create, sai_thrift_remove_neighbor_entry)
 
     def neighbor_remove(self, entry):
         sai_thrift_remove_neighbor_entry(self.client, entry)
@@ -449,12 +464,16 @@ class VnetAPI(VnetObjects):
         Route create
         """
 
-        route_entry = sai_thrift_route_entry_t(
-            vr_id=self.default_vrf, destination=sai_ipprefix(prefix))
-        sai_thrift_create_route_entry(
-            self.client, route_entry, next_hop_id=nhop)
-        self.assertEqual(self.status(), SAI_STATUS_SUCCESS)
-        self.add_teardown_obj(self.route_remove, route_entry)
+        def create():
+            route_entry = sai_thrift_route_entry_t(
+                vr_id=self.default_vrf, destination=sai_ipprefix(prefix))
+            sai_thrift_create_route_entry(
+                self.client, route_entry, next_hop_id=nhop)
+            self.assertEqual(self.status(), SAI_STATUS_SUCCESS)
+            return route_entry
+
+        self.shared_object_create(("route_entry", prefix), nhop,
+                                  create, sai_thrift_remove_route_entry)
 
     def route_remove(self, entry):
         sai_thrift_remove_route_entry(self.client, entry)
@@ -528,6 +547,8 @@ class VnetApiEndpoints(VnetAPI):
     +------------------------------+        +------------------------------+
     """
 
+    share_objects = True
+
     def setUp(self, underlay_ipv6=False, overlay_ipv6=False):
         super(VnetApiEndpoints, self).setUp()
 
@@ -600,6 +621,78 @@ class VnetApiEndpoints(VnetAPI):
         #self.rx_host.peer.mac = self.tx_host.peer.mac
         self.rx_host.peer.ip = self.tx_host.peer.ip
 
+    def inbound_topology(self, pa_validate=True):
+        """
+        Inbound VNET to VNET topology: tx_host client -> rx_host client ENI
+        Inbound routing entry action is TUNNEL_DECAP_PA_VALIDATE if pa_validate is True,
+        otherwise TUNNEL_DECAP
+        """
+
+        topology = VnetTopology()
+        topology.vip(self.tx_host.peer.ip)
+
+        # direction lookup VNI, reserved VNI assigned to the VM->Appliance
+        topology.direction_lookup(self.rx_host.client.vni)
+
+        dst_vnet = topology.vnet(self.rx_host.client.vni)
+
+        eni = topology.eni("eni",
+                           admin_state=True,
+                           vm_underlay_dip=sai_ipaddress(self.rx_host.ip),
+                           vm_vni=self.rx_host.client.vni,
+                           vnet_id=dst_vnet)
+        topology.eni_mac_map(eni, self.rx_host.client.mac)  # ENI MAC
+
+        addr_mask = self.tx_host.ip_prefix.split('/')
+        if pa_validate is True:
+            src_vnet = topology.vnet(self.tx_host.client.vni)
+            topology.inbound_routing("inbound_routing", eni, vni=self.tx_host.client.vni,
+                                     sip=addr_mask[0], sip_mask=num_to_dotted_quad(addr_mask[1]),
+                                     src_vnet=src_vnet)
+            # PA validation entry with Permit action
+            topology.pa_validation(self.tx_host.ip, src_vnet)
+        else:
+            topology.inbound_routing("inbound_routing", eni, vni=self.tx_host.client.vni,
+                                     sip=addr_mask[0], sip_mask=num_to_dotted_quad(addr_mask[1]))
+
+        return topology
+
+    def outbound_topology(self, lpm, overlay_ip=None):
+        """
+        Outbound VNET to VNET topology: tx_host client ENI -> rx_host client
+        Outbound routing entry action is ROUTE_VNET_DIRECT if overlay_ip is defined,
+        otherwise ROUTE_VNET
+        """
+
+        topology = VnetTopology()
+        topology.vip(self.tx_host.peer.ip)
+
+        # direction lookup VNI, reserved VNI assigned to the VM->Appliance
+        topology.direction_lookup(self.tx_host.client.vni)
+
+        src_vnet = topology.vnet(self.tx_host.client.vni)
+        dst_vnet = topology.vnet(self.rx_host.client.vni)
+
+        routing_group = topology.outbound_routing_group("outbound_routing_group", disabled=False)
+
+        eni = topology.eni("eni",
+                           admin_state=True,
+                           vm_underlay_dip=sai_ipaddress(self.tx_host.ip),
+                           vm_vni=self.tx_host.client.vni,
+                           vnet_id=src_vnet,
+                           outbound_routing_group_id=routing_group)
+        topology.eni_mac_map(eni, self.tx_host.client.mac)  # ENI MAC
+
+        topology.outbound_routing("outbound_routing", routing_group, lpm,
+                                  dst_vnet=dst_vnet, overlay_ip=overlay_ip)
+        topology.outbound_ca_to_pa(dst_vnet,
+                                   dip=overlay_ip or self.rx_host.client.ip,
+                                   underlay_dip=self.rx_host.ip,
+                                   overlay_dmac=self.rx_host.client.mac,
+                                   use_dst_vnet_vni=True)
+
+        return topology
+
     @staticmethod
     def define_neighbor_network(port, mac, ip, ip_prefix,
                                 peer_port, peer_mac, peer_ip,
@@ -139,32 +139,13 @@ class Vnet2VnetInboundDecapPaValidateSinglePortTest(VnetApiEndpoints, VnetTraffi
         self.vnet2VnetInboundNegativeTest()
 
     @configureTrustedVni
+    @appliesTopology
     def configureTest(self):
         """
         Setup DUT in accordance with test purpose
         """
 
-        self.vip_create(self.tx_host.peer.ip)
-
-        # direction lookup VNI, reserved VNI assigned to the VM->Appliance
-        self.direction_lookup_create(self.rx_host.client.vni)
-
-        src_vnet = self.vnet_create(vni=self.tx_host.client.vni)
-        dst_vnet = self.vnet_create(vni=self.rx_host.client.vni)
-
-        eni_id = self.eni_create(admin_state=True,
-                                 vm_underlay_dip=sai_ipaddress(self.rx_host.ip),
-                                 vm_vni=self.rx_host.client.vni,
-                                 vnet_id=dst_vnet)
-        self.eni_mac_map_create(eni_id, self.rx_host.client.mac)  # ENI MAC
-
-        # Inbound routing PA Validate
-        addr_mask = self.tx_host.ip_prefix.split('/')
-        self.inbound_routing_decap_validate_create(eni_id, vni=self.tx_host.client.vni,
-                                                   sip=addr_mask[0], sip_mask=num_to_dotted_quad(addr_mask[1]),
-                                                   src_vnet_id=src_vnet)
-        # PA validation entry with Permit action
-        self.pa_validation_create(self.tx_host.ip, src_vnet)
+        self.topology_apply(self.inbound_topology(pa_validate=True))
 
     def vnet2VnetInboundRoutingTest(self, tx_equal_to_rx):
         """
@@ -271,28 +252,13 @@ class Vnet2VnetInboundDecapSinglePortTest(Vnet2VnetInboundDecapPaValidateSingleP
     """
 
     @configureTrustedVni
+    @appliesTopology
     def configureTest(self):
         """
         Setup DUT overlay in accordance with test purpose
         """
 
-        self.vip_create(self.tx_host.peer.ip)
-
-        # direction lookup VNI, reserved VNI assigned to the VM->Appliance
-        self.direction_lookup_create(self.rx_host.client.vni)
-
-        dst_vnet = self.vnet_create(vni=self.rx_host.client.vni)
-
-        eni_id = self.eni_create(admin_state=True,
-                                 vm_underlay_dip=sai_ipaddress(self.rx_host.ip),
-                                 vm_vni=self.rx_host.client.vni,
-                                 vnet_id=dst_vnet)
-        self.eni_mac_map_create(eni_id, self.rx_host.client.mac)  # ENI MAC
-
-        # Inbound routing PA Validate
-        addr_mask = self.tx_host.ip_prefix.split('/')
-        self.inbound_routing_decap_create(eni_id, vni=self.tx_host.client.vni,
-                                          sip=addr_mask[0], sip_mask=num_to_dotted_quad(addr_mask[1]))
+        self.topology_apply(self.inbound_topology(pa_validate=False))
 
     def vnet2VnetInboundNegativeTest(self):
         """
@@ -1474,34 +1440,13 @@ class Vnet2VnetOutboundRouteVnetDirectSinglePortTest(VnetApiEndpoints, VnetTraff
         self.vnet2VnetOutboundNegativeTest()
 
     @configureTrustedVni
+    @appliesTopology
     def configureTest(self):
         """
         Setup DUT in accordance with test purpose
         """
 
-        self.vip_create(self.tx_host.peer.ip)
-
-        # direction lookup VNI, reserved VNI assigned to the VM->Appliance
-        self.direction_lookup_create(self.tx_host.client.vni)
-
-        src_vnet = self.vnet_create(vni=self.tx_host.client.vni)
-        dst_vnet = self.vnet_create(vni=self.rx_host.client.vni)
-
-        outbound_routing_group_id = self.outbound_routing_group_create(disabled=False)
-
-        eni_id = self.eni_create(admin_state=True,
-                                 vm_underlay_dip=sai_ipaddress(self.tx_host.ip),
-                                 vm_vni=self.tx_host.client.vni,
-                                 vnet_id=src_vnet,
-                                 outbound_routing_group_id=outbound_routing_group_id)
-        self.eni_mac_map_create(eni_id, self.tx_host.client.mac)  # ENI MAC
-        # outbound routing
-        self.outbound_routing_vnet_direct_create(outbound_routing_group_id, "192.168.1.0/24", dst_vnet,
-                                                 overlay_ip="192.168.1.10")
-        self.outbound_ca_to_pa_create(dst_vnet,  # DST vnet id
-                                      "192.168.1.10",  # DST IP addr
-                                      self.rx_host.ip,  # Underlay DIP
-                                      overlay_dmac=self.rx_host.client.mac)
+        self.topology_apply(self.outbound_topology("192.168.1.0/24", overlay_ip="192.168.1.10"))
 
     def vnet2VnetOutboundRoutingTest(self, tx_equal_to_rx):
         """
@@ -1547,34 +1492,13 @@ class Vnet2VnetOutboundRouteVnetDirectSinglePortOverlayIpv6Test(Vnet2VnetOutboun
         super(Vnet2VnetOutboundRouteVnetDirectSinglePortOverlayIpv6Test, self).setUp(overlay_ipv6=True)
 
     @configureTrustedVni
+    @appliesTopology
     def configureTest(self):
         """
         Setup DUT in accordance with test purpose
         """
 
-        self.vip_create(self.tx_host.peer.ip)
-
-        # direction lookup VNI, reserved VNI assigned to the VM->Appliance
-        self.direction_lookup_create(self.tx_host.client.vni)
-
-        src_vnet = self.vnet_create(vni=self.tx_host.client.vni)
-        dst_vnet = self.vnet_create(vni=self.rx_host.client.vni)
-
-        outbound_routing_group_id = self.outbound_routing_group_create(disabled=False)
-
-        eni_id = self.eni_create(admin_state=True,
-                                 vm_underlay_dip=sai_ipaddress(self.tx_host.ip),
-                                 vm_vni=self.tx_host.client.vni,
-                                 vnet_id=src_vnet,
-                                 outbound_routing_group_id=outbound_routing_group_id)
-        self.eni_mac_map_create(eni_id, self.tx_host.client.mac)  # ENI MAC
-        # outbound routing
-        self.outbound_routing_vnet_direct_create(outbound_routing_group_id, "bbbb::0/64", dst_vnet,
-                                                 overlay_ip="bbbb::bc")
-        self.outbound_ca_to_pa_create(dst_vnet,  # DST vnet id
-                                      "bbbb::bc",  # DST IP addr
-                                      self.rx_host.ip,  # Underlay DIP
-                                      overlay_dmac=self.rx_host.client.mac)
+        self.topology_apply(self.outbound_topology("bbbb::0/64", overlay_ip="bbbb::bc"))
 
     def vnet2VnetOutboundNegativeTest(self):
         """
@@ -1648,35 +1572,13 @@ class Vnet2VnetOutboundRouteVnetSinglePortTest(VnetApiEndpoints, VnetTrafficMixi
         self.vnet2VnetOutboundNegativeTest()
 
     @configureTrustedVni
+    @appliesTopology
     def configureTest(self):
         """
         Setup DUT in accordance with test purpose
         """
 
-        self.vip_create(self.tx_host.peer.ip)
-
-        # direction lookup VNI, reserved VNI assigned to the VM->Appliance
-        self.direction_lookup_create(self.tx_host.client.vni)
-
-        src_vnet = self.vnet_create(vni=self.tx_host.client.vni)
-        dst_vnet = self.vnet_create(vni=self.rx_host.client.vni)
-
-        outbound_routing_group_id = self.outbound_routing_group_create(disabled=False)
-
-        eni_id = self.eni_create(admin_state=True,
-                                 vm_underlay_dip=sai_ipaddress(self.tx_host.ip),
-                                 vm_vni=self.tx_host.client.vni,
-                                 vnet_id=src_vnet,
-                                 outbound_routing_group_id=outbound_routing_group_id)
-        self.eni_mac_map_create(eni_id, self.tx_host.client.mac)  # ENI MAC
-
-        self.outbound_routing_vnet_create(outbound_routing_group_id=outbound_routing_group_id, lpm="192.168.1.0/24",
-                                          dst_vnet_id=dst_vnet)
-        self.outbound_ca_to_pa_create(dst_vnet_id=dst_vnet,
-                                      dip=self.rx_host.client.ip,
-                                      underlay_dip=self.rx_host.ip,
-                                      overlay_dmac=self.rx_host.client.mac,
-                                      use_dst_vnet_vni=True)
+        self.topology_apply(self.outbound_topology("192.168.1.0/24"))
 
     def vnet2VnetOutboundRoutingTest(self, tx_equal_to_rx):
         """
@@ -1727,35 +1629,13 @@ class Vnet2VnetOutboundRouteVnetSinglePortOverlayIpv6Test(Vnet2VnetOutboundRoute
         super(Vnet2VnetOutboundRouteVnetSinglePortOverlayIpv6Test, self).setUp(overlay_ipv6=True)
 
     @configureTrustedVni
+    @appliesTopology
     def configureTest(self):
         """
         Setup DUT in accordance with test purpose
         """
 
-        self.vip_create(self.tx_host.peer.ip)
-
-        # direction lookup VNI, reserved VNI assigned to the VM->Appliance
-        self.direction_lookup_create(self.tx_host.client.vni)
-
-        src_vnet = self.vnet_create(vni=self.tx_host.client.vni)
-        dst_vnet = self.vnet_create(vni=self.rx_host.client.vni)
-
-        outbound_routing_group_id = self.outbound_routing_group_create(disabled=False)
-
-        eni_id = self.eni_create(admin_state=True,
-                                 vm_underlay_dip=sai_ipaddress(self.tx_host.ip),
-                                 vm_vni=self.tx_host.client.vni,
-                                 vnet_id=src_vnet,
-                                 outbound_routing_group_id=outbound_routing_group_id)
-        self.eni_mac_map_create(eni_id, self.tx_host.client.mac)  # ENI MAC
-
-        self.outbound_routing_vnet_create(outbound_routing_group_id=outbound_routing_group_id, lpm="bbbb::0/64",
-                                          dst_vnet_id=dst_vnet)
-        self.outbound_ca_to_pa_create(dst_vnet_id=dst_vnet,
-                                      dip=self.rx_host.client.ip,
-                                      underlay_dip=self.rx_host.ip,
-                                      overlay_dmac=self.rx_host.client.mac,
-                                      use_dst_vnet_vni=True)
+        self.topology_apply(self.outbound_topology("bbbb::0/64"))
 
     def vnet2VnetOutboundNegativeTest(self):
         """
@@ -10,14 +10,31 @@
 
 import json
 import sys
+from pathlib import Path
 from pprint import pprint
 import argparse
 
 import pytest
 
+sys.path.append("../../../utils")
+from sai_bulk import BulkCommandProcessor
+from sai_removal_log import RemovalLog
+
 # Constants
 SWITCH_ID = 5
 
+# Names of created VIPs, kept on disk so an aborted run can be cleaned up by the next one
+REMOVAL_LOG = Path(__file__).parent / "test_sai_vnet_vips_config_via_custom_gen.removal.log"
+
+# Removal statuses of objects that do not exist
+MISSING_OBJECT_STATUSES = ["SAI_STATUS_ITEM_NOT_FOUND", "SAI_STATUS_INVALID_OBJECT_ID"]
+
+def is_missing_object(error):
+    """
+    True for the error of removing an object that does not exist, e.g. logged by an aborted create
+    """
+    return any(status in str(error) for status in MISSING_OBJECT_STATUSES)
+
 def vip_generate(vip_start=1, a1=192, a2=192, b1=168, b2=168, c1=0, c2=0, d1=1, d2=1):
     """
     Return an sequence of vip dictionary entries with incrementing IP addresses.
@@ -67,17 +84,17 @@ def make_create_cmds(vip_start=1,a1=192, a2=193, b1=168, b2=169, c1=1,c2=2,d1=1,
 
 # remove 2x2x2x32 = 256 vips
 def make_remove_cmds(vip_start=1,a1=192, a2=193, b1=168, b2=169, c1=1,c2=2,d1=1,d2=32):
-    """ Return an array of remove commands
-        Entries generated and modifed on the fly; added to array in memory; reversed; then returned.
+    """ Return a generator (iterable) of remove commands
+        Entries generated on the fly in reverse creation order: VIP numbers count down from the last one.
         vip_start - starting VIP number, successive entries will increment this by 1
         a1, a2 - starting, ending values (inclusive) for address octet "A" in the sequence A.B.C.D
         b1, b2 - starting, ending values (inclusive) for address octet "B" in the sequence A.B.C.D
         c1, c2 - starting, ending values (inclusive) for address octet "C" in the sequence A.B.C.D
         d1, d2 - starting, ending values (inclusive) for address octet "D" in the sequence A.B.C.D
     """
-    cleanup_commands = [{'name': cmd['name'], 'op': 'remove'} for cmd in make_create_cmds(vip_start, a1, a2, b1, b2, c1,c2,d1,d2)]
-    for cmd in reversed(cleanup_commands):
-        yield cmd
+    count = (a2-a1+1) * (b2-b1+1) * (c2-c1+1) * (d2-d1+1)
+    for v in range(vip_start + count - 1, vip_start - 1, -1):
+        yield {'name': "vip_entry#%d" % v, 'op': 'remove'}
     return
 
 
@@ -87,7 +104,8 @@ class TestSaiDashVipsGenerator:
     def test_many_vips_create_via_generator(self, dpu):
         """Verify VIP configuration create
         """
-        results = [*dpu.process_commands( (make_create_cmds()) )]
+        log = RemovalLog(REMOVAL_LOG)
+        results = [*dpu.process_commands(log.track(make_create_cmds()))]
         print("\n======= SAI commands RETURN values =======")
         pprint(results)
 
@@ -96,9 +114,19 @@ class TestSaiDashVipsGenerator:
     def test_many_vips_remove_via_generator(self, dpu):
         """Verify VIP configuration removal
         """
-        results = [*dpu.process_commands(make_remove_cmds())]
+        assert REMOVAL_LOG.exists(), "%s not found, run test_many_vips_create_via_generator first" % REMOVAL_LOG
+        log = RemovalLog(REMOVAL_LOG)
+        # Objects of a create aborted midway are logged but may not exist, keep removing the others
+        bulk = BulkCommandProcessor(dpu, stop_on_error=False)
+        results = [*bulk.process_commands(log.remove_commands())]
         print("\n======= SAI commands RETURN values =======")
         print(results)
+        print(bulk.summary())
+        # The log is kept for a retry until every logged object is removed
+        if not bulk.failed:
+            log.clear()
+        errors = [(record["name"], error) for record, error in bulk.failed if not is_missing_object(error)]
+        assert not errors, "Failed to remove %d VIPs, kept in %s: %s" % (len(errors), REMOVAL_LOG, errors[:10])
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='DASH SAI Config Generator for vip table entries')
@@ -5,6 +5,7 @@ Verify VNET Inbound Routing scenario
 import json
 from pathlib import Path
 from pprint import pprint
+import sys
 
 import pytest
 from saichallenger.common.sai_dataplane.utils.ptf_testutils import (send_packet,
@@ -12,6 +13,9 @@ from saichallenger.common.sai_dataplane.utils.ptf_testutils import (send_packet,
                                                                     simple_vxlan_packet,
                                                                     verify_packet)
 
+sys.path.append("../utils")
+from sai_bulk import BulkCommandProcessor
+
 current_file_dir = Path(__file__).parent
 
 # Constants
@@ -125,7 +129,9 @@ class TestSaiVnetInbound:
 
         with (current_file_dir / 'vnet_inbound_setup_commands.json').open(mode='r') as config_file:
             vnet_inbound_setup_commands = json.load(config_file)
-        result = [*dpu.process_commands(vnet_inbound_setup_commands)]
+        bulk = BulkCommandProcessor(dpu)
+        result = [*bulk.process_commands(vnet_inbound_setup_commands)]
+        print(bulk.summary())
         print("\n======= SAI commands RETURN values =======")
         pprint(result)
 
@@ -184,10 +190,11 @@ class TestSaiVnetInbound:
 
         with (current_file_dir / 'vnet_inbound_setup_commands.json').open(mode='r') as config_file:
             setup_commands = json.load(config_file)
-        cleanup_commands = []
-        for cmd in reversed(setup_commands):
-            cleanup_commands.append({'name': cmd['name'], 'op': 'remove'})
+        cleanup_commands = ({'name': cmd['name'], 'op': 'remove', 'type': cmd['type']}
+                            for cmd in reversed(setup_commands))
 
-        result = [*dpu.process_commands(cleanup_commands)]
+        bulk = BulkCommandProcessor(dpu)
+        result = [*bulk.process_commands(cleanup_commands)]
+        print(bulk.summary())
         print("\n======= SAI commands RETURN values =======")
         pprint(result)
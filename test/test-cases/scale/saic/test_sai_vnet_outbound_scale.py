@@ -23,6 +23,7 @@
 # <this-filename> -a  # Dump create & remove SAI records as JSON to stdout
 # <this-filename> -c  # Dump create SAI records as JSON to stdout
 # <this-filename> -r  # Dump create SAI records as JSON to stdout
+# <this-filename> -c -b vnet_create.sair  # Write create SAI records to compact binary file, see sai_record_file
 #
 import json, argparse
 from pathlib import Path
@@ -33,6 +34,9 @@ import saichallenger.common.sai_dataplane.snappi.snappi_traffic_utils as stu
 import sys
 sys.path.append("../utils")
 import vnet2vnet_helper as dh
+from sai_config_stream import dpugen_sources, pipeline, extend_attrs, remove_commands
+from sai_bulk import BulkCommandProcessor
+from sai_record_file import SaiRecordWriter
 
 current_file_dir = Path(__file__).parent
 import dpugen
@@ -50,6 +54,10 @@ NUMBER_OF_VNET = NUMBER_OF_ENI + (NUMBER_OF_ORE * NUMBER_OF_ENI)  # So far per O
 NUMBER_OF_IN_ACL_GROUP = 0
 NUMBER_OF_OUT_ACL_GROUP = 0
 
+# Records per bulk_create/bulk_remove call, 1 to submit records one by one.
+# SAI Challenger does not support bulk commands yet.
+BULK_CHUNK_SIZE = 1
+
 
 # Scaled configuration
 # Pay attention to the 'count', 'start', 'step' keywords.
@@ -97,56 +105,57 @@ TEST_VNET_OUTBOUND_CONFIG_SCALE = {
     }
 }
 
-def add_extra_attrs(attr_type, attrs, ext):
-    i = 0
-    for item in attrs:
-        if item['type'] == attr_type:
-            attrs[i]['attributes'].extend(ext)
-        i += 1
-    return attrs
+# Attributes required by the target but not produced by the generator
+EXTRA_ATTRS = {
+    'SAI_OBJECT_TYPE_ENI': ["SAI_ENI_ATTR_V4_METER_POLICY_ID", "0", "SAI_ENI_ATTR_V6_METER_POLICY_ID", "0",
+                            'SAI_ENI_ATTR_PL_SIP', '2001:0db8:85a3:0000:0000:8a2e:0370:7334', 'SAI_ENI_ATTR_PL_SIP_MASK',
+                            '2001:0db8:85a3:0000:0000:0000:0000:0000', 'SAI_ENI_ATTR_PL_UNDERLAY_SIP', '10.0.0.18',
+                            "SAI_ENI_ATTR_DASH_TUNNEL_DSCP_MODE", "SAI_DASH_TUNNEL_DSCP_MODE_PRESERVE_MODEL", "SAI_ENI_ATTR_DSCP", "0",
+                            "SAI_ENI_ATTR_DISABLE_FAST_PATH_ICMP_FLOW_REDIRECTION", "False", "SAI_ENI_ATTR_HA_SCOPE_ID", "0",
+                            "SAI_ENI_ATTR_FULL_FLOW_RESIMULATION_REQUESTED", "False", "SAI_ENI_ATTR_MAX_RESIMULATED_FLOW_PER_SECOND", "0" ],
+
+    'SAI_OBJECT_TYPE_OUTBOUND_CA_TO_PA_ENTRY': [ 'SAI_OUTBOUND_CA_TO_PA_ENTRY_ATTR_METER_CLASS_OR', '0',
+                                                 'SAI_OUTBOUND_CA_TO_PA_ENTRY_ATTR_ACTION', 'SAI_OUTBOUND_CA_TO_PA_ENTRY_ACTION_SET_TUNNEL_MAPPING',
+                                                 'SAI_OUTBOUND_CA_TO_PA_ENTRY_ATTR_DASH_TUNNEL_ID', 'SAI_NULL_OBJECT_ID',
+                                                 "SAI_OUTBOUND_CA_TO_PA_ENTRY_ATTR_FLOW_RESIMULATION_REQUESTED", "False",
+                                                 "SAI_OUTBOUND_CA_TO_PA_ENTRY_ATTR_ROUTING_ACTIONS_DISABLED_IN_FLOW_RESIMULATION", "0" ],
+
+    'SAI_OBJECT_TYPE_OUTBOUND_ROUTING_ENTRY': [ 'SAI_OUTBOUND_ROUTING_ENTRY_ATTR_METER_CLASS_OR', '0',
+                                                'SAI_OUTBOUND_ROUTING_ENTRY_ATTR_METER_CLASS_AND', '-1',
+                                                'SAI_OUTBOUND_ROUTING_ENTRY_ATTR_DASH_TUNNEL_ID', 'SAI_NULL_OBJECT_ID',
+                                                "SAI_OUTBOUND_ROUTING_ENTRY_ATTR_ROUTING_ACTIONS_DISABLED_IN_FLOW_RESIMULATION", "0" ],
+}
+
+
 class TestSaiVnetOutbound:
-    def make_create_vnet_config(self):
+    def make_vnet_config_sources(self):
         """ Generate a configuration
-            returns iterator (generator) of SAI records
+            returns list of per object type SAI record sources, see sai_config_stream
         """
         conf = dpugen.sai.SaiConfig()
         conf.mergeParams(TEST_VNET_OUTBOUND_CONFIG_SCALE)
         conf.generate()
-        ret = add_extra_attrs('SAI_OBJECT_TYPE_ENI', conf.items(), ["SAI_ENI_ATTR_V4_METER_POLICY_ID", "0", "SAI_ENI_ATTR_V6_METER_POLICY_ID", "0",
-                              'SAI_ENI_ATTR_PL_SIP', '2001:0db8:85a3:0000:0000:8a2e:0370:7334', 'SAI_ENI_ATTR_PL_SIP_MASK',
-                              '2001:0db8:85a3:0000:0000:0000:0000:0000', 'SAI_ENI_ATTR_PL_UNDERLAY_SIP', '10.0.0.18',
-                              "SAI_ENI_ATTR_DASH_TUNNEL_DSCP_MODE", "SAI_DASH_TUNNEL_DSCP_MODE_PRESERVE_MODEL", "SAI_ENI_ATTR_DSCP", "0",
-                              "SAI_ENI_ATTR_DISABLE_FAST_PATH_ICMP_FLOW_REDIRECTION", "False", "SAI_ENI_ATTR_HA_SCOPE_ID", "0",
-                              "SAI_ENI_ATTR_FULL_FLOW_RESIMULATION_REQUESTED", "False", "SAI_ENI_ATTR_MAX_RESIMULATED_FLOW_PER_SECOND", "0" ])
-
-        ret = add_extra_attrs('SAI_OBJECT_TYPE_OUTBOUND_CA_TO_PA_ENTRY', ret, [ 'SAI_OUTBOUND_CA_TO_PA_ENTRY_ATTR_METER_CLASS_OR', '0',
-                                                                                'SAI_OUTBOUND_CA_TO_PA_ENTRY_ATTR_ACTION', 'SAI_OUTBOUND_CA_TO_PA_ENTRY_ACTION_SET_TUNNEL_MAPPING',
-                                                                                'SAI_OUTBOUND_CA_TO_PA_ENTRY_ATTR_DASH_TUNNEL_ID', 'SAI_NULL_OBJECT_ID',
-                                                                                "SAI_OUTBOUND_CA_TO_PA_ENTRY_ATTR_FLOW_RESIMULATION_REQUESTED", "False",
-                                                                                "SAI_OUTBOUND_CA_TO_PA_ENTRY_ATTR_ROUTING_ACTIONS_DISABLED_IN_FLOW_RESIMULATION", "0" ])
-
-        ret = add_extra_attrs('SAI_OBJECT_TYPE_OUTBOUND_ROUTING_ENTRY', ret, [ 'SAI_OUTBOUND_ROUTING_ENTRY_ATTR_METER_CLASS_OR', '0',
-                                                                               'SAI_OUTBOUND_ROUTING_ENTRY_ATTR_METER_CLASS_AND', '-1',
-                                                                               'SAI_OUTBOUND_ROUTING_ENTRY_ATTR_DASH_TUNNEL_ID', 'SAI_NULL_OBJECT_ID',
-                                                                                "SAI_OUTBOUND_ROUTING_ENTRY_ATTR_ROUTING_ACTIONS_DISABLED_IN_FLOW_RESIMULATION", "0" ])
-
-        return ret
+        return dpugen_sources(conf)
+
+    def make_create_vnet_config(self):
+        """ Generate a configuration
+            returns iterator (generator) of SAI records
+        """
+        return pipeline(self.make_vnet_config_sources(), [extend_attrs(EXTRA_ATTRS)])
 
     def make_remove_vnet_config(self):
         """ Generate a configuration to remove entries
             returns iterator (generator) of SAI records
         """
-        cleanup_commands = reversed(self.make_create_vnet_config())
-        for cmd in cleanup_commands:
-            cmd['op'] = 'remove'
-            yield cmd
-        return
+        yield from remove_commands(self.make_vnet_config_sources())
 
     @pytest.mark.ptf
     @pytest.mark.snappi
     def test_create_vnet_config(self, dpu):
         """Generate and apply configuration"""
-        results = [*dpu.process_commands( (self.make_create_vnet_config()) )]
+        bulk = BulkCommandProcessor(dpu, BULK_CHUNK_SIZE)
+        results = [*bulk.process_commands(self.make_create_vnet_config())]
+        print(bulk.summary())
 
     @pytest.mark.snappi
     def test_run_traffic_check_fixed_packets(self, dpu, dataplane):
@@ -191,7 +200,9 @@ class TestSaiVnetOutbound:
         Generate and remove configuration
         We generate configuration on remove stage as well to avoid storing giant objects in memory.
         """
-        results = [*dpu.process_commands( (self.make_remove_vnet_config()) )]
+        bulk = BulkCommandProcessor(dpu, BULK_CHUNK_SIZE)
+        results = [*bulk.process_commands(self.make_remove_vnet_config())]
+        print(bulk.summary())
 
 
 if __name__ == '__main__':
@@ -199,6 +210,7 @@ if __name__ == '__main__':
     parser.add_argument('-a', action='store_true', help='Generate all SAI records as JSON to stdout')
     parser.add_argument('-c', action='store_true', help='Generate "create" SAI records as JSON to stdout')
     parser.add_argument('-r', action='store_true', help='Generate "remove"" SAI records as JSON to stdout')
+    parser.add_argument('-b', metavar='FILE', help='Write SAI records to compact binary FILE instead of JSON to stdout')
 
     args = parser.parse_args()
 
@@ -208,6 +220,14 @@ if __name__ == '__main__':
         parser.print_help(sys.stderr)
         sys.exit(1)
 
+    if args.b:
+        with SaiRecordWriter(args.b) as writer:
+            if args.a or args.c:
+                writer.write_all(TestSaiVnetOutbound().make_create_vnet_config())
+            if args.a or args.r:
+                writer.write_all(TestSaiVnetOutbound().make_remove_vnet_config())
+        sys.exit(0)
+
     if args.a or args.c:
         print(json.dumps([cmd for cmd in (TestSaiVnetOutbound().make_create_vnet_config())],
                          indent=2))
@@ -1,11 +1,10 @@
 import inspect
 import json
+import os
 import sys
 import time
 from copy import deepcopy
 
-import ipaddress
-import macaddress
 import pytest
 import requests
 from ixload import IxLoadUtils as IxLoadUtils
@@ -36,71 +35,80 @@ def setup(smartnics, tbinfo,utils):
     smartnics.configure_target(testdata)
     yield setup_information
 
-def find_boundary(utils):
+def find_boundary(utils, output_dir):
     global data, final_result_data
+    test_name = sys._getframe().f_back.f_code.co_name
     hls = ixnetwork.Traffic.TrafficItem.find()[0].HighLevelStream.find()
+    ti_print = {"Traffic Item Statistics": {'transpose': False, 'toprint': ["Traffic Item", "Tx Frames", "Rx Frames", "Frames Delta", "Loss %"]}}
+    flow_print = {"Flow Statistics": {'transpose': False, 'toprint': ["Traffic Item", "Source/Dest Endpoint Pair", "Tx Frames", "Rx Frames", "Frames Delta", "Loss %"]}}
+
+    # Every counter read during the search is kept for comparison across runs,
+    # one series per ClearStats period since cumulative counters restart from 0
+    series = [utils.StatsSeries()]
+    read_ti_stats = utils.ixnetwork_view_reader(ixnetwork, 'Traffic Item Statistics', 'Traffic Item',
+                                                ['Tx Frames', 'Rx Frames', 'Tx Frame Rate', 'Rx Frame Rate', 'Loss %'])
+    # Traffic items summed by the last counters read
+    rows = tiNo
+
+    def read_counters():
+        nonlocal rows
+        sample = read_ti_stats()
+        series[-1].add(time.time(), sample)
+        tx = [int(v) for (_, _, caption), v in sample.items() if caption == 'Tx Frames']
+        rx = [int(v) for (_, _, caption), v in sample.items() if caption == 'Rx Frames']
+        rows = len(rx)
+        return sum(tx), sum(rx)
+
+    def clear_stats():
+        ixnetwork.ClearStats()
+        series.append(utils.StatsSeries())
 
-    def boundary_check(test_boundary_val):
+    def boundary_check(test_boundary_val, duration):
         for hl in hls:
             hl.FrameRate.update(Type='framesPerSecond', Rate=test_boundary_val)
 
+        print(f"Test running for {utils.human_format(test_boundary_val * tiNo)} framesPerSecond")
         utils.start_traffic(ixnetwork)
-        utils.ss("\t\t\tLet Traffic run for  ", 10)
-        utils.ss("\t\t\tPrint Stats Before issuing Clear Stats  ", 2)
-        utils.printStats(ixnetwork, "Traffic Item Statistics", {"Traffic Item Statistics": {'transpose': False, 'toprint': ["Traffic Item", "Tx Frames", "Rx Frames", "Frames Delta", "Loss %"]}})
-        utils.ss("\t\t\tLet Clear Stats  ", 2)
-        ixnetwork.ClearStats()
-        utils.ss("\t\t\tLet Traffic run for another ", 90)
+        utils.wait_loss_steady(read_counters, timeout=10)
+        clear_stats()
+        # Frames sent during 1ms are allowed to be in flight when the counters are read
+        trial = utils.monitor_trial(read_counters, duration, inflight=test_boundary_val * tiNo // 1000)
         utils.stop_traffic(ixnetwork)
-        utils.ss("\t\t\tLets wait for stats to settle down for ", 10)
-        #print("\tVerify Traffic stats")
-        ti = StatViewAssistant(ixnetwork, 'Traffic Item Statistics')
-        if float(ti.Rows[0]['Frames Delta']) == float(0):
-            ixnetwork.ClearStats()
-            return False
-        else:
-            ixnetwork.ClearStats()
-            return True
-
-    poss_val, step, tolerance, pass_val, fail_val = int(20000000 / tiNo), int(20000000 / tiNo), 100000, None, None
-    #poss_val, step, tolerance, pass_val, fail_val = int(20000000 / tiNo), int(20000000 / tiNo), 50000, None, None
-
-    while True:
-        print("="*50)
-        print(f"Test running for {utils.human_format(poss_val * tiNo)} framesPerSecond")
-        print(" POSSPASS|FAIL|PASS=", poss_val, fail_val, pass_val)
-        print("="*50)
-        result = boundary_check(poss_val)
-        row = utils.printStats(ixnetwork, "Traffic Item Statistics", {"Traffic Item Statistics": {'transpose': False, 'toprint': ["Traffic Item", "Tx Frames", "Rx Frames", "Frames Delta", "Loss %"]}})
-        utils.printStats(ixnetwork, "Flow Statistics", {"Flow Statistics": {'transpose': False, 'toprint': ["Traffic Item", "Source/Dest Endpoint Pair", "Tx Frames", "Rx Frames", "Frames Delta", "Loss %"]}})
-        data.append([sys._getframe().f_back.f_code.co_name,utils.human_format(poss_val * tiNo)]+row[1:])
-
-        if result:
-            fail_val = poss_val
-            if pass_val:
-                poss_val = int((pass_val+fail_val)/2)
-            else:
-                poss_val = int(poss_val/2)
-        else:  # we need to continue
-            pass_val = poss_val
-            if not fail_val:
-                poss_val = pass_val+step
-            else:
-                poss_val = int((pass_val+fail_val)/2)
-        if fail_val:
-            if abs(fail_val-poss_val) <= tolerance:
-                if pass_val==None:
-                    print ("Not able to find Boundary Tolerance (%d) is Less than last fail value (%d)" % (tolerance,fail_val))
-                    pass_val="NA"
-                else:
-                    pass_val = utils.human_format(pass_val * tiNo)
-                    print("Final Possible Boundary is ", pass_val)
-                print(" X POSSPASS|FAIL|PASS=", poss_val, fail_val, pass_val)
-                break
-    data.append([sys._getframe().f_back.f_code.co_name]+["***"]*5+[pass_val])
+        if not trial.early:
+            utils.wait_counters_settled(read_counters)
+            ti = StatViewAssistant(ixnetwork, 'Traffic Item Statistics')
+            trial.passed = float(ti.Rows[0]['Frames Delta']) == float(0)
+        if trial.measured is not None and rows:
+            trial.measured /= rows
+
+        row = utils.printStats(ixnetwork, "Traffic Item Statistics", ti_print)
+        utils.printStats(ixnetwork, "Flow Statistics", flow_print)
+        data.append([test_name, utils.human_format(test_boundary_val * tiNo)]+row[1:])
+        clear_stats()
+        return trial
+
+    # 10s trials narrow the boundary down, 90s trials confirm it
+    search = utils.BoundarySearch(boundary_check, start=int(20000000 / tiNo), resolution=100000,
+                                  durations=(10, 90), name="framesPerSecond per stream")
+    result = search.run()
+
+    if result.boundary is None:
+        print ("Not able to find Boundary, lowest rate (%d) failed" % result.fail)
+        pass_val = "NA"
+    else:
+        pass_val = utils.human_format(result.boundary * tiNo)
+        print("Final Possible Boundary is ", pass_val)
+
+    series = [period for period in series if len(period)]
+    for i, period in enumerate(series):
+        period.save(os.path.join(output_dir, "%s_stats_%d.npz" % (test_name, i)))
+    for period in series:
+        period.print_summary([key for key in period.column_keys() if key[2].endswith('Rate')])
+
+    data.append([test_name]+["***"]*5+[pass_val])
     print(tabulate(data, headers=captions, tablefmt="psql"))
     
-    final_result_data.append([sys._getframe().f_back.f_code.co_name,pass_val])
+    final_result_data.append([test_name,pass_val])
 
 
 
@@ -485,18 +493,12 @@ class Test_Dpu:
     def teardown_method(self, method):
         print("Clean up configuration")
 
-    def test_pps_001(self, setup, utils):
+    def test_pps_001(self, setup, utils, output_dir):
         print('Start All Protocols test_pps_001')
         ixnetwork.StartAllProtocols(Arg1='sync')
 
-        try:
-            print('Verify protocol sessions')
-            protocolsSummary = StatViewAssistant(ixnetwork, 'Protocols Summary')
-            protocolsSummary.CheckCondition('Sessions Not Started', StatViewAssistant.EQUAL, 0)
-            protocolsSummary.CheckCondition('Sessions Down', StatViewAssistant.EQUAL, 0)
-        except Exception as e:
-            raise Exception(str(e))
-        time.sleep(90)
+        print('Verify protocol sessions')
+        utils.wait_protocol_sessions_up(ixnetwork, timeout=90)
 
         ti_allow = ixnetwork.Traffic.TrafficItem.find(Name="Allow")
         ti_deny  = ixnetwork.Traffic.TrafficItem.find(Name="Deny")
@@ -504,13 +506,13 @@ class Test_Dpu:
         ti_deny.Generate()
         ixnetwork.Traffic.Apply()
         utils.start_traffic(ixnetwork)
-        time.sleep(30)
+        utils.wait_loss_steady(utils.ixnetwork_counters(ixnetwork), timeout=30)
         utils.stop_traffic(ixnetwork)
         
-        find_boundary(utils)
+        find_boundary(utils, output_dir)
         print(tabulate(final_result_data, headers=["Test","Max Possible PPS"], tablefmt="psql"))
 
-    def test_pps_increment_udp(self, setup, utils):
+    def test_pps_increment_udp(self, setup, utils, output_dir):
 
         print('Start All Protocols test_pps_random_udp_src_dst')
         ixnetwork.StartAllProtocols(Arg1='sync')
@@ -562,13 +564,13 @@ class Test_Dpu:
         ti_allow.Generate()
         ixnetwork.Traffic.Apply()
         utils.start_traffic(ixnetwork)
-        time.sleep(30)
+        utils.wait_loss_steady(utils.ixnetwork_counters(ixnetwork), timeout=30)
         utils.stop_traffic(ixnetwork)
 
-        find_boundary(utils)
+        find_boundary(utils, output_dir)
         print(tabulate(final_result_data, headers=["Test","Max Possible PPS"], tablefmt="psql"))
 
-    def test_cps_001(self, setup, create_ixload_session_url):
+    def test_cps_001(self, setup, utils, create_ixload_session_url, output_dir):
         """
             Description: Verify ip address can be configured in SVI.
             Topo: DUT02 ============ DUT01
@@ -642,7 +644,7 @@ class Test_Dpu:
                 stat_table.append(iter)
             print("\n%s" % tabulate(stat_table, headers=stat_columns, tablefmt='psql', floatfmt=".2f"))
 
-        def _poll_stats(connection, sessionUrl, watchedStatsDict, pollingInterval=4):
+        def _poll_stats(connection, sessionUrl, watchedStatsDict, pollingInterval=4, abort=None, series=None):
 
             statSourceList = list(watchedStatsDict)
 
@@ -660,7 +662,7 @@ class Test_Dpu:
             stats_dict = {}
 
             # remember the timstamps that were already collected - will be ignored in future
-            collectedTimestamps = {}  # format { statSource : [2000, 4000, ...] }
+            collectedTimestamps = {}  # format { statSource : {"2000", "4000", ...} }
             testIsRunning = True
 
             # check stat sources
@@ -683,29 +685,32 @@ class Test_Dpu:
                     valuesDict = valuesObj.getOptions()
 
                     # get just the new timestamps - that were not previously retrieved in another stats polling iteration
-                    newTimestamps = [int(timestamp) for timestamp in list(valuesDict) if
-                                     timestamp not in collectedTimestamps.get(statSource, [])]
-                    newTimestamps.sort()
+                    collected = collectedTimestamps.setdefault(statSource, set())
+                    newTimestamps = sorted(int(timestamp) for timestamp in valuesDict if timestamp not in collected)
 
                     for timestamp in newTimestamps:
                         timeStampStr = str(timestamp)
 
-                        collectedTimestamps.setdefault(statSource, []).append(timeStampStr)
+                        collected.add(timeStampStr)
 
                         timestampDict = stats_dict.setdefault(statSource, {}).setdefault(timestamp, {})
 
-                        # save the values for the current timestamp, and later print them
+                        # save the values for the current timestamp
                         for caption, value in iteritems(valuesDict[timeStampStr].getOptions()):
                             if caption in watchedStatsDict[statSource]:
                                 timestampDict[caption] = value
-                                stat_table_row = []
-                                for table_row in timestampDict.keys():
-                                    stat_table_row.append(table_row)
-                                table = []
-                                columns = ['Stat Source', 'Time Stamp', 'Stat Name', 'Value']
-                                for i, stat in enumerate(stat_table_row):
-                                    table.append([statSource, timeStampStr, stat, timestampDict[stat]])
-                                # print("\n%s" % tabulate(table, headers=columns, tablefmt='psql'))
+
+                        if series is not None:
+                            # IxLoad timestamps are milliseconds since the test start
+                            series.add(timestamp / 1000.0, {(statSource, caption): value for caption, value in
+                                                            iteritems(timestampDict)})
+
+                if abort is not None and abort(stats_dict):
+                    # Result of the run is already known, stop it instead of waiting for the timeline end
+                    IxLoadUtils.log("Stopping the test early...")
+                    stopUrl = "%s/ixload/test/operations/gracefulStopRun" % sessionUrl
+                    connection.httpRequest("POST", stopUrl, data=json.dumps({})).raise_for_status()
+                    abort = None
 
                 testIsRunning = _getTestCurrentState(connection, sessionUrl) == "Running"
 
@@ -910,18 +915,24 @@ class Test_Dpu:
             print("\n%s" % tabulate(stat_f_table, headers=stat_f_columns, tablefmt='psql'))
             print("\n%s" % tabulate(lat_table, headers=lat_stat_columns, tablefmt='psql'))
 
-        def _run_cc_test(connection, session_url, url_patch_dict, MAX_CPS, MIN_CPS,
-                            threshold, target_failures, test_settings, start_value=0):
+        def _failures_exceeded(stats_dict, target_failures):
 
-            test_run_results = []
-            test_value = start_value
-            test_iteration = 1
+            server_stats = stats_dict.get('HTTPServer', {})
+            if not server_stats:
+                return False
+
+            last_stats = server_stats[max(server_stats)]
+            failures = sum(int(last_stats[caption]) for caption in
+                           ['HTTP Requests Failed', 'TCP Retries', 'TCP Resets Sent', 'TCP Resets Received']
+                           if last_stats.get(caption, '""') != '""')
+
+            return failures > target_failures
+
+        def _run_cc_iteration(connection, session_url, url_patch_dict, target_failures, test_value, test_iteration):
 
-            test_result = ""
             IxLoadUtils.log(
                 "----Test Iteration %d------------------------------------------------------------------"
                 % test_iteration)
-            old_value = test_value
             IxLoadUtils.log("Testing CC Objective = %d" % test_value)
             kActivityOptionsToChange = {
                 # format: { activityName : { option : value } }
@@ -947,19 +958,52 @@ class Test_Dpu:
             IxLoadUtils.runTest(connection, session_url)
             IxLoadUtils.log("Test started.")
 
+            aborted = []
+
+            def abort(stats_dict):
+                if _failures_exceeded(stats_dict, target_failures):
+                    aborted.append(True)
+                return bool(aborted)
+
             IxLoadUtils.log("Test running and extracting stats...")
-            stats_dict = _poll_stats(connection, session_url, stats_test_settings)
+            series = utils.StatsSeries()
+            stats_dict = _poll_stats(connection, session_url, stats_test_settings, abort=abort, series=series)
             IxLoadUtils.log("Test finished.")
+            series.save(os.path.join(output_dir, "cc_iteration_%d_stats.npz" % test_iteration))
 
             failures_dict, cps_max, cps_max_w_ts, latency_ranges = _get_testrun_results(stats_dict, url_patch_dict)
 
             _print_stat_table(cps_max_w_ts, failures_dict, latency_ranges)
 
-            test_run_results.append(
-                [test_iteration, cps_max, failures_dict["http_requests_failed"],
-                 failures_dict["tcp_retries"], failures_dict["tcp_resets_tx"],
-                 failures_dict["tcp_resets_rx"]]
-            )
+            return cps_max, cps_max_w_ts, failures_dict, latency_ranges, bool(aborted)
+
+        def _run_cc_test(connection, session_url, url_patch_dict, MAX_CPS, MIN_CPS,
+                            threshold, target_failures, test_settings, start_value=0):
+
+            test_run_results = []
+            runs = {}
+
+            def probe(test_value, duration):
+                test_iteration = len(test_run_results) + 1
+                cps_max, cps_max_w_ts, failures_dict, latency_ranges, aborted = _run_cc_iteration(
+                    connection, session_url, url_patch_dict, target_failures, test_value, test_iteration)
+
+                test_run_results.append(
+                    [test_iteration, cps_max, failures_dict["http_requests_failed"],
+                     failures_dict["tcp_retries"], failures_dict["tcp_resets_tx"],
+                     failures_dict["tcp_resets_rx"]]
+                )
+                runs[test_value] = cps_max_w_ts, failures_dict, latency_ranges
+
+                return utils.TrialResult(test_value, failures_dict["total"] <= target_failures, early=aborted)
+
+            # IxLoad timeline fixes the trial duration, the search stops runs having too many failures
+            search = utils.BoundarySearch(probe, start=start_value, lower=max(MIN_CPS, 1), upper=MAX_CPS,
+                                          resolution=threshold, name="CC Objective")
+            result = search.run()
+
+            best_value = result.boundary if result.boundary is not None else result.fail
+            cps_max_w_ts, failures_dict, latency_ranges = runs[best_value]
 
             return cps_max_w_ts, failures_dict, test_run_results, latency_ranges
 
@@ -1028,24 +1072,17 @@ class Test_Dpu:
 
             return
 
-        def _build_node_ips(count, vpc, nodetype="client"):
-            IP_STEP1 = int(ipaddress.ip_address(u'0.0.0.1'))
-            IP_STEP2 = int(ipaddress.ip_address(u'0.0.1.0'))
-            IP_STEP3 = int(ipaddress.ip_address(u'0.1.0.0'))
-            IP_STEP4 = int(ipaddress.ip_address(u'1.0.0.0'))
-            IP_STEPE = int(ipaddress.ip_address(u'0.0.0.2'))
-            IP_C_START = ipaddress.ip_address(u'1.128.0.1')
-            IP_S_START = ipaddress.ip_address(u'1.1.0.1')
+        def _build_node_ips(count, vpcs, nodetype="client"):
+            """
+            First IP of every IP range of all VPCs, `count` ranges per VPC grouped by VPC
+            """
 
             if nodetype in "client":
-                ip = ipaddress.ip_address(int(IP_C_START) + (IP_STEP3 * count * 4) + (IP_STEP4 * (vpc - 1)))
-
-            if nodetype in "server":
-                ip = ipaddress.ip_address(int(IP_S_START) + (IP_STEP4 * (vpc - 1)))
+                return utils.AddressRange('1.128.0.1', '1.0.0.0', vpcs).nested('0.4.0.0', count)
 
-            return ip
+            return utils.AddressRange('1.1.0.1', '1.0.0.0', vpcs).nested('0.0.0.2', count)
 
-        def _set_ip_range_options(ip_count, eni_index, nodetype):
+        def _set_ip_range_options(ip, nodetype):
 
             if nodetype in "client":
                 host_count = 500
@@ -1054,39 +1091,31 @@ class Test_Dpu:
                 host_count = 1
                 incrementBy = "0.0.0.2"
 
-            ip = str(_build_node_ips(ip_count, eni_index, nodetype))
-
             IpOptionsToChange = {'count': host_count, 'ipAddress': ip, 'prefix': 8, 'incrementBy': incrementBy,
                                 'gatewayAddress': "0.0.0.0", 'gatewayIncrement': '0.0.0.0'}
 
 
             return IpOptionsToChange
 
-        def _build_node_macs(count, vpc, nodetype="client"):
+        def _build_node_macs(count, vpcs, nodetype="client"):
+            """
+            First MAC of every IP range of all VPCs, `count` ranges per VPC grouped by VPC
+            """
+
             ENI_MAC_STEP = '00:00:00:08:00:00'
-            mac_start_client = macaddress.MAC('00:1B:6E:80:00:01')
-            mac_start_server = macaddress.MAC('00:1B:6E:00:00:01')
-            mac_incr1 = macaddress.MAC('00:00:00:01:00:00')
-            mac_incr3 = macaddress.MAC('00:00:00:03:00:00')
 
             if nodetype in "client":
-                m = macaddress.MAC(int(mac_start_client) + int(macaddress.MAC(ENI_MAC_STEP)) * (vpc - 1) + (int(mac_incr1) * count))
+                return utils.AddressRange('00:1B:6E:80:00:01', ENI_MAC_STEP, vpcs).nested('00:00:00:01:00:00', count)
 
-            if nodetype in "server":
-                m = macaddress.MAC(int(mac_start_server) + int(macaddress.MAC(ENI_MAC_STEP)) * (vpc - 1))
+            return utils.AddressRange('00:1B:6E:00:00:01', ENI_MAC_STEP, vpcs).nested('00:00:00:03:00:00', count)
 
-            return m
-
-        def _set_mac_range_options(ip_count=0, eni_index=0, nodetype="client"):
+        def _set_mac_range_options(mac_address, nodetype="client"):
 
             if nodetype in "client":
                 mac_increment = "00:00:00:00:00:80"
             else:
                 mac_increment = "00:00:00:00:00:02"
 
-            mac_address = str(_build_node_macs(ip_count, eni_index, nodetype))
-            mac_address = mac_address.replace("-", ":")
-
             macOptionsToChange = {"mac": mac_address, "incrementBy": mac_increment}
 
             return macOptionsToChange
@@ -1296,11 +1325,14 @@ class Test_Dpu:
         ip_count = 0
         nodetype = "client"
         # Build Client IPs and MACs
+        client_ips = _build_node_ips(ip_ranges_per_vpc, enis, nodetype).to_list()
+        client_macs = _build_node_macs(ip_ranges_per_vpc, enis, nodetype).to_list()
         for i in range(nsgs + 1 + ip_ranges_per_vpc):
             if ip_count < ip_ranges_per_vpc and eni_index <= enis:
                 # --- ixNet objects need to be added in the list before they are configured.
-                client_ip_range_settings.append(_set_ip_range_options(ip_count, eni_index, nodetype))
-                client_mac_range_settings.append(_set_mac_range_options(ip_count, eni_index, nodetype))
+                range_index = (eni_index - 1) * ip_ranges_per_vpc + ip_count
+                client_ip_range_settings.append(_set_ip_range_options(client_ips[range_index], nodetype))
+                client_mac_range_settings.append(_set_mac_range_options(client_macs[range_index], nodetype))
                 client_vlan_range_settings.append(_set_vlan_range_options(url_patch_dict, eni_index-1, nodetype))
                 ip_count += 1
             else:
@@ -1328,9 +1360,11 @@ class Test_Dpu:
         server_mac_range_settings = []
         server_vlan_range_settings = []
         # Build Server IPs and MACs
+        server_ips = _build_node_ips(1, enis, nodetype).to_list()
+        server_macs = _build_node_macs(1, enis, nodetype).to_list()
         for i in range(enis):
-            server_ip_range_settings.append(_set_ip_range_options(0, i + 1, nodetype))
-            server_mac_range_settings.append(_set_mac_range_options(0, i+1, nodetype))
+            server_ip_range_settings.append(_set_ip_range_options(server_ips[i], nodetype))
+            server_mac_range_settings.append(_set_mac_range_options(server_macs[i], nodetype))
             server_vlan_range_settings.append(_set_vlan_range_options(url_patch_dict, i, nodetype))
 
         IxLoadUtils.log("Setting Server Ranges: IPs, MACs, VLANs")
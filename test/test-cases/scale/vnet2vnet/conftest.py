@@ -47,6 +47,14 @@ def utils():
     return util
 
 
+@pytest.fixture
+def output_dir(request):
+    """Directory for files saved by the test: results/<test name> next to the test module"""
+    path = os.path.join(os.path.dirname(str(request.node.fspath)), "results", request.node.name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
 @pytest.fixture
 def create_ixload_session_url(tbinfo):
     ixload_settings = {}
@@ -80,15 +80,16 @@ class Test_Dpu:
         def find_boundary():
             global data
             hls = trafficItem.HighLevelStream.find()
+            read_counters = utils.ixnetwork_counters(ixnetwork)
 
             def boundary_check(test_boundary_val):
                 for hl in hls:
                     hl.FrameRate.update(Type='framesPerSecond', Rate=test_boundary_val)
 
                 utils.start_traffic(ixnetwork)
-                utils.ss("\t\t\tLet Traffic run for  ", 20)
+                utils.wait_loss_steady(read_counters, timeout=20)
                 utils.stop_traffic(ixnetwork)
-                utils.ss("\t\t\tLets wait for stats to settle down for ", 10)
+                utils.wait_counters_settled(read_counters)
                 #print("\tVerify Traffic stats")
                 ti = StatViewAssistant(ixnetwork, 'Traffic Item Statistics')
                 if float(ti.Rows[0]['Frames Delta']) == float(0):
@@ -246,7 +247,7 @@ class Test_Dpu:
         trafficItem.Generate()
         ixnetwork.Traffic.Apply()
         utils.start_traffic(ixnetwork)
-        time.sleep(30)
+        utils.wait_loss_steady(utils.ixnetwork_counters(ixnetwork), timeout=30)
         utils.stop_traffic(ixnetwork)
 
         find_boundary()
@@ -1,3 +1,6 @@
 from .common import *
+from .boundary import *
+from .stats import *
+from .wait import *
 
 __all__ = ['*']
@@ -0,0 +1,201 @@
+import math
+import time
+
+from tabulate import tabulate
+
+
+class TrialResult:
+    """
+    Outcome of one probe at one offered value (frames or connections per second)
+
+    passed: no loss (or loss within tolerance) at the offered value
+    early: trial was stopped before its duration since loss was already certain
+    tx, rx: frames (or connections) sent and received during the trial
+    measured: achieved value, e.g. forwarding rate at the offered rate,
+              used as the next guess when the trial failed, in units of the offered value
+    """
+
+    def __init__(self, value, passed, duration=0, tx=0, rx=0, measured=None, early=False):
+        self.value = value
+        self.passed = passed
+        self.duration = duration
+        self.tx = tx
+        self.rx = rx
+        self.measured = measured
+        self.early = early
+
+    @property
+    def loss_ratio(self):
+        return max(0, self.tx - self.rx) / self.tx if self.tx else 0.0
+
+
+class BoundaryResult:
+    """
+    boundary: highest passing value, None if even the lowest value failed
+    fail: lowest failing value, None if the upper limit passed
+    """
+
+    def __init__(self, boundary, fail, trials, elapsed):
+        self.boundary = boundary
+        self.fail = fail
+        self.trials = trials
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return "BoundaryResult(boundary=%s, fail=%s, trials=%d, elapsed=%ds)" % (
+            self.boundary, self.fail, len(self.trials), self.elapsed)
+
+
+def loss_interval(tx, lost, z=1.96):
+    """
+    Wilson score interval of the loss ratio after tx frames with lost frames missing
+    """
+    if tx <= 0:
+        return 0.0, 1.0
+    p = min(1.0, lost / tx)
+    denominator = 1 + z * z / tx
+    center = (p + z * z / (2 * tx)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / tx + z * z / (4 * tx * tx)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def monitor_trial(read_counters, duration, interval=2, loss_tolerance=0.0, z=1.96, inflight=0):
+    """
+    Watch a running trial and stop watching as soon as loss is certain.
+    `read_counters` returns cumulative (tx, rx) counters of the running traffic,
+    `inflight` is the number of frames which may be sent but not yet counted as
+    received when both counters are read.
+    The trial fails early when the lower bound of the loss ratio confidence
+    interval exceeds `loss_tolerance`, otherwise it is watched for `duration`
+    seconds and the returned result is passed; the caller is expected to confirm
+    it with the final counters once traffic is stopped.
+    """
+    start = time.time()
+    tx = rx = 0
+    while True:
+        remaining = duration - (time.time() - start)
+        if remaining <= 0:
+            break
+        time.sleep(min(interval, remaining))
+        tx, rx = read_counters()
+        lost = max(0, tx - rx - inflight)
+        lower, upper = loss_interval(tx, lost, z)
+        if lost and lower > loss_tolerance:
+            elapsed = time.time() - start
+            print("\t\t\tLoss %.6f%% [%.6f%%, %.6f%%] detected after %ds, stopping trial" % (
+                100.0 * lost / tx, 100.0 * lower, 100.0 * upper, elapsed))
+            return TrialResult(None, False, elapsed, tx, rx, rx / elapsed if elapsed else None, early=True)
+
+    elapsed = time.time() - start
+    return TrialResult(None, True, elapsed, tx, rx, rx / elapsed if elapsed else None)
+
+
+class BoundarySearch:
+    """
+    Search for the highest value (frame rate, connection rate) passing the probe.
+
+    The search grows (or shrinks) the offered value exponentially from `start`
+    until the boundary is bracketed by a passing and a failing value, then
+    bisects the bracket. It stops once the bracket, which is the confidence
+    interval of the boundary, is narrower than `precision` relative to the
+    failing value or than the absolute `resolution`.
+
+    Trials get longer as the search converges: every entry of `durations` is a
+    search phase, all but the last one run with a coarser precision. A fail of a
+    short trial is a fail of a longer one as well, so only the passing value is
+    confirmed again in the next phase.
+
+    probe(value, duration) runs one trial and returns TrialResult or bool;
+    `duration` is None for probes having a fixed duration.
+
+    Usage:
+        search = BoundarySearch(probe, start=1250000, resolution=100000, durations=(10, 90))
+        result = search.run()
+        print(result.boundary, result.fail)
+    """
+
+    def __init__(self, probe, start, lower=1, upper=None, resolution=1, precision=0.01,
+                 growth=2.0, durations=(None,), name="value"):
+        self.probe = probe
+        self.start = start
+        self.lower = lower
+        self.upper = upper
+        self.resolution = resolution
+        self.precision = precision
+        self.growth = growth
+        self.durations = durations
+        self.name = name
+        self.lo = None
+        self.hi = None
+        self.trials = []
+
+    def run(self):
+        start = time.time()
+        phases = len(self.durations)
+        for phase, duration in enumerate(self.durations):
+            precision = self.precision * self.growth ** (phases - 1 - phase)
+            self._search(duration, precision)
+            if self.lo is None:
+                # Nothing passes, longer trials do not change the result
+                break
+
+        result = BoundaryResult(self.lo, self.hi, self.trials, time.time() - start)
+        print(tabulate([[t.value, t.duration, "PASS" if t.passed else "FAIL", "yes" if t.early else "",
+                         "%.6f" % (100.0 * t.loss_ratio)] for t in self.trials],
+                       headers=[self.name, "Duration", "Result", "Early stop", "Loss %"], tablefmt="psql"))
+        print("Boundary %s (first fail %s) found after %d trials in %ds" % (
+            result.boundary, result.fail, len(self.trials), result.elapsed))
+        return result
+
+    def _narrow(self, precision):
+        width = self.hi - self.lo
+        return width <= self.resolution or width <= precision * self.hi
+
+    def _trial(self, value, duration):
+        print("=" * 50)
+        print("Trial %d: %s %s, duration %s, PASS|FAIL = %s|%s" % (
+            len(self.trials) + 1, self.name, value, duration, self.lo, self.hi))
+        print("=" * 50)
+
+        trial = self.probe(value, duration)
+        if not isinstance(trial, TrialResult):
+            trial = TrialResult(value, bool(trial), duration)
+        trial.value = value
+        self.trials.append(trial)
+
+        if trial.passed:
+            self.lo = value
+        else:
+            self.hi = value
+        return trial
+
+    def _search(self, duration, precision):
+        if self.lo is not None:
+            # Passing value of a shorter phase has to pass the longer trial again
+            value, self.lo = self.lo, None
+        else:
+            value = self.start
+
+        while True:
+            if self.upper is not None:
+                value = min(value, self.upper)
+            value = int(value)
+
+            if self.lo is not None and self.hi is not None and self._narrow(precision):
+                return
+            if value < self.lower or value == self.hi or value == self.lo:
+                return
+
+            trial = self._trial(value, duration)
+
+            if self.hi is None:
+                if self.upper is not None and value >= self.upper:
+                    return
+                value = value * self.growth
+            elif self.lo is None:
+                value = value / self.growth
+                if trial.measured is not None and trial.measured < trial.value:
+                    # Forwarding rate under overload is the best guess of the boundary
+                    value = max(value, trial.measured * (1 - precision))
+            else:
+                value = (self.lo + self.hi) / 2
@@ -9,12 +9,19 @@ from pprint import pprint as pp
 from ixnetwork_restpy.assistants.statistics.statviewassistant import StatViewAssistant
 from tabulate import tabulate
 
+from .wait import poll_until
+
 if sys.version_info[0] >= 3:
     unicode = str       # alias str as unicode for python3 and above
 TESTBED_FILE = "testbed.py"                     # path to settings.json relative root dir
 
 opd, opj, opj = os.path.dirname, os.path.join, os.path.join
 
+# Address ranges are shared with the other test suites in test-cases/utils
+sys.path.append(opj(opd(opd(opd(opd(os.path.abspath(__file__))))), "utils"))
+from address_range import AddressRange, address_to_int, int_to_address
+from vxlan_capture import decode_pcap
+
 
 def ss(mssg, st):
     for remaining in range(st, 0, -1):
@@ -146,14 +153,7 @@ def start_traffic(api):
 def stop_traffic(api, blocking=True):
     print('\t\t\tStopping traffic')
     api.Traffic.StopStatelessTrafficBlocking()
-    attempts = 0
-    while api.Traffic.IsTrafficRunning and attempts < 18:
-        print("\t\t\tTraffic is Still Running")
-        time.sleep(5)
-        attempts += 1
-    if attempts > 18:
-        raise Exception("Traffic not stopped after 90 Seconds")
-    print("\t\t\tTraffic stopped")
+    poll_until(lambda: not api.Traffic.IsTrafficRunning, "traffic to stop", timeout=90)
     ti = StatViewAssistant(api, 'Traffic Item Statistics')
     try:
         ti.CheckCondition('Tx Frames', StatViewAssistant.GREATER_THAN, 0)
@@ -161,19 +161,12 @@ def stop_traffic(api, blocking=True):
         raise Exception("Stats Missing")
 
 
-def seconds_elapsed(start_seconds):
-    return int(round(time.time() - start_seconds))
-
-
-def timed_out(start_seconds, timeout):
-    return seconds_elapsed(start_seconds) > timeout
-
-
-def wait_for(func, condition_str, interval_seconds=None, timeout_seconds=None):
+def wait_for(func, condition_str, interval_seconds=0.5, timeout_seconds=60):
     """
-    Keeps calling the `func` until it returns true or `timeout_seconds` occurs
-    every `interval_seconds`. `condition_str` should be a constant string
-    implying the actual condition being tested.
+    Keeps calling the `func` until it returns true or `timeout_seconds` occurs,
+    starting every `interval_seconds` and backing off exponentially.
+    `condition_str` should be a constant string implying the actual condition
+    being tested.
     Usage
     -----
     If we wanted to poll for current seconds to be divisible by `n`, we would
@@ -184,28 +177,11 @@ def wait_for(func, condition_str, interval_seconds=None, timeout_seconds=None):
         condition_str = 'seconds to be divisible by %d' % n
         def condition_satisfied():
             return int(time.time()) % n == 0
-        poll_until(condition_satisfied, condition_str, **kwargs)
+        wait_for(condition_satisfied, condition_str, **kwargs)
     ```
     """
-    if interval_seconds is None:
-        interval_seconds = settings.interval_seconds
-    if timeout_seconds is None:
-        timeout_seconds = settings.timeout_seconds
-    start_seconds = int(time.time())
-
     print("\n\nWaiting for %s ..." % condition_str)
-    while True:
-        res = func()
-        if res:
-            print("Done waiting for %s" % condition_str)
-            break
-        if res is None:
-            raise Exception("Wait aborted for %s" % condition_str)
-        if timed_out(start_seconds, timeout_seconds):
-            msg = "Time out occurred while waiting for %s" % condition_str
-            raise Exception(msg)
-
-        time.sleep(interval_seconds)
+    return poll_until(func, condition_str, timeout=timeout_seconds, interval=interval_seconds)
 
 
 def get_all_stats(api, print_output=True):
@@ -325,6 +301,22 @@ def get_all_captures(api, cfg):
     return cap_dict
 
 
+def get_all_decoded_captures(api, cfg, **kwargs):
+    """
+    Returns a dictionary where port name is the key and value is VxlanCapture
+    with the headers of all captured frames decoded into NumPy arrays.
+    """
+    cap_dict = {}
+    for name in get_capture_port_names(cfg):
+        print("Fetching captures from port %s" % name)
+        request = api.capture_request()
+        request.port_name = name
+        cap_dict[name] = decode_pcap(api.get_capture(request), **kwargs)
+        print("\t%r" % cap_dict[name])
+
+    return cap_dict
+
+
 def get_capture_port_names(cfg):
     """
     Returns name of ports for which capture is enabled.
@@ -347,57 +339,31 @@ def mac_or_ip_to_num(mac_or_ip_addr, mac=True):
     mac_or_ip_to_num('10.1.1.1', False)
     returns: 167837953
     """
-    sep = ":" if mac else "."
-    addr = []
-    if mac:
-        addr = mac_or_ip_addr.split(sep)
-    else:
-        addr = ["{:02x}".format(int(i)) for i in mac_or_ip_addr.split(sep)]
-    return int("".join(addr), 16)
+    return address_to_int(mac_or_ip_addr, "mac" if mac else "ipv4")
 
 
 def num_to_mac_or_ip(mac_or_ip_addr, mac=True):
     """
     Example:
     num_to_mac_or_ip(52242371562)
-    returns: '00:0C:29:E3:53:EA'
+    returns: '00:0c:29:e3:53:ea'
     num_to_mac_or_ip(167837953, False)
     returns: '10.1.1.1'
     """
-    sep = ":" if mac else "."
-    fmt = "{:012x}" if mac else "{:08x}"
-    rng = 12 if mac else 8
-    mac_or_ip = fmt.format(mac_or_ip_addr)
-    addr = []
-    for i in range(0, rng, 2):
-        if mac:
-            addr.append(mac_or_ip[i] + mac_or_ip[i + 1])
-        else:
-            addr.append(str(int(mac_or_ip[i] + mac_or_ip[i + 1], 16)))
-    return sep.join(addr)
+    return int_to_address(mac_or_ip_addr, "mac" if mac else "ipv4")
 
 
 def mac_or_ip_addr_from_counter_pattern(start_addr, step, count, up, mac=True):
     """
     Example:
+    mac_or_ip_addr_from_counter_pattern('00:0c:29:e3:53:ea', '00:00:00:00:01:00', 2, True)
+    returns: ['00:0c:29:e3:53:ea', '00:0c:29:e3:54:ea']
     mac_or_ip_addr_from_counter_pattern('10.1.1.1', '0.0.1.1', 2, True, False)
-    returns: ['00:0C:29:E3:53:EA', '00:0C:29:E3:54:EA']
-    mac_or_ip_addr_from_counter_pattern('10.1.1.1', '0.0.1.1', 2, True, False)
-    teturns: ['10.1.1.1', '10.1.2.2']
+    returns: ['10.1.1.1', '10.1.2.2']
     """
-    addr_list = []
-    for num in range(count):
-        addr_list.append(start_addr)
-        if up:
-            start_addr = mac_or_ip_to_num(start_addr, mac) + mac_or_ip_to_num(
-                step, mac
-            )
-        else:
-            start_addr = mac_or_ip_to_num(start_addr, mac) - mac_or_ip_to_num(
-                step, mac
-            )
-        start_addr = num_to_mac_or_ip(start_addr, mac)
-    return addr_list
+    kind = "mac" if mac else "ipv4"
+    step = address_to_int(step, kind)
+    return AddressRange(start_addr, step if up else -step, count, kind=kind).to_list()
 
 
 def flow_transmit_matches(flow_results, state):
@@ -412,8 +378,4 @@ def to_hex(lst):
     Ex: [11,184] is converted to 0xbb8
         [0,30] is converted to 0x1e
     """
-    from functools import reduce
-
-    value = reduce(lambda x, y: hex(x) + hex(y), lst)
-    value = value[0:2] + value[2:].replace("0x", "").lstrip("0")
-    return value
+    return hex(int.from_bytes(bytes(lst), "big"))
@@ -0,0 +1,245 @@
+import threading
+import time
+
+import numpy as np
+from tabulate import tabulate
+
+
+class StatsSeries:
+    """
+    Time series of statistics in columnar storage.
+
+    Every sample is a row keyed by timestamp, every stat is a column keyed by
+    a tuple, e.g. (view, row, caption) or (stat source, caption). Values are
+    kept in a preallocated float64 array, grown by doubling, and missing
+    values are NaN. Samples with the same timestamp are merged into one row.
+
+    Usage:
+        series = StatsSeries()
+        series.add(time.time(), {("Traffic Item Statistics", "TI1", "Tx Frames"): 1000})
+        series.save("pps_stats.npz")
+        print(series.summary())
+    """
+
+    def __init__(self, capacity=1024, columns=16):
+        self.timestamps = np.full(capacity, np.nan)
+        self.values = np.full((capacity, columns), np.nan)
+        self.columns = {}
+        self.rows = {}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _column(self, key):
+        index = self.columns.get(key)
+        if index is None:
+            index = self.columns[key] = len(self.columns)
+            if index >= self.values.shape[1]:
+                grown = np.full((self.values.shape[0], 2 * self.values.shape[1]), np.nan)
+                grown[:, :self.values.shape[1]] = self.values
+                self.values = grown
+        return index
+
+    def _row(self, timestamp):
+        index = self.rows.get(timestamp)
+        if index is None:
+            index = self.rows[timestamp] = self.count
+            if index >= len(self.timestamps):
+                self.timestamps = np.concatenate([self.timestamps, np.full(len(self.timestamps), np.nan)])
+                self.values = np.concatenate([self.values, np.full(self.values.shape, np.nan)])
+            self.timestamps[index] = timestamp
+            self.count += 1
+        return index
+
+    def add(self, timestamp, sample):
+        """
+        Add {column key: value} sample, values which are not numbers are skipped
+        """
+        row = self._row(timestamp)
+        for key, value in sample.items():
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            column = self._column(key)
+            self.values[row, column] = value
+
+    def column_keys(self):
+        return sorted(self.columns, key=self.columns.get)
+
+    def series(self, key):
+        """
+        Returns tuple: (timestamps, values) of one column, ordered by time
+        """
+        order = np.argsort(self.timestamps[:self.count], kind="stable")
+        return self.timestamps[order], self.values[order, self.columns[key]]
+
+    def rates(self, key):
+        """
+        Per-second rates of a cumulative counter between consecutive samples
+        """
+        timestamps, values = self.series(key)
+        valid = ~np.isnan(values)
+        return np.diff(values[valid]) / np.diff(timestamps[valid])
+
+    def summary(self, keys=None, percentiles=(50, 90, 99)):
+        """
+        Returns list of rows: [column key, samples, min, mean, max, percentiles...]
+        """
+        rows = []
+        for key in keys or self.column_keys():
+            values = self.values[:self.count, self.columns[key]]
+            values = values[~np.isnan(values)]
+            if not len(values):
+                continue
+            rows.append([key, len(values), values.min(), values.mean(), values.max()] +
+                        list(np.percentile(values, percentiles)))
+        return rows
+
+    def rate_summary(self, keys=None, percentiles=(50, 90, 99)):
+        """
+        Same as summary(), for per-second rates of cumulative counters
+        """
+        rows = []
+        for key in keys or self.column_keys():
+            rates = self.rates(key)
+            if not len(rates):
+                continue
+            rows.append([key, len(rates), rates.min(), rates.mean(), rates.max()] +
+                        list(np.percentile(rates, percentiles)))
+        return rows
+
+    def print_summary(self, keys=None, percentiles=(50, 90, 99), rates=False):
+        rows = self.rate_summary(keys, percentiles) if rates else self.summary(keys, percentiles)
+        headers = ["Stat", "Samples", "Min", "Mean", "Max"] + ["p%g" % p for p in percentiles]
+        print(tabulate([[" / ".join(map(str, row[0]))] + row[1:] for row in rows],
+                       headers=headers, tablefmt="psql", floatfmt=".2f"))
+
+    def save(self, path):
+        """
+        Save as NPZ, or as Parquet (one column per stat) when path ends with .parquet
+        """
+        order = np.argsort(self.timestamps[:self.count], kind="stable")
+        timestamps = self.timestamps[order]
+        values = self.values[order, :len(self.columns)]
+        keys = self.column_keys()
+
+        if path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            names = ["timestamp"] + [" / ".join(map(str, key)) for key in keys]
+            arrays = [pa.array(timestamps)] + [pa.array(values[:, i]) for i in range(len(keys))]
+            pq.write_table(pa.Table.from_arrays(arrays, names=names), path)
+        else:
+            np.savez_compressed(path, timestamps=timestamps, values=values,
+                                columns=np.array(["\t".join(map(str, key)) for key in keys]))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load series saved as NPZ, column keys are tuples of strings
+        """
+        with np.load(path) as data:
+            series = cls(max(1, len(data["timestamps"])), max(1, len(data["columns"])))
+            series.count = len(data["timestamps"])
+            series.timestamps[:series.count] = data["timestamps"]
+            series.values[:series.count, :len(data["columns"])] = data["values"]
+            series.rows = {t: i for i, t in enumerate(data["timestamps"].tolist())}
+            series.columns = {tuple(key.split("\t")): i for i, key in enumerate(data["columns"].tolist())}
+        return series
+
+
+def ixnetwork_view_reader(api, view_name, key_column, stats=None):
+    """
+    Returns function reading IxNetwork statistics view (e.g. "Traffic Item Statistics")
+    as {(view_name, row key, caption): value}, rows are keyed by `key_column` value
+    """
+    from ixnetwork_restpy.assistants.statistics.statviewassistant import StatViewAssistant
+
+    def read():
+        view = StatViewAssistant(api, view_name)
+        captions = view.ColumnHeaders
+        key_index = captions.index(key_column)
+        wanted = [(i, caption) for i, caption in enumerate(captions)
+                  if i != key_index and (stats is None or caption in stats)]
+        return {(view_name, row[key_index], caption): row[i]
+                for row in view.Rows.RawData for i, caption in wanted}
+    return read
+
+
+def snappi_metrics_reader(api):
+    """
+    Returns function reading snappi port and flow metrics as {("port"|"flow", name, metric): value}
+    """
+    port_metrics = ["frames_tx", "frames_rx", "bytes_tx", "bytes_rx", "frames_tx_rate", "frames_rx_rate"]
+    flow_metrics = ["frames_tx", "frames_rx", "bytes_tx", "bytes_rx", "frames_tx_rate", "frames_rx_rate", "loss"]
+
+    def read():
+        sample = {}
+        request = api.metrics_request()
+        request.port.port_names = []
+        for stat in api.get_metrics(request).port_metrics or []:
+            sample.update({("port", stat.name, metric): getattr(stat, metric, None) for metric in port_metrics})
+        request = api.metrics_request()
+        request.flow.flow_names = []
+        for stat in api.get_metrics(request).flow_metrics or []:
+            sample.update({("flow", stat.name, metric): getattr(stat, metric, None) for metric in flow_metrics})
+        return sample
+    return read
+
+
+class StatsCollector:
+    """
+    Poll stat readers at a fixed interval into a StatsSeries, in the
+    foreground (collect) or in a background thread (start/stop).
+    A reader is a function returning {column key: value}, see ixnetwork_view_reader().
+
+    Usage:
+        collector = StatsCollector([ixnetwork_view_reader(ixnetwork, "Traffic Item Statistics", "Traffic Item")])
+        collector.start()
+        ...
+        series = collector.stop()
+        series.save("pps_stats.npz")
+    """
+
+    def __init__(self, readers, interval=1.0, series=None):
+        self.readers = list(readers)
+        self.interval = interval
+        self.series = series if series is not None else StatsSeries()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        timestamp = time.time()
+        for read in self.readers:
+            self.series.add(timestamp, read())
+
+    def _run(self, duration=None):
+        start = time.monotonic()
+        ticks = 0
+        while not self._stop.is_set():
+            self.poll()
+            ticks += 1
+            if duration is not None and ticks * self.interval > duration:
+                break
+            # Sleep until the next tick, reads taking long do not shift the schedule
+            self._stop.wait(max(0.0, start + ticks * self.interval - time.monotonic()))
+
+    def collect(self, duration):
+        self._stop.clear()
+        self._run(duration)
+        return self.series
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.series
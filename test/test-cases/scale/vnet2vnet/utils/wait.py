@@ -0,0 +1,136 @@
+import time
+
+from ixnetwork_restpy.assistants.statistics.statviewassistant import StatViewAssistant
+
+
+# IxNetwork statistics views refresh every 2s by default
+STATS_REFRESH_INTERVAL = 2
+
+
+class WaitTimeout(Exception):
+    pass
+
+
+def poll_until(condition, description, timeout=60, interval=0.5, max_interval=5, backoff=2.0):
+    """
+    Call `condition` until it returns a true value, sleeping `interval` seconds
+    after the first miss and `backoff` times longer after every next one, up to
+    `max_interval`. Returns the condition value.
+    Raises WaitTimeout after `timeout` seconds, Exception if the condition returns None.
+    """
+    start = time.monotonic()
+    while True:
+        result = condition()
+        elapsed = time.monotonic() - start
+        if result:
+            print("\t\t\tDone waiting for %s after %.1fs" % (description, elapsed))
+            return result
+        if result is None:
+            raise Exception("Wait aborted for %s" % description)
+        if elapsed >= timeout:
+            raise WaitTimeout("Time out occurred after %.1fs while waiting for %s" % (elapsed, description))
+        time.sleep(min(interval, max_interval, timeout - elapsed))
+        interval *= backoff
+
+
+def wait_until_stable(read, description, timeout=60, tolerance=0.0, stable_reads=2, interval=0.5, max_interval=5,
+                      raise_on_timeout=False, min_window=0):
+    """
+    Wait until `stable_reads` consecutive values returned by `read` (number or
+    tuple of numbers) differ by no more than `tolerance` relative to the value,
+    over at least `min_window` seconds from the first of them.
+    Returns the last value; on timeout returns it as well unless raise_on_timeout.
+    """
+    state = {"last": None, "stable": 0, "since": None}
+
+    def settled():
+        value = read()
+        now = time.monotonic()
+        values = value if isinstance(value, (tuple, list)) else (value,)
+        last = state["last"]
+        if last is not None and all(abs(v - l) <= tolerance * max(abs(v), abs(l)) for v, l in zip(values, last)):
+            state["stable"] += 1
+        else:
+            state["stable"] = 0
+            state["since"] = now
+        state["last"] = values
+        state["value"] = value
+        return state["stable"] + 1 >= stable_reads and now - state["since"] >= min_window
+
+    try:
+        poll_until(settled, description, timeout, interval, max_interval)
+    except WaitTimeout as e:
+        if raise_on_timeout:
+            raise
+        print("\t\t\t%s, continuing" % e)
+    return state["value"]
+
+
+def wait_counters_settled(read_counters, timeout=10, min_window=2 * STATS_REFRESH_INTERVAL, **kwargs):
+    """
+    Wait until cumulative counters, e.g. (Tx Frames, Rx Frames) after traffic is stopped, stop changing.
+    Counters must stay unchanged over `min_window` seconds, longer than the statistics view
+    refresh, since reads between two refreshes return the same stale values.
+    """
+    kwargs.setdefault("max_interval", STATS_REFRESH_INTERVAL)
+    return wait_until_stable(read_counters, "counters to settle", timeout, min_window=min_window, **kwargs)
+
+
+def wait_protocol_sessions_up(api, timeout=90):
+    """
+    Wait until no protocol session is down or not started in the IxNetwork Protocols Summary view
+    """
+
+    def sessions_up():
+        rows = StatViewAssistant(api, 'Protocols Summary').Rows
+        return all(int(row['Sessions Not Started']) == 0 and int(row['Sessions Down']) == 0 for row in rows)
+
+    return poll_until(sessions_up, "protocol sessions to come up", timeout=timeout)
+
+
+def wait_loss_steady(read_counters, timeout=30, tolerance=0.01, min_frames=1, min_window=2 * STATS_REFRESH_INTERVAL,
+                     **kwargs):
+    """
+    Wait until running traffic reaches steady state: frames are received and
+    both the receive rate and the loss ratio between reads change by no more
+    than `tolerance` relative, over at least `min_window` seconds.
+    `read_counters` returns cumulative (tx, rx). Reads where rx did not advance,
+    e.g. stale reads between two refreshes of the statistics view, give no new
+    rate, so steady state is only accepted once received frames are counted.
+    """
+    state = {"counters": None, "time": None, "value": (float("nan"), float("nan"))}
+
+    def rate_and_loss():
+        tx, rx = read_counters()
+        now = time.monotonic()
+        previous, previous_time = state["counters"], state["time"]
+        if previous is not None and rx == previous[1]:
+            return state["value"]
+        state["counters"], state["time"] = (tx, rx), now
+        if previous is None or previous[1] < min_frames:
+            # Values which never compare stable keep the wait going
+            return state["value"]
+        dtx, drx = tx - previous[0], rx - previous[1]
+        state["value"] = drx / max(now - previous_time, 1e-9), (dtx - drx) / dtx if dtx > 0 else 0.0
+        return state["value"]
+
+    kwargs.setdefault("max_interval", STATS_REFRESH_INTERVAL)
+    return wait_until_stable(rate_and_loss, "traffic to reach steady state", timeout, tolerance,
+                             min_window=min_window, **kwargs)
+
+
+def ixnetwork_counters(api, view_name="Traffic Item Statistics", captions=("Tx Frames", "Rx Frames")):
+    """
+    Returns function reading totals of IxNetwork view columns, (tx, rx) by default
+    """
+
+    def read():
+        view = StatViewAssistant(api, view_name)
+        headers = view.ColumnHeaders
+        indexes = [headers.index(caption) for caption in captions]
+        totals = [0] * len(captions)
+        for row in view.Rows.RawData:
+            for i, index in enumerate(indexes):
+                totals[i] += int(float(row[index] or 0))
+        return tuple(totals)
+    return read
@@ -0,0 +1,200 @@
+"""
+MAC, IPv4 and IPv6 address ranges backed by NumPy arrays.
+
+A range is defined the same way as the traffic generator and dpugen counters
+are: start address, step and count. All addresses are computed by one array
+operation, so expanding tens of thousands of ENI MACs, CA IPs or VTEPs does not
+loop in Python. Addresses wrap around the address space as the counters do.
+
+Usage:
+    vteps = AddressRange("221.0.1.11", "0.0.1.0", 48000)
+    vteps[1]                                # '221.0.2.11'
+    vteps[::1000].to_list()                 # every 1000th address as strings
+    enis = AddressRange("00:1A:C5:00:00:01", "00:00:00:08:00:00", 8)
+    enis.nested("00:00:00:01:00:00", 4)     # 4 MACs per ENI, grouped by ENI
+"""
+
+import ipaddress
+import socket
+
+import numpy as np
+
+ADDRESS_BITS = {
+    "mac": 48,
+    "ipv4": 32,
+    "ipv6": 128,
+}
+
+MASK64 = (1 << 64) - 1
+
+
+def address_kind(address):
+    """
+    Detect address kind of the string: "mac", "ipv4" or "ipv6"
+    """
+    if address.count(":") == 5 and "::" not in address and "." not in address:
+        return "mac"
+    return "ipv%d" % ipaddress.ip_address(address).version
+
+
+def address_to_int(address, kind=None):
+    """
+    Example:
+    address_to_int('00:0C:29:E3:53:EA')
+    returns: 52242371562
+    address_to_int('10.1.1.1')
+    returns: 167837953
+    """
+    if not isinstance(address, str):
+        return int(address)
+    if kind is None:
+        kind = address_kind(address)
+    if kind == "mac":
+        return int(address.replace(":", "").replace("-", ""), 16)
+    return int(ipaddress.ip_address(address))
+
+
+def int_to_address(number, kind):
+    """
+    Example:
+    int_to_address(52242371562, "mac")
+    returns: '00:0c:29:e3:53:ea'
+    int_to_address(167837953, "ipv4")
+    returns: '10.1.1.1'
+    """
+    number &= (1 << ADDRESS_BITS[kind]) - 1
+    if kind == "mac":
+        return ":".join("%02x" % b for b in number.to_bytes(6, "big"))
+    return str(ipaddress.ip_address(number) if kind == "ipv4" else ipaddress.IPv6Address(number))
+
+
+def _mul_hi64(a, b):
+    """
+    High 64 bits of the 128-bit products of uint64 arrays a and b < 2**32
+    """
+    a_hi, a_lo = a >> np.uint64(32), a & np.uint64(0xFFFFFFFF)
+    mid = a_hi * b + ((a_lo * b) >> np.uint64(32))
+    return mid >> np.uint64(32)
+
+
+class AddressRange:
+    """
+    Range of MAC, IPv4 or IPv6 addresses: start, start + step, ... (count addresses)
+
+    start: address string or integer (kind is required for integers)
+    step: address string (e.g. "0.0.1.0") or integer, negative to count down
+    kind: "mac", "ipv4" or "ipv6", detected from start by default
+
+    Addresses are kept as uint64 array `values`: one word per address for
+    MAC and IPv4, [high, low] word pairs for IPv6.
+    """
+
+    def __init__(self, start, step=1, count=1, kind=None):
+        if kind is None:
+            kind = address_kind(start)
+        self.kind = kind
+        self.bits = ADDRESS_BITS[kind]
+
+        start = address_to_int(start, kind)
+        step = address_to_int(step, kind) % (1 << self.bits)
+        self.values = self._expand(start, step, np.arange(count, dtype=np.uint64))
+
+    @classmethod
+    def from_values(cls, kind, values):
+        obj = cls.__new__(cls)
+        obj.kind = kind
+        obj.bits = ADDRESS_BITS[kind]
+        obj.values = values
+        return obj
+
+    def _expand(self, start, step, index):
+        """
+        start + step * index modulo address space for every index
+        """
+        if self.bits <= 64:
+            # uint64 arithmetic wraps modulo 2**64, which is a multiple of the address space
+            mask = np.uint64((1 << self.bits) - 1)
+            return (np.uint64(start) + np.uint64(step) * index) & mask
+
+        start_hi, start_lo = np.uint64(start >> 64), np.uint64(start & MASK64)
+        step_hi, step_lo = np.uint64(step >> 64), np.uint64(step & MASK64)
+
+        # Ranges are shorter than 2**32, so the low word product carries into the high word only
+        product_lo = step_lo * index
+        lo = start_lo + product_lo
+        carry = (lo < start_lo).astype(np.uint64)
+        hi = start_hi + step_hi * index + _mul_hi64(np.full_like(index, step_lo), index) + carry
+
+        return np.stack([hi, lo], axis=1)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) or isinstance(index, np.ndarray):
+            return AddressRange.from_values(self.kind, self.values[index])
+        return self.to_list(self.values[index:index + 1 or None])[0]
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __eq__(self, other):
+        return isinstance(other, AddressRange) and self.kind == other.kind and \
+            np.array_equal(self.values, other.values)
+
+    def __repr__(self):
+        if not len(self):
+            return "AddressRange(%s, count=0)" % self.kind
+        return "AddressRange(%s, %s..%s, count=%d)" % (self.kind, self[0], self[-1], len(self))
+
+    def ints(self):
+        """
+        Addresses as Python integers
+        """
+        if self.bits <= 64:
+            return self.values.tolist()
+        return [(int(hi) << 64) | int(lo) for hi, lo in self.values.tolist()]
+
+    def nested(self, step, count):
+        """
+        Expand every address of the range into `count` addresses `step` apart.
+        Returns range of len(self) * count addresses grouped by the address of self.
+        """
+        step = address_to_int(step, self.kind) % (1 << self.bits)
+        offsets = AddressRange(0, step, count, kind=self.kind).values
+
+        if self.bits <= 64:
+            mask = np.uint64((1 << self.bits) - 1)
+            values = (self.values[:, None] + offsets[None, :]) & mask
+            return AddressRange.from_values(self.kind, values.reshape(-1))
+
+        lo = self.values[:, None, 1] + offsets[None, :, 1]
+        carry = (lo < self.values[:, None, 1]).astype(np.uint64)
+        hi = self.values[:, None, 0] + offsets[None, :, 0] + carry
+        return AddressRange.from_values(self.kind, np.stack([hi, lo], axis=2).reshape(-1, 2))
+
+    def packed(self):
+        """
+        Addresses in network byte order, array of shape (count, address bytes)
+        """
+        if self.bits <= 64:
+            raw = self.values.astype(">u8").view(np.uint8).reshape(-1, 8)
+            return raw[:, 8 - self.bits // 8:]
+        return self.values.astype(">u8").view(np.uint8).reshape(-1, 16)
+
+    def to_list(self, values=None):
+        """
+        Addresses as strings, MACs in lower case with ':' separators
+        """
+        addresses = self if values is None else AddressRange.from_values(self.kind, values)
+        if not len(addresses):
+            return []
+
+        # Packed bytes are formatted by one C call per address
+        data = np.ascontiguousarray(addresses.packed()).tobytes()
+        size = self.bits // 8
+        if self.kind == "mac":
+            return [data[i:i + size].hex(":") for i in range(0, len(data), size)]
+        if self.kind == "ipv4":
+            return [socket.inet_ntoa(data[i:i + size]) for i in range(0, len(data), size)]
+        return [socket.inet_ntop(socket.AF_INET6, data[i:i + size]) for i in range(0, len(data), size)]
@@ -0,0 +1,364 @@
+"""
+Stage traces of packets in bmv2 simple_switch logs.
+
+simple_switch (run with --log-console or --log-file, debug level) logs every
+step of every packet with the packet id:
+
+    [12:01:02.345] [bmv2] [D] [thread 77] [12.0] [cxt 0] Table 'dash_ingress.outbound.outbound_routing_stage.routing': hit with handle 3
+    [12:01:02.345] [bmv2] [D] [thread 77] [12.0] [cxt 0] Action entry is dash_ingress.outbound.outbound_routing_stage.route_vnet - 2,0,
+
+Bmv2LogTrace reads such logs and rebuilds, for every packet, the list of
+tables applied with hit or miss and the action run, each table assigned to its
+dash_ingress stage (the control path of the table, e.g.
+"outbound.outbound_routing_stage"). With the P4Info of the program
+(dash_pipeline_p4rt.json) tables also get their SAI API name, from the P4
+table ids of the generated SAI specs. Packets end when transmitted or dropped.
+
+It also aggregates table hits and misses, actions, packet outcomes and the
+time spent in every stage (log timestamps have millisecond resolution, so
+stage times are meaningful summed over many packets).
+
+Logs are read through memory maps of one window at a time. One compiled
+regex, an alternative per handled message, finds the handled lines of a
+window, skipping other lines (primitives, key dumps, parser and deparser
+steps) without Python code, and every line is dispatched to the handler of
+the alternative that matched. Memory stays bounded for logs of any size:
+only packets in flight are tracked (the oldest are closed as incomplete beyond
+max_in_flight) and only the last `keep` finished traces are kept, optionally
+only the dropped ones.
+
+Usage:
+    trace = Bmv2LogTrace(P4Names("dash_pipeline_p4rt.json"), keep=100, only_dropped=True)
+    trace.parse("simple_switch.log").close()
+    print(trace.summary())
+    for packet in trace.traces:
+        print(packet.format())
+"""
+
+import json
+import mmap
+import os
+import re
+from collections import Counter, OrderedDict, deque
+
+from sai_p4_tables import SPEC_DIR, load_spec
+
+INGRESS = "dash_ingress"
+
+# Messages handled, with the name of their handler
+MESSAGES = (
+    (rb"Processing packet received on port (\d+)", "_received"),
+    (rb"Applying table '([^']+)'", "_applying"),
+    (rb"Table '([^']+)': (hit|miss)", "_table_result"),
+    (rb"Action entry is (\S+) - ", "_action"),
+    (rb"Egress port is (\d+)", "_egress"),
+    (rb"Transmitting packet of size \d+ out of port (\d+)", "_transmitted"),
+    (rb"Dropping packet at the end of (\w+)", "_dropped"),
+)
+
+# The message part of the lines of handled messages, one alternative per message,
+# other lines do not match
+MESSAGE_RE = re.compile(rb"\[cxt \d+\] (?:" + b"|".join(pattern for pattern, _ in MESSAGES) + rb")")
+
+# [time] [logger] [level] [thread id] [packet id] before [cxt id]
+PREFIX_RE = re.compile(rb"\[(\d+):(\d+):(\d+)\.(\d+)\] \[[^\]\n]*\] \[\w\] \[thread \d+\] \[(\d+\.\d+)\] ")
+
+# Bytes of the log mapped at once
+WINDOW = 16 << 20
+
+OUTCOMES = ("transmitted", "dropped", "incomplete")
+
+
+def log_chunks(path, window=WINDOW):
+    """
+    Contents of a log file in chunks of whole lines, read through memory maps
+    of `window` bytes, so only one window is mapped at a time
+    """
+    window -= window % mmap.ALLOCATIONGRANULARITY
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        rest = b""
+        for offset in range(0, size, window):
+            with mmap.mmap(f.fileno(), min(window, size - offset), offset=offset, access=mmap.ACCESS_READ) as data:
+                end = data.rfind(b"\n") + 1
+                if not end:
+                    rest += data[:]
+                    continue
+                yield rest + data[:end] if rest else data[:end]
+                rest = data[end:]
+        if rest:
+            yield rest
+
+
+class P4Names:
+    """
+    Stage, short name and SAI API name of P4 tables, by the fully qualified
+    table name of bmv2, SAI API names need the P4Info JSON
+    """
+
+    def __init__(self, p4info=None, spec_dir=SPEC_DIR):
+        self.sai_names = {}
+        if p4info is None:
+            return
+
+        sai_apis = {}
+        for path in os.listdir(spec_dir):
+            if not path.endswith(".yaml") or path == "sai_spec.yaml":
+                continue
+            for api in load_spec(os.path.join(spec_dir, path)).get("sai_apis") or []:
+                for table in (api.get("p4_meta") or {}).get("tables") or []:
+                    sai_apis[table["id"]] = api["name"]
+
+        with open(p4info) as f:
+            program = json.load(f)
+        for table in program.get("tables", []):
+            preamble = table["preamble"]
+            if preamble["id"] in sai_apis:
+                self.sai_names[preamble["name"]] = sai_apis[preamble["id"]]
+
+    def table(self, name):
+        """
+        (stage, short table name, SAI API name or None) of a fully qualified table name
+        """
+        path = name.split(".")
+        if path[0] == INGRESS:
+            path = path[1:]
+        stage = ".".join(path[:-1]) or INGRESS
+        return stage, path[-1], self.sai_names.get(name)
+
+
+class TableStep:
+    __slots__ = ("stage", "table", "sai_name", "hit", "action", "time")
+
+    def __init__(self, stage, table, sai_name, time):
+        self.stage = stage
+        self.table = table
+        self.sai_name = sai_name
+        self.hit = None
+        self.action = None
+        self.time = time
+
+    def __repr__(self):
+        return "TableStep(%s.%s, %s, %s)" % (
+            self.stage, self.table, {True: "hit", False: "miss", None: "?"}[self.hit], self.action)
+
+
+class PacketTrace:
+    """
+    Tables applied to one packet in order, with the outcome
+
+    id: bmv2 packet id ("12.0"), port: ingress port, egress_port: None if not set
+    outcome: "transmitted", "dropped" or "incomplete" (log ended or evicted)
+    """
+
+    __slots__ = ("id", "port", "start", "end", "steps", "egress_port", "outcome", "dropped_at")
+
+    def __init__(self, packet_id, port, start):
+        self.id = packet_id
+        self.port = port
+        self.start = start
+        self.end = start
+        self.steps = []
+        self.egress_port = None
+        self.outcome = "incomplete"
+        self.dropped_at = None
+
+    def __repr__(self):
+        return "PacketTrace(%s, port %s, %d tables, %s)" % (self.id, self.port, len(self.steps), self.outcome)
+
+    @property
+    def last_table(self):
+        return self.steps[-1] if self.steps else None
+
+    def stage_times(self):
+        """
+        Seconds from the first table of every stage to the next stage or the end of the packet
+        """
+        times = Counter()
+        for step, following in zip(self.steps, self.steps[1:] + [None]):
+            times[step.stage] += (following.time if following else self.end) - step.time
+        return times
+
+    def format(self):
+        lines = ["Packet %s from port %s: %s%s" % (
+            self.id, self.port, self.outcome,
+            " at the end of %s" % self.dropped_at if self.dropped_at else
+            " to port %s" % self.egress_port if self.egress_port is not None else "")]
+        for step in self.steps:
+            lines.append("  %-40s %-32s %-4s %s" % (
+                step.stage, step.table + (" (%s)" % step.sai_name if step.sai_name else ""),
+                {True: "hit", False: "miss", None: "?"}[step.hit], step.action or ""))
+        return "\n".join(lines)
+
+
+class Bmv2LogTrace:
+    """
+    Packet traces and table statistics of bmv2 logs
+
+    names: P4Names, tables get no SAI API names by default
+    keep: number of finished traces kept, the latest ones
+    only_dropped: keep only traces of dropped or incomplete packets
+    synthetic: include the tables p4c generates for actions called from apply blocks (tbl_*)
+    max_in_flight: packets tracked at once, the oldest are closed as incomplete beyond it
+    """
+
+    def __init__(self, names=None, keep=1000, only_dropped=False, synthetic=False, max_in_flight=10000):
+        self.names = names or P4Names()
+        self.only_dropped = only_dropped
+        self.synthetic = synthetic
+        self.max_in_flight = max_in_flight
+        self.traces = deque(maxlen=keep)
+        self.in_flight = OrderedDict()
+
+        self.lines = 0
+        self.packets = Counter()
+        self.table_results = Counter()
+        self.actions = Counter()
+        self.drop_tables = Counter()
+        self.stage_times = Counter()
+        self.stage_packets = Counter()
+        self._tables = {}
+
+        # Last group of the message alternative of MESSAGE_RE -> handler and the groups of the message
+        self._handlers = {}
+        group = 0
+        for pattern, handler in MESSAGES:
+            groups = re.compile(pattern).groups
+            self._handlers[group + groups] = (getattr(self, handler), slice(group, group + groups))
+            group += groups
+
+    def parse(self, path):
+        """
+        Read a log file, packets still in flight at the end stay open for the next file
+        """
+        for chunk in log_chunks(path):
+            self.feed(chunk)
+        return self
+
+    def feed(self, data):
+        """
+        Process log data (bytes of whole lines)
+        """
+        self.lines += data.count(b"\n")
+        handlers = self._handlers
+        times = {}
+        for match in MESSAGE_RE.finditer(data):
+            position = match.start()
+            prefix = PREFIX_RE.match(data, data.rfind(b"\n", 0, position) + 1, position)
+            if prefix is None:
+                continue
+            stamp = prefix.group(1, 2, 3, 4)
+            time = times.get(stamp)
+            if time is None:
+                hours, minutes, seconds, fraction = stamp
+                time = times[stamp] = (int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+                                       + int(fraction) / 10 ** len(fraction))
+            handler, groups = handlers[match.lastindex]
+            handler(prefix.group(5), time, *match.groups()[groups])
+
+    def close(self):
+        """
+        Finish the packets still in flight as incomplete
+        """
+        while self.in_flight:
+            self._finish(next(iter(self.in_flight)))
+        return self
+
+    def _packet(self, packet_id, time):
+        packet = self.in_flight.get(packet_id)
+        if packet is None:
+            packet = self._start(packet_id, None, time)
+        packet.end = time
+        return packet
+
+    def _start(self, packet_id, port, time):
+        if packet_id in self.in_flight:
+            self._finish(packet_id)
+        packet = self.in_flight[packet_id] = PacketTrace(packet_id.decode(), port, time)
+        if len(self.in_flight) > self.max_in_flight:
+            self._finish(next(iter(self.in_flight)))
+        return packet
+
+    def _finish(self, packet_id, outcome="incomplete"):
+        packet = self.in_flight.pop(packet_id)
+        packet.outcome = outcome
+        self.packets[outcome] += 1
+        if outcome != "transmitted" and packet.steps:
+            last = packet.steps[-1]
+            self.drop_tables[(last.stage, last.table, last.hit)] += 1
+        for stage, seconds in packet.stage_times().items():
+            self.stage_times[stage] += seconds
+            self.stage_packets[stage] += 1
+        if not self.only_dropped or outcome != "transmitted":
+            self.traces.append(packet)
+
+    def _table(self, name):
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables[name] = self.names.table(name.decode())
+        return table
+
+    def _received(self, packet_id, time, port):
+        self._start(packet_id, int(port), time)
+
+    def _applying(self, packet_id, time, name):
+        stage, table, sai_name = self._table(name)
+        if not self.synthetic and table.startswith("tbl_"):
+            return
+        self._packet(packet_id, time).steps.append(TableStep(stage, table, sai_name, time))
+
+    def _table_result(self, packet_id, time, name, result):
+        stage, table, _ = self._table(name)
+        packet = self._packet(packet_id, time)
+        step = packet.last_table
+        if step is None or step.table != table or step.hit is not None:
+            return
+        step.hit = result == b"hit"
+        self.table_results[(stage, table, step.hit)] += 1
+
+    def _action(self, packet_id, time, action):
+        packet = self._packet(packet_id, time)
+        step = packet.last_table
+        if step is None or step.action is not None or step.hit is None:
+            return
+        step.action = action.decode().rsplit(".", 1)[-1]
+        self.actions[(step.stage, step.table, step.action)] += 1
+
+    def _egress(self, packet_id, time, port):
+        self._packet(packet_id, time).egress_port = int(port)
+
+    def _transmitted(self, packet_id, time, port):
+        self._packet(packet_id, time).egress_port = int(port)
+        self._finish(packet_id, "transmitted")
+
+    def _dropped(self, packet_id, time, pipeline):
+        self._packet(packet_id, time).dropped_at = pipeline.decode()
+        self._finish(packet_id, "dropped")
+
+    def table_counts(self):
+        """
+        (stage, table) -> (hits, misses)
+        """
+        counts = {}
+        for (stage, table, hit), count in self.table_results.items():
+            hits, misses = counts.get((stage, table), (0, 0))
+            counts[(stage, table)] = (hits + count, misses) if hit else (hits, misses + count)
+        return counts
+
+    def summary(self):
+        lines = ["%d lines, packets: %s" % (self.lines, ", ".join(
+            "%s %d" % (outcome, self.packets[outcome]) for outcome in OUTCOMES if self.packets[outcome]))]
+        lines.append("Tables (hits/misses):")
+        for (stage, table), (hits, misses) in sorted(self.table_counts().items()):
+            lines.append("  %-40s %-32s %8d %8d" % (stage, table, hits, misses))
+        lines.append("Actions:")
+        for (stage, table, action), count in sorted(self.actions.items()):
+            lines.append("  %-40s %-32s %-32s %8d" % (stage, table, action, count))
+        if self.drop_tables:
+            lines.append("Last table of dropped packets:")
+            for (stage, table, hit), count in self.drop_tables.most_common():
+                lines.append("  %-40s %-32s %-4s %8d" % (stage, table, {True: "hit", False: "miss", None: "?"}[hit], count))
+        lines.append("Stage times (ms per packet):")
+        for stage, seconds in sorted(self.stage_times.items()):
+            lines.append("  %-40s %8.3f" % (stage, 1000 * seconds / self.stage_packets[stage]))
+        return "\n".join(lines)
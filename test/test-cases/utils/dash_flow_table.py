@@ -0,0 +1,576 @@
+"""
+Software model of the DASH flow table (conntrack_lookup.p4).
+
+FlowTable keeps flow entries keyed by the 8 fields of flow_key (ENI MAC, VNET,
+protocol, source and destination IP, ports, IP version), with the key fields
+masked by the flow_enabled_key of the table as set_flow_key does: fields not
+enabled are zero. Flows age out flow_ttl_in_milliseconds after they were last
+seen, max_flow_count bounds the number of entries (0 is no limit).
+
+Entries live in NumPy arrays indexed by slot, open addressing with linear
+probing over a power of two capacity kept at most half full. Batches of keys
+are hashed, probed and written with array operations, so inserts and lookups
+run at millions per second. Aging uses a hashed timer wheel: slots are
+scheduled in the bucket of their expiry tick, and entries refreshed since are
+rescheduled when their old bucket comes due.
+
+process() follows conntrack_flow_handle for a batch of packets in order: a
+miss on a TCP SYN or UDP packet creates the flow, FIN or RST on a hit deletes
+it, other hits refresh it, other misses are dropped. Packets are handled in
+rounds of one packet of every flow; when the batch may fill the table, in
+runs of consecutive packets instead, so flows are created and deleted in
+packet order.
+
+bulk_get() returns the entries matching up to 5 bulk get session filters, as
+flow_entry_bulk_get_session does: each filter compares one key field (or the
+flow table ID, or the entry version) with an int, IP or MAC value.
+
+Usage:
+    table = FlowTable(max_flow_count=1000000, ttl_ms=30000)
+    keys = table.keys(eni_mac, vnet_id, flows.protocol, flows.sip, flows.dip,
+                      flows.src_port, flows.dst_port, flows.is_v6)
+    events = table.process(keys, now_ms, tcp_flags)
+    table.age(now_ms + 30000)
+    flows = table.bulk_get([BulkGetFilter("SRC_L4_PORT", "GREATER_THAN", 1000)])
+"""
+
+import numpy as np
+
+from address_range import address_to_int
+from sai_p4_tables import P4Schema
+
+FLOW_KEY_ENI_MAC = 1 << 0
+FLOW_KEY_VNI = 1 << 1
+FLOW_KEY_PROTOCOL = 1 << 2
+FLOW_KEY_SRC_IP = 1 << 3
+FLOW_KEY_DST_IP = 1 << 4
+FLOW_KEY_SRC_PORT = 1 << 5
+FLOW_KEY_DST_PORT = 1 << 6
+# All key fields, used when the ENI has no flow table
+FLOW_KEY_ALL = (1 << 7) - 1
+
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+PROTOCOL_TCP = 6
+PROTOCOL_UDP = 17
+
+# Result of every packet of process()
+FLOW_EVENTS = ("hit", "created", "deleted", "dropped", "full")
+FLOW_EVENT_CODES = {name: code for code, name in enumerate(FLOW_EVENTS)}
+
+# Packed flow key words: ENI MAC and VNET, source IP, destination IP, ports, protocol and IP version
+KEY_WORDS = 6
+
+FLOW_DTYPE = np.dtype([
+    ("eni_mac", np.uint64),
+    ("vnet_id", np.uint16),
+    ("ip_proto", np.uint8),
+    ("src_ip", np.uint64, (2,)),
+    ("dst_ip", np.uint64, (2,)),
+    ("src_port", np.uint16),
+    ("dst_port", np.uint16),
+    ("is_v6", np.bool_),
+    ("version", np.uint32),
+    ("direction", np.uint8),
+    ("actions", np.uint32),
+    ("meter_class", np.uint32),
+    ("created", np.int64),
+    ("last_seen", np.int64),
+])
+
+EMPTY = 0
+USED = 1
+DELETED = 2
+
+FILTER_OPS = {
+    "EQUAL_TO": np.equal,
+    "GREATER_THAN": np.greater,
+    "GREATER_THAN_OR_EQUAL_TO": np.greater_equal,
+    "LESS_THAN": np.less,
+    "LESS_THAN_OR_EQUAL_TO": np.less_equal,
+}
+
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def pack_flow_keys(eni_mac, vnet_id, protocol, sip, dip, src_port, dst_port, is_v6, enabled_key=FLOW_KEY_ALL):
+    """
+    Flow keys as (count, KEY_WORDS) uint64, fields not in enabled_key are zero
+
+    sip, dip: (count, 2) [high, low] words, other fields scalars or arrays
+    """
+    count = len(sip)
+
+    def field(value, flag):
+        value = np.broadcast_to(np.asarray(value, dtype=np.uint64), (count,) + np.shape(value)[1:])
+        return value if enabled_key & flag else np.zeros_like(value)
+
+    keys = np.empty((count, KEY_WORDS), dtype=np.uint64)
+    keys[:, 0] = (field(eni_mac, FLOW_KEY_ENI_MAC) << np.uint64(16)) | field(vnet_id, FLOW_KEY_VNI)
+    keys[:, 1:3] = field(sip, FLOW_KEY_SRC_IP)
+    keys[:, 3:5] = field(dip, FLOW_KEY_DST_IP)
+    keys[:, 5] = ((field(src_port, FLOW_KEY_SRC_PORT) << np.uint64(32)) |
+                  (field(dst_port, FLOW_KEY_DST_PORT) << np.uint64(16)) |
+                  (field(protocol, FLOW_KEY_PROTOCOL) << np.uint64(8)) |
+                  np.broadcast_to(np.asarray(is_v6, dtype=np.uint64), (count,)))
+    return keys
+
+
+def _hash(keys):
+    h = np.zeros(len(keys), dtype=np.uint64)
+    for word in range(KEY_WORDS):
+        h = (h ^ keys[:, word]) * HASH_MULTIPLIER
+        h ^= h >> np.uint64(29)
+    return h
+
+
+def _groups(keys):
+    """
+    Rows of the first occurrence of every distinct key in order, and the key number of every row
+    """
+    if not len(keys):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # Sorting by hash is several times faster than np.unique(axis=0)
+    hashes = _hash(keys)
+    order = np.argsort(hashes, kind="stable")
+    hashes, sorted_keys = hashes[order], keys[order]
+    same_key = (sorted_keys[1:] == sorted_keys[:-1]).all(axis=1)
+    if ((hashes[1:] == hashes[:-1]) & ~same_key).any():
+        # Distinct keys with the same hash
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+    else:
+        start = np.r_[True, ~same_key]
+        first = order[start]
+        inverse = np.empty(len(keys), dtype=np.int64)
+        inverse[order] = np.cumsum(start) - 1
+    appearance = np.argsort(first)
+    rank = np.empty_like(appearance)
+    rank[appearance] = np.arange(len(appearance))
+    return first[appearance], rank[inverse]
+
+
+class BulkGetFilter:
+    """
+    Bulk get session filter: key field, comparison and value
+
+    key: filter key name without prefix, e.g. "SRC_IP_ADDR", op: e.g. "EQUAL_TO",
+    value: int, IP or MAC string
+    """
+
+    FIELDS = {
+        "FLOW_TABLE_ID": None,
+        "ENI_MAC": "eni_mac",
+        "IP_PROTOCOL": "ip_proto",
+        "SRC_IP_ADDR": "src_ip",
+        "DST_IP_ADDR": "dst_ip",
+        "SRC_L4_PORT": "src_port",
+        "DST_L4_PORT": "dst_port",
+        "KEY_VERSION": "version",
+    }
+
+    def __init__(self, key, op, value):
+        if key not in self.FIELDS:
+            raise ValueError("Unsupported bulk get filter key %s" % key)
+        if op not in FILTER_OPS:
+            raise ValueError("Unsupported bulk get filter op %s" % op)
+        self.key = key
+        self.op = op
+        self.value = address_to_int(value)
+
+    def __repr__(self):
+        return "BulkGetFilter(%s %s %s)" % (self.key, self.op, self.value)
+
+    @classmethod
+    def from_entry(cls, entry):
+        """
+        Filter of a flow_entry_bulk_get_session_filter P4Entry
+        """
+        key = entry.params["dash_flow_entry_bulk_get_session_filter_key"]
+        op = entry.params["dash_flow_entry_bulk_get_session_op_key"]
+        key_names = ("INVALID",) + tuple(cls.FIELDS)
+        op_names = ("INVALID",) + tuple(FILTER_OPS)
+        value = entry.params["int_value"] or 0
+        if key_names[key] == "ENI_MAC":
+            value = entry.params["mac_value"] or 0
+        elif key_names[key] in ("SRC_IP_ADDR", "DST_IP_ADDR"):
+            value = (entry.params["ip_value"] or (0, False))[0]
+        return cls(key_names[key], op_names[op], value)
+
+    def match(self, entries, table_id):
+        """
+        Mask of the entries passing the filter
+        """
+        compare = FILTER_OPS[self.op]
+        if self.key == "FLOW_TABLE_ID":
+            return np.full(len(entries), bool(compare(table_id, self.value)))
+        column = entries[self.FIELDS[self.key]]
+        if column.ndim == 1:
+            return compare(column, np.uint64(self.value))
+        # 128-bit IP: compare the high words, the low words when equal
+        hi, lo = np.uint64(self.value >> 64), np.uint64(self.value & ((1 << 64) - 1))
+        return np.where(column[:, 0] == hi, compare(column[:, 1], lo), compare(column[:, 0], hi))
+
+
+class FlowTable:
+    """
+    Flow entries of one flow table
+
+    max_flow_count: limit of entries, 0 for no limit
+    enabled_key: FLOW_KEY_* bits of the key fields used
+    ttl_ms: idle time before a flow ages out, 0 for no aging
+    table_id: object number of the table, compared by FLOW_TABLE_ID filters
+    tick_ms: timer wheel resolution, ttl_ms / 64 by default
+    """
+
+    WHEEL_SIZE = 256
+
+    def __init__(self, max_flow_count=0, enabled_key=FLOW_KEY_ALL, ttl_ms=0, table_id=0, tick_ms=None,
+                 capacity=1024):
+        self.max_flow_count = max_flow_count
+        self.enabled_key = enabled_key
+        self.ttl_ms = ttl_ms
+        self.table_id = table_id
+        self.tick_ms = max(1, tick_ms or ttl_ms // 64)
+        self.count = 0
+        self.aged = 0
+        self._allocate(1 << max(4, (2 * max(capacity, max_flow_count) - 1).bit_length()))
+
+    @classmethod
+    def from_entry(cls, entry, **kwargs):
+        """
+        Table of a flow_table P4Entry
+        """
+        return cls(entry.params["max_flow_count"] or 0,
+                   entry.params["dash_flow_enabled_key"] or FLOW_KEY_ALL,
+                   entry.params["flow_ttl_in_milliseconds"] or 0,
+                   entry.key["oid"], **kwargs)
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return "FlowTable(%d flows, capacity %d, ttl %d ms, enabled key 0x%x)" % (
+            self.count, self.capacity, self.ttl_ms, self.enabled_key)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.mask = np.uint64(capacity - 1)
+        self.state = np.zeros(capacity, dtype=np.uint8)
+        self.slot_keys = np.zeros((capacity, KEY_WORDS), dtype=np.uint64)
+        self.data = np.zeros(capacity, dtype=FLOW_DTYPE)
+        self.expires = np.zeros(capacity, dtype=np.int64)
+        self.wheel = [[] for _ in range(self.WHEEL_SIZE)]
+        self.tick = None
+        self.deleted = 0
+
+    def _rehash(self, capacity):
+        used = np.flatnonzero(self.state == USED)
+        keys, data, expires = self.slot_keys[used], self.data[used], self.expires[used]
+        self._allocate(capacity)
+        slots = self._claim(keys)
+        self.slot_keys[slots] = keys
+        self.data[slots] = data
+        self.expires[slots] = expires
+        self._schedule(slots[expires > 0])
+
+    def keys(self, eni_mac, vnet_id, protocol, sip, dip, src_port, dst_port, is_v6):
+        """
+        Packed flow keys, masked by the enabled key of the table
+        """
+        return pack_flow_keys(eni_mac, vnet_id, protocol, sip, dip, src_port, dst_port, is_v6, self.enabled_key)
+
+    def lookup(self, keys):
+        """
+        Slot of every key, -1 on miss
+        """
+        result = np.full(len(keys), -1, dtype=np.int64)
+        pending = np.arange(len(keys))
+        slots = _hash(keys) & self.mask
+        while len(pending):
+            state = self.state[slots]
+            found = (state == USED) & (self.slot_keys[slots] == keys[pending]).all(axis=1)
+            result[pending[found]] = slots[found]
+            more = ~found & (state != EMPTY)
+            pending, slots = pending[more], (slots[more] + np.uint64(1)) & self.mask
+        return result
+
+    def _claim(self, keys):
+        """
+        Free slots for keys known to be absent and distinct
+        """
+        result = np.empty(len(keys), dtype=np.int64)
+        pending = np.arange(len(keys))
+        slots = _hash(keys) & self.mask
+        while len(pending):
+            free = self.state[slots] != USED
+            # One key per free slot, the others probe on
+            _, first = np.unique(slots[free], return_index=True)
+            winners = np.flatnonzero(free)[first]
+            won = np.zeros(len(pending), dtype=np.bool_)
+            won[winners] = True
+            result[pending[won]] = slots[won]
+            self.deleted -= int((self.state[slots[won]] == DELETED).sum())
+            self.state[slots[won]] = USED
+            pending, slots = pending[~won], (slots[~won] + np.uint64(1)) & self.mask
+        return result
+
+    def _schedule(self, slots):
+        if not self.ttl_ms or not len(slots):
+            return
+        buckets = (self.expires[slots] // self.tick_ms) % self.WHEEL_SIZE
+        order = np.argsort(buckets, kind="stable")
+        slots, buckets = slots[order], buckets[order]
+        bounds = np.flatnonzero(np.diff(buckets)) + 1
+        for group, bucket in zip(np.split(slots, bounds), buckets[np.r_[0, bounds]]):
+            self.wheel[int(bucket)].append(group)
+
+    def insert(self, keys, now=0, **fields):
+        """
+        Create or update flows, returns the mask of keys stored (False when the table is full)
+
+        fields: values of FLOW_DTYPE columns, e.g. version, direction, actions, meter_class.
+        Repeated keys store the values of their first occurrence.
+        """
+        first, inverse = _groups(keys)
+        unique = keys[first]
+
+        capacity = self.capacity
+        while (self.count + len(first)) * 2 > capacity:
+            capacity *= 2
+        if (self.count + self.deleted + len(first)) * 2 > capacity or capacity != self.capacity:
+            self._rehash(capacity)
+
+        slots = self.lookup(unique)
+        new = slots < 0
+        if self.max_flow_count:
+            new[np.flatnonzero(new)[max(0, self.max_flow_count - self.count):]] = False
+        slots[new] = self._claim(unique[new])
+        self.expires[slots[new]] = 0
+        self.count += int(new.sum())
+
+        stored = slots >= 0
+        rows, slots = first[stored], slots[stored]
+        self.slot_keys[slots] = keys[rows]
+        words = self.slot_keys[slots]
+        columns = {
+            "eni_mac": words[:, 0] >> np.uint64(16),
+            "vnet_id": words[:, 0] & np.uint64(0xFFFF),
+            "src_ip": words[:, 1:3],
+            "dst_ip": words[:, 3:5],
+            "src_port": words[:, 5] >> np.uint64(32),
+            "dst_port": (words[:, 5] >> np.uint64(16)) & np.uint64(0xFFFF),
+            "ip_proto": (words[:, 5] >> np.uint64(8)) & np.uint64(0xFF),
+            "is_v6": words[:, 5] & np.uint64(1),
+        }
+        for name, value in fields.items():
+            columns[name] = np.broadcast_to(value, (len(keys),))[rows]
+        for name, value in columns.items():
+            self.data[name][slots] = value
+        self.data["created"][slots[new[stored]]] = now
+        self.touch(slots, now)
+        return stored[inverse]
+
+    def delete(self, keys):
+        """
+        Remove flows, returns the mask of keys found
+        """
+        slots = self.lookup(keys)
+        found = slots >= 0
+        removed = np.unique(slots[found])
+        self.state[removed] = DELETED
+        self.count -= len(removed)
+        self.deleted += len(removed)
+        return found
+
+    def touch(self, slots, now):
+        """
+        Restart the aging timer of flows, slots must be distinct
+        """
+        self.data["last_seen"][slots] = now
+        if self.ttl_ms:
+            new = self.expires[slots] == 0
+            self.expires[slots] = now + self.ttl_ms
+            # Slots already scheduled are rescheduled when their bucket comes due
+            self._schedule(slots[new])
+
+    def age(self, now):
+        """
+        Remove flows idle for the TTL, returns the number removed
+        """
+        if not self.ttl_ms:
+            return 0
+        tick = now // self.tick_ms
+        start = tick - self.WHEEL_SIZE + 1 if self.tick is None else self.tick + 1
+        buckets = range(start, tick + 1) if tick - start < self.WHEEL_SIZE else range(self.WHEEL_SIZE)
+        due = []
+        for bucket in buckets:
+            due.extend(self.wheel[bucket % self.WHEEL_SIZE])
+            self.wheel[bucket % self.WHEEL_SIZE] = []
+        self.tick = tick
+        if not due:
+            return 0
+
+        slots = np.unique(np.concatenate(due))
+        slots = slots[self.state[slots] == USED]
+        expired = slots[self.expires[slots] <= now]
+        self.state[expired] = DELETED
+        self.expires[expired] = 0
+        self.count -= len(expired)
+        self.deleted += len(expired)
+        self.aged += len(expired)
+        self._schedule(slots[self.expires[slots] > now])
+        return len(expired)
+
+    def process(self, keys, now, tcp_flags=0, protocol=None, **fields):
+        """
+        Flow event of every packet in order, see FLOW_EVENTS
+
+        tcp_flags: TCP flags of every packet, protocol: IP protocol of every
+        packet, taken from the keys by default (needs the PROTOCOL key field)
+        fields: values of FLOW_DTYPE columns for created flows
+        """
+        count = len(keys)
+        events = np.full(count, FLOW_EVENT_CODES["dropped"], dtype=np.uint8)
+        tcp_flags = np.broadcast_to(np.asarray(tcp_flags, dtype=np.uint64), (count,))
+        if protocol is None:
+            protocol = (keys[:, 5] >> np.uint64(8)) & np.uint64(0xFF)
+        protocol = np.broadcast_to(np.asarray(protocol, dtype=np.uint64), (count,))
+        fields = {name: np.broadcast_to(value, (count,)) for name, value in fields.items()}
+        self.age(now)
+
+        closes = (tcp_flags & np.uint64(TCP_FIN | TCP_RST)) != 0
+        opens = ((protocol == PROTOCOL_TCP) & (tcp_flags == TCP_SYN)) | (protocol == PROTOCOL_UDP)
+        if self.max_flow_count and self.count + int(opens.sum()) > self.max_flow_count:
+            # Which flows fit depends on the order of creates and deletes, keep the packet order
+            for start, stop in self._segments(keys, closes, opens):
+                self._process_rows(np.arange(start, stop), keys, now, closes, opens, fields, events)
+            return events
+
+        # Packets of one flow are handled in order, in rounds of one packet of every flow
+        pending = np.arange(count)
+        while len(pending):
+            rows = pending[_groups(keys[pending])[0]]
+            self._process_rows(rows, keys, now, closes, opens, fields, events)
+            done = np.zeros(count, dtype=np.bool_)
+            done[rows] = True
+            pending = pending[~done[pending]]
+        return events
+
+    @staticmethod
+    def _segments(keys, closes, opens):
+        """
+        Consecutive packets handled at once with the same result as one by one: distinct flows,
+        no FIN or RST after a packet which may create a flow
+        """
+        flows = _groups(keys)[1].tolist()
+        closes, opens = closes.tolist(), opens.tolist()
+        start, seen, opened = 0, set(), False
+        for row, flow in enumerate(flows):
+            if flow in seen or (opened and closes[row]):
+                yield start, row
+                start, seen, opened = row, set(), False
+            seen.add(flow)
+            opened |= opens[row]
+        if flows:
+            yield start, len(flows)
+
+    def _process_rows(self, rows, keys, now, closes, opens, fields, events):
+        """
+        Handle packets of distinct flows: deletes, then creates in packet order
+        """
+        slots = self.lookup(keys[rows])
+        hit = slots >= 0
+        closing = hit & closes[rows]
+        opening = ~hit & opens[rows]
+
+        events[rows[hit]] = FLOW_EVENT_CODES["hit"]
+        self.touch(slots[hit & ~closing], now)
+        self.delete(keys[rows[closing]])
+        events[rows[closing]] = FLOW_EVENT_CODES["deleted"]
+
+        created = rows[opening]
+        stored = self.insert(keys[created], now, **{name: value[created] for name, value in fields.items()})
+        events[created] = np.where(stored, FLOW_EVENT_CODES["created"], FLOW_EVENT_CODES["full"])
+
+    def entries(self):
+        """
+        All flows as FLOW_DTYPE array
+        """
+        return self.data[self.state == USED]
+
+    def bulk_get(self, filters, limit=0):
+        """
+        Flows matching all filters (at most 5, as a bulk get session), at most limit flows unless 0
+        """
+        if len(filters) > 5:
+            raise ValueError("A bulk get session has at most 5 filters")
+        entries = self.entries()
+        match = np.ones(len(entries), dtype=np.bool_)
+        for flow_filter in filters:
+            match &= flow_filter.match(entries, self.table_id)
+        entries = entries[match]
+        return entries[:limit] if limit else entries
+
+
+class FlowObjects:
+    """
+    Flow tables, bulk get session filters and sessions of SAI create records, by record name
+
+    Flow entry records are stored in the flow table named by flow_table, or in a
+    table "default" with all key fields and no aging.
+    """
+
+    def __init__(self, records, schema=None, flow_table=None):
+        self.schema = schema or P4Schema()
+        self.tables = {}
+        self.filters = {}
+        self.sessions = {}
+        flow_entries = []
+        for record in records:
+            if record.get("op", "create") != "create":
+                continue
+            if record["type"] == "SAI_OBJECT_TYPE_FLOW_TABLE":
+                self.tables[record["name"]] = FlowTable.from_entry(self.schema.entry(record))
+            elif record["type"] == "SAI_OBJECT_TYPE_FLOW_ENTRY_BULK_GET_SESSION_FILTER":
+                entry = self.schema.entry(record)
+                self.filters[entry.key["oid"]] = BulkGetFilter.from_entry(entry)
+            elif record["type"] == "SAI_OBJECT_TYPE_FLOW_ENTRY_BULK_GET_SESSION":
+                self.sessions[record["name"]] = self.schema.entry(record)
+            elif record["type"] == "SAI_OBJECT_TYPE_FLOW_ENTRY":
+                flow_entries.append(self.schema.entry(record))
+
+        if flow_entries:
+            table = self.tables.setdefault(flow_table or "default", FlowTable())
+            key = lambda e, name: e.key[name] if not isinstance(e.key[name], tuple) else e.key[name][0]
+            keys = pack_flow_keys(
+                [key(e, "eni_mac") for e in flow_entries], [key(e, "vnet_id") for e in flow_entries],
+                [key(e, "ip_proto") for e in flow_entries],
+                np.array([[key(e, "src_ip") >> 64, key(e, "src_ip") & ((1 << 64) - 1)] for e in flow_entries],
+                         dtype=np.uint64),
+                np.array([[key(e, "dst_ip") >> 64, key(e, "dst_ip") & ((1 << 64) - 1)] for e in flow_entries],
+                         dtype=np.uint64),
+                [key(e, "src_port") for e in flow_entries], [key(e, "dst_port") for e in flow_entries],
+                [e.key["src_ip"][1] for e in flow_entries], table.enabled_key)
+            table.insert(keys, version=[e.params["version"] for e in flow_entries],
+                         direction=[e.params["dash_direction"] for e in flow_entries],
+                         actions=[e.params["dash_flow_action"] for e in flow_entries],
+                         meter_class=[e.params["meter_class"] for e in flow_entries])
+
+    def session_filters(self, name):
+        """
+        Filters and entry limit of a bulk get session
+        """
+        params = self.sessions[name].params
+        filters = [self.filters[params["%s_flow_entry_bulk_get_session_filter_id" % order]]
+                   for order in ("first", "second", "third", "fourth", "fifth")
+                   if params["%s_flow_entry_bulk_get_session_filter_id" % order]]
+        return filters, params["bulk_get_entry_limitation"] or 0
+
+    def bulk_get(self, table, session):
+        """
+        Flows of the table returned by the bulk get session
+        """
+        filters, limit = self.session_filters(session)
+        return self.tables[table].bulk_get(filters, limit)
@@ -0,0 +1,297 @@
+"""
+Model of DASH meter bucket accounting.
+
+MeterModel computes the meter class of packets and the bytes the DPU adds to
+its meter buckets, following metering_update.p4 of dash-pipeline/bmv2:
+
+    meter class         meter_class_or & meter_class_and of the routing and
+                        mapping actions (OutboundModel "meter_class")
+    meter policy        when the class is 0: the v4 or v6 meter policy of the
+                        ENI, the lookup IP is the destination IP of outbound
+                        packets and the source IP of inbound packets
+    meter rule          ternary match of the lookup IP (dip & dip_mask) in the
+                        rules of the policy, the rule sets the meter class
+    meter buckets       packet bytes added to the outbound or inbound byte
+                        counter of the meter class, classes 0 are not counted
+
+The policy also checks the IP address family of the packet, a mismatch drops
+the packet but its bytes are still counted, as in the P4 program.
+
+Rules of a policy are compiled by dip_mask: the masked lookup IPs of all
+packets are matched exactly once per distinct mask, by hash of the policy and
+the masked IP, and the rule of highest precedence is kept, so a batch costs
+one lookup per mask in use rather than one pass per rule. Bytes are aggregated
+with np.add.at, into the bmv2 counters indexed by meter class, and into totals
+per (ENI, meter class) as the meter_bucket_entry stats of SAI.
+
+Rules are programmed on bmv2 with the SAI priority as P4Runtime priority, so
+higher priority values take precedence by default, as in AclClassifier.
+
+Usage:
+    meters = MeterModel(records)
+    expected = model.process(flows)
+    meters.update(expected["eni"], DIRECTION_OUTBOUND, flows.dip, flows.is_v6,
+                  frame_bytes, expected["meter_class"], mask=~expected["dropped"])
+    stats = meters.bucket_stats()   # meter bucket entry name -> (outbound, inbound) bytes
+"""
+
+import numpy as np
+
+from dash_outbound_model import DIRECTION_INBOUND, DIRECTION_OUTBOUND, ExactIndex
+from sai_p4_tables import P4Schema
+
+# MAX_ENI (64) * NUM_BUCKETS_PER_ENI (4096)
+MAX_METER_BUCKETS = 262144
+
+MASK64 = (1 << 64) - 1
+
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+# Meter class of every packet, the meter rule object number setting it (0 when
+# the class comes from routing or no rule matches), and the outcome
+METER_DTYPE = np.dtype([
+    ("meter_class", np.uint32),
+    ("rule", np.uint32),
+    ("policy_drop", np.bool_),
+    ("counted", np.bool_),
+])
+
+
+def _ip_words(ips):
+    """
+    Lookup IPs as (count, 2) words, 1-D arrays hold IPv4 addresses
+    """
+    ips = np.asarray(ips, dtype=np.uint64)
+    if ips.ndim == 1:
+        ips = np.stack([np.zeros_like(ips), ips], axis=1)
+    return ips
+
+
+def _hash(policies, ips):
+    h = np.zeros(len(policies), dtype=np.uint64)
+    for word in (policies, ips[:, 0], ips[:, 1]):
+        h = (h ^ word) * HASH_MULTIPLIER
+        h ^= h >> np.uint64(29)
+    return h
+
+
+class _MaskIndex:
+    """
+    Exact match of (policy, masked dip) for the rules of one dip_mask, by 64-bit
+    hash with the words of the matched rule compared, ExactIndex on hash collisions
+    """
+
+    def __init__(self, mask, keys):
+        self.mask = np.array([mask >> 64, mask & MASK64], dtype=np.uint64)
+        self.ranks = np.array(list(keys.values()), dtype=np.int64)
+        self.policies = np.array([key[0] for key in keys], dtype=np.uint64)
+        self.ips = np.array([[key[1] >> 64, key[1] & MASK64] for key in keys], dtype=np.uint64).reshape(-1, 2)
+        hashes = _hash(self.policies, self.ips)
+        self.order = np.argsort(hashes)
+        self.hashes = hashes[self.order]
+        self.exact = None
+        if len(np.unique(self.hashes)) < len(self.hashes):
+            self.exact = ExactIndex([self.policies, self.ips])
+
+    def lookup(self, policies, ips):
+        """
+        Rank of the matching rule for every packet, -1 on miss
+        """
+        ips = ips & self.mask
+        if self.exact is not None:
+            row = self.exact.lookup([policies, ips])
+        else:
+            position = np.minimum(np.searchsorted(self.hashes, _hash(policies, ips)), len(self.hashes) - 1)
+            row = self.order[position]
+            found = ((self.policies[row] == policies) & (self.ips[row, 0] == ips[:, 0])
+                     & (self.ips[row, 1] == ips[:, 1]))
+            row = np.where(found, row, -1)
+        return np.where(row >= 0, self.ranks[np.maximum(row, 0)], -1)
+
+
+class MeterRules:
+    """
+    Meter rules of all policies, compiled into one exact index per dip_mask
+    """
+
+    def __init__(self, entries, higher_priority_wins=True):
+        priorities = np.array([e.params["priority"] or 0 for e in entries], dtype=np.int64)
+        order = np.argsort(-priorities if higher_priority_wins else priorities, kind="stable")
+        entries = [entries[i] for i in order]
+        self.count = len(entries)
+        self.oids = np.array([e.key["oid"] for e in entries], dtype=np.uint32)
+        self.classes = np.array([e.params["meter_class"] or 0 for e in entries], dtype=np.uint32)
+
+        # dip_mask -> (policy, masked dip) -> rank of the rule of highest precedence
+        by_mask = {}
+        for rank, entry in enumerate(entries):
+            mask = (entry.params["dip_mask"] or (0, False))[0]
+            key = (entry.params["meter_policy_id"] or 0, (entry.params["dip"] or (0, False))[0] & mask)
+            by_mask.setdefault(mask, {}).setdefault(key, rank)
+        self.masks = [_MaskIndex(mask, keys) for mask, keys in by_mask.items()]
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return "MeterRules(%d rules, %d masks)" % (self.count, len(self.masks))
+
+    def lookup(self, policies, ips):
+        """
+        Rank of the matching rule of highest precedence for every packet, -1 on miss
+        """
+        best = np.full(len(policies), self.count, dtype=np.int64)
+        for index in self.masks:
+            rank = index.lookup(policies, ips)
+            best = np.minimum(best, np.where(rank >= 0, rank, self.count))
+        return np.where(best < self.count, best, -1)
+
+
+class MeterModel:
+    """
+    Meter policies, rules and buckets of SAI create records, with the byte counters
+
+    records: SAI records, records of other objects are ignored
+    schema: P4Schema, loaded from the default spec directory by default
+    buckets: number of meter bucket counters of each direction
+    """
+
+    def __init__(self, records, schema=None, higher_priority_wins=True, buckets=MAX_METER_BUCKETS):
+        self.schema = schema or P4Schema()
+        entries = {"eni": [], "meter_policy": [], "meter_rule": [], "meter_bucket_entry": []}
+        for record in records:
+            if record.get("op", "create") != "create":
+                continue
+            table = self.schema.tables.get(record["type"])
+            if table is not None and table.name in entries:
+                entries[table.name].append(self.schema.entry(record))
+        size = len(self.schema.oids) + 1
+
+        # ENI object number, IPv6 -> meter policy object number
+        self.eni_policies = np.zeros((size, 2), dtype=np.uint64)
+        for eni in entries["eni"]:
+            self.eni_policies[eni.key["oid"]] = [eni.params["v4_meter_policy_id"] or 0,
+                                                 eni.params["v6_meter_policy_id"] or 0]
+        # Policy object number -> IP address family, -1 for no policy
+        self.policy_family = np.full(size, -1, dtype=np.int64)
+        for policy in entries["meter_policy"]:
+            self.policy_family[policy.key["oid"]] = policy.params["ip_addr_family"]
+        self.rules = MeterRules(entries["meter_rule"], higher_priority_wins)
+        self.bucket_entries = {(e.key["eni_id"], e.key["meter_class"]): e.name for e in entries["meter_bucket_entry"]}
+
+        self.outbound = np.zeros(buckets, dtype=np.uint64)
+        self.inbound = np.zeros(buckets, dtype=np.uint64)
+        # Sorted (ENI << 32 | meter class) keys and their (outbound, inbound) bytes
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.totals = np.zeros((0, 2), dtype=np.uint64)
+
+    def __repr__(self):
+        return "MeterModel(%d policies, %s, %d buckets)" % (
+            int((self.policy_family >= 0).sum()), self.rules, len(self.bucket_entries))
+
+    def classify(self, eni, direction, ips, is_v6, meter_class=0):
+        """
+        Meter class, meter rule and policy drop of every packet, as METER_DTYPE
+
+        eni: ENI object numbers, direction: DIRECTION_OUTBOUND or DIRECTION_INBOUND
+        ips: lookup IPs, destination of outbound and source of inbound packets
+        meter_class: meter class of the routing and mapping actions
+        """
+        eni = np.asarray(eni, dtype=np.int64)
+        count = len(eni)
+        ips = _ip_words(ips)
+        is_v6 = np.broadcast_to(np.asarray(is_v6, dtype=np.bool_), (count,))
+        direction = np.broadcast_to(np.asarray(direction, dtype=np.uint8), (count,))
+        result = np.zeros(count, dtype=METER_DTYPE)
+        result["meter_class"] = meter_class
+
+        # Packets of class 0 go through the meter policy of the ENI
+        rows = np.flatnonzero(result["meter_class"] == 0)
+        policies = self.eni_policies[eni[rows], is_v6[rows].astype(np.int64)]
+        family = self.policy_family[policies.astype(np.int64)]
+        result["policy_drop"][rows] = (family >= 0) & (family != is_v6[rows])
+        rank = self.rules.lookup(policies, ips[rows])
+        hit = rank >= 0
+        result["meter_class"][rows[hit]] = self.rules.classes[rank[hit]]
+        result["rule"][rows[hit]] = self.rules.oids[rank[hit]]
+
+        result["counted"] = (result["meter_class"] != 0) & (
+            (direction == DIRECTION_OUTBOUND) | (direction == DIRECTION_INBOUND))
+        return result
+
+    def update(self, eni, direction, ips, is_v6, nbytes, meter_class=0, mask=None):
+        """
+        Classify packets and add their bytes to the meter buckets, returns the classification
+
+        nbytes: bytes of every packet as counted by the DPU
+        mask: packets reaching the metering stage, all by default
+        """
+        eni = np.asarray(eni, dtype=np.int64)
+        count = len(eni)
+        direction = np.broadcast_to(np.asarray(direction, dtype=np.uint8), (count,))
+        nbytes = np.broadcast_to(np.asarray(nbytes, dtype=np.uint64), (count,))
+        result = self.classify(eni, direction, ips, is_v6, meter_class)
+        if mask is not None:
+            result["counted"] &= np.asarray(mask, dtype=np.bool_)
+
+        counted = result["counted"]
+        classes = result["meter_class"].astype(np.int64)
+        outbound = direction == DIRECTION_OUTBOUND
+        # bmv2 ignores counter indexes out of range
+        indexed = counted & (classes < len(self.outbound))
+        np.add.at(self.outbound, classes[indexed & outbound], nbytes[indexed & outbound])
+        np.add.at(self.inbound, classes[indexed & ~outbound], nbytes[indexed & ~outbound])
+
+        keys = (eni[counted].astype(np.uint64) << np.uint64(32)) | classes[counted].astype(np.uint64)
+        self.keys, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        totals = np.zeros((len(self.keys), 2), dtype=np.uint64)
+        totals[inverse[:len(self.totals)]] = self.totals
+        batch = inverse[len(self.totals):]
+        np.add.at(totals, (batch, (~outbound[counted]).astype(np.int64)), nbytes[counted])
+        self.totals = totals
+        return result
+
+    def bytes(self, eni, meter_class):
+        """
+        (outbound, inbound) bytes of an ENI and meter class
+        """
+        key = np.uint64(int(eni) << 32 | int(meter_class))
+        position = np.searchsorted(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return tuple(int(n) for n in self.totals[position])
+        return 0, 0
+
+    def bucket_stats(self):
+        """
+        (outbound, inbound) bytes of every meter bucket entry by record name
+        """
+        return {name: self.bytes(eni, meter_class) for (eni, meter_class), name in self.bucket_entries.items()}
+
+    def unprogrammed(self):
+        """
+        (ENI, meter class) pairs with counted bytes but no meter bucket entry
+        """
+        pairs = [(int(key >> np.uint64(32)), int(key & np.uint64(0xFFFFFFFF))) for key in self.keys]
+        return [pair for pair in pairs if pair not in self.bucket_entries]
+
+    def clear(self):
+        self.outbound[:] = 0
+        self.inbound[:] = 0
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.totals = np.zeros((0, 2), dtype=np.uint64)
+
+    def summary(self, result):
+        """
+        Counted and policy-dropped packets, packets by meter class source
+        """
+        from_rule = result["rule"] != 0
+        return "\n".join([
+            repr(self),
+            "Counted %d, not counted %d, policy drops %d" % (
+                int(result["counted"].sum()), int((~result["counted"]).sum()), int(result["policy_drop"].sum())),
+            "Meter class from rules %d, from routing %d, none %d" % (
+                int(from_rule.sum()), int(((result["meter_class"] != 0) & ~from_rule).sum()),
+                int((result["meter_class"] == 0).sum())),
+            "Buckets in use %d outbound, %d inbound" % (
+                int((self.outbound != 0).sum()), int((self.inbound != 0).sum())),
+        ])
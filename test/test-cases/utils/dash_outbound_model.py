@@ -0,0 +1,554 @@
+"""
+Vectorized reference model of the DASH outbound pipeline.
+
+OutboundModel computes the packets the DPU sends for a batch of outbound
+packets, following the stages of dash-pipeline/bmv2:
+
+    pre_pipeline        vip lookup, the VIP becomes the encap source IP
+    direction_lookup    VNI -> outbound / inbound, ENI MAC type
+    eni_lookup          customer source (or destination) MAC -> ENI
+    eni                 ENI attributes: VNET, VNI, underlay DIP, routing group
+    outbound_routing    routing group, LPM of the destination IP
+    outbound_mapping    CA -> PA: tunnel or private link mapping, VNET VNI
+    outbound_port_map   private link destination port ranges -> backend IP and port
+    routing actions     NAT46, set DMAC, encap
+    underlay            LPM of the encap destination IP: next hop or drop
+
+Tables are filled from SAI records (as passed to dpu.process_commands()) by
+P4Schema, so keys, actions and parameter defaults are those of the SAI specs.
+Outbound routing and underlay routing prefixes are held in PrefixTrie, port
+map ranges in PortRangeIndex. Packets are processed as NumPy arrays, one
+table lookup per stage for the whole batch, so expected outputs of 100K flows
+take well under a second.
+
+Not modeled: ACL, conntrack, metering buckets and DASH tunnels (dash_tunnel_id
+set), flows using DASH tunnels are reported with modeled == False. Underlay
+MACs come from the internal config of the appliance, not from SAI, and are
+passed to the model.
+
+Overlay IP addresses are [high, low] uint64 word pairs, IPv4 in the low word,
+as AddressRange keeps IPv6 addresses. Expected packets use the field names of
+vxlan_capture, so they can be compared with decoded captures.
+
+Usage:
+    model = OutboundModel(records, underlay_smac="80:09:02:01:00:01", underlay_dmac="c8:2c:2b:00:d1:30")
+    flows = Flows(vni=11, outer_sip="221.0.1.11", outer_dip="221.0.0.2",
+                  smac=AddressRange("00:1A:C5:00:00:01", 1, 100000), dmac="00:00:00:00:00:00",
+                  sip="1.1.0.1", dip=AddressRange("1.128.0.1", 1, 100000))
+    expected = model.process(flows)
+    print(model.summary(expected))
+    capture.assert_equal("vni", expected["vni"], mask=~expected["dropped"])
+"""
+
+import numpy as np
+
+from address_range import AddressRange, address_kind, address_to_int
+from port_range_index import PortRangeIndex
+from prefix_trie import PrefixTrie
+from sai_p4_tables import P4Schema
+
+MASK64 = (1 << 64) - 1
+
+DIRECTION_OUTBOUND = 1
+DIRECTION_INBOUND = 2
+
+ENCAP_NONE = 0
+ENCAP_VXLAN = 1
+ENCAP_NVGRE = 2
+
+SAI_PACKET_ACTION_DROP = 0
+
+# Drop reasons, the first stage dropping a packet sets it
+DROP_REASONS = (
+    "none",
+    "vip_miss",
+    "inbound",
+    "eni_miss",
+    "eni_admin_down",
+    "routing_group_miss",
+    "routing_group_disabled",
+    "routing_miss",
+    "routing_drop",
+    "ca_to_pa_miss",
+    "port_map_miss",
+    "port_map_range_miss",
+    "underlay_drop",
+)
+DROP_CODES = {name: code for code, name in enumerate(DROP_REASONS)}
+
+ROUTING_ACTIONS = ("none", "route_vnet", "route_vnet_direct", "route_direct", "route_service_tunnel", "drop")
+MAPPING_ACTIONS = ("none", "set_tunnel_mapping", "set_private_link_mapping")
+PORT_MAP_ACTIONS = ("none", "skip_mapping", "map_to_private_link_service")
+
+IP_PROTOCOL_TCP = 6
+IP_PROTOCOL_UDP = 17
+
+# Expected packet of each flow: drop reason, ENI object number in the schema,
+# routing, mapping and port map action codes, then the headers as sent by the DPU.
+# Outer fields are zero for packets sent without encap.
+EXPECTED_DTYPE = np.dtype([
+    ("dropped", np.bool_),
+    ("drop_reason", np.uint8),
+    ("modeled", np.bool_),
+    ("eni", np.uint32),
+    ("routing_action", np.uint8),
+    ("mapping_action", np.uint8),
+    ("port_map_action", np.uint8),
+    ("meter_class", np.uint32),
+    ("underlay_hit", np.bool_),
+    ("next_hop", np.uint16),
+    ("encap", np.uint8),
+    ("vni", np.uint32),
+    ("outer_smac", np.uint64),
+    ("outer_dmac", np.uint64),
+    ("outer_sip", np.uint32),
+    ("outer_dip", np.uint32),
+    ("inner_smac", np.uint64),
+    ("inner_dmac", np.uint64),
+    ("inner_ip_version", np.uint8),
+    ("inner_sip", np.uint32),
+    ("inner_dip", np.uint32),
+    ("inner_sip6", np.uint64, (2,)),
+    ("inner_dip6", np.uint64, (2,)),
+    ("inner_dport", np.uint16),
+])
+
+
+def _words(value):
+    """
+    Python int address as [high, low] uint64 words
+    """
+    return np.array([value >> 64, value & MASK64], dtype=np.uint64)
+
+
+def _column(value, count, kind=None):
+    """
+    Flow field as array of `count` values: scalar, address string, list,
+    array or AddressRange. IP addresses become (count, 2) word pairs.
+    """
+    ip = kind in ("ipv4", "ipv6")
+    if isinstance(value, AddressRange):
+        values = value.values
+        if ip and value.kind != "ipv6":
+            values = np.stack([np.zeros_like(values), values], axis=1)
+    elif isinstance(value, (str, int)):
+        number = address_to_int(value)
+        values = _words(number) if ip else np.uint64(number)
+        values = np.broadcast_to(values, (count, 2) if ip else (count,))
+    elif isinstance(value, np.ndarray):
+        values = value.astype(np.uint64)
+        if ip and values.ndim == 1:
+            values = np.stack([np.zeros_like(values), values], axis=1)
+    else:
+        numbers = [address_to_int(item) for item in value]
+        values = np.array([[n >> 64, n & MASK64] for n in numbers] if ip else numbers, dtype=np.uint64)
+    if len(values) != count:
+        raise ValueError("Expected %d values, got %d" % (count, len(values)))
+    return values
+
+
+def _is_v6(value):
+    if isinstance(value, AddressRange):
+        return value.kind == "ipv6"
+    if isinstance(value, str):
+        return address_kind(value) == "ipv6"
+    if isinstance(value, np.ndarray):
+        return value.ndim == 2 and bool((value[:, 0] != 0).any())
+    return any(isinstance(item, str) and ":" in item for item in value)
+
+
+class Flows:
+    """
+    Batch of outbound packets as received by the DPU, one element per flow
+
+    vni: VNI of the received VXLAN packet (direction lookup key)
+    outer_sip, outer_dip: underlay IPs of the received packet, outer_dip is the VIP
+    outer_dmac: underlay destination MAC of the received packet
+    smac, dmac: customer MACs
+    sip, dip: customer IPs as (count, 2) word pairs, is_v6: customer IP version
+    protocol, src_port, dst_port: customer IP protocol and L4 ports
+
+    Every field may be a single value, a list, an array or an AddressRange.
+    """
+
+    def __init__(self, vni, outer_sip, outer_dip, smac, dmac, sip, dip, outer_dmac=0,
+                 protocol=17, src_port=0, dst_port=0, count=None):
+        if count is None:
+            count = max(len(v) if not isinstance(v, (str, int)) else 1
+                        for v in (vni, outer_sip, outer_dip, smac, dmac, sip, dip, outer_dmac,
+                                  protocol, src_port, dst_port))
+        self.count = count
+        self.vni = _column(vni, count)
+        self.outer_sip = _column(outer_sip, count)
+        self.outer_dip = _column(outer_dip, count)
+        self.outer_dmac = _column(outer_dmac, count)
+        self.smac = _column(smac, count)
+        self.dmac = _column(dmac, count)
+        self.sip = _column(sip, count, "ipv4")
+        self.dip = _column(dip, count, "ipv4")
+        self.is_v6 = np.full(count, _is_v6(dip) or _is_v6(sip))
+        self.protocol = _column(protocol, count)
+        self.src_port = _column(src_port, count)
+        self.dst_port = _column(dst_port, count)
+
+    @classmethod
+    def from_capture(cls, capture, mask=None):
+        """
+        Flows of the VXLAN frames of a vxlan_capture.VxlanCapture, e.g. the sent packets
+        """
+        frames = capture.frames[capture.vxlan if mask is None else mask]
+        v6 = frames["inner_ip_version"] == 6
+        sip = np.where(v6[:, None], frames["inner_sip6"],
+                       np.stack([np.zeros(len(frames), np.uint64), frames["inner_sip"].astype(np.uint64)], axis=1))
+        dip = np.where(v6[:, None], frames["inner_dip6"],
+                       np.stack([np.zeros(len(frames), np.uint64), frames["inner_dip"].astype(np.uint64)], axis=1))
+        flows = cls(frames["vni"], frames["outer_sip"], frames["outer_dip"], frames["inner_smac"],
+                    frames["inner_dmac"], sip, dip, frames["outer_dmac"], frames["inner_proto"],
+                    frames["inner_sport"], frames["inner_dport"], count=len(frames))
+        flows.is_v6 = v6
+        return flows
+
+    def __len__(self):
+        return self.count
+
+
+class ExactIndex:
+    """
+    Exact match of uint64 key columns, (count, 2) columns are split into words.
+    The last entry of duplicate keys wins, as the last create of a key would.
+    """
+
+    def __init__(self, columns):
+        columns = self._split(columns)
+        self.dtype = np.dtype([("k%d" % i, np.uint64) for i in range(len(columns))])
+        keys = self._pack(columns)
+        self.rows = np.argsort(keys, kind="stable")
+        self.keys = keys[self.rows]
+
+    @staticmethod
+    def _split(columns):
+        split = []
+        for column in columns:
+            column = np.asarray(column, dtype=np.uint64)
+            split.extend(column.T if column.ndim == 2 else [column])
+        return split
+
+    def _pack(self, columns):
+        keys = np.zeros(len(columns[0]) if columns else 0, dtype=self.dtype)
+        for name, column in zip(self.dtype.names, columns):
+            keys[name] = column
+        return keys
+
+    def lookup(self, columns):
+        """
+        Row of the entry matching every key, -1 on miss
+        """
+        query = self._pack(self._split(columns))
+        if not len(self.keys):
+            return np.full(len(query), -1)
+        position = np.searchsorted(self.keys, query, side="right") - 1
+        clipped = np.maximum(position, 0)
+        found = (position >= 0) & (self.keys[clipped] == query)
+        return np.where(found, self.rows[clipped], -1)
+
+
+class _Table:
+    """
+    Parsed entries of one table as arrays, objects also by object number
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def action(self, actions):
+        return np.array([actions.index(e.action) if e.action in actions else 0 for e in self.entries], dtype=np.uint8)
+
+    def param(self, name, dtype=np.uint64):
+        return np.array([e.params.get(name) or 0 for e in self.entries], dtype=dtype)
+
+    def key(self, name, dtype=np.uint64):
+        return np.array([e.key[name] for e in self.entries], dtype=dtype)
+
+    def ip(self, name, key=False):
+        """
+        IP key or parameter as (count, 2) words and is_v6 flags
+        """
+        values = [(e.key if key else e.params).get(name) or (0, False) for e in self.entries]
+        words = np.array([[v[0] >> 64, v[0] & MASK64] for v in values], dtype=np.uint64).reshape(-1, 2)
+        return words, np.array([v[-1] for v in values], dtype=np.bool_)
+
+    def by_oid(self, values, size, dtype=np.uint64):
+        """
+        Dense array of `values` indexed by object number, with the exists flags
+        """
+        dense = np.zeros((size,) + values.shape[1:], dtype=dtype)
+        exists = np.zeros(size, dtype=np.bool_)
+        oids = np.array([e.key["oid"] for e in self.entries], dtype=np.int64)
+        dense[oids] = values
+        exists[oids] = True
+        return dense, exists
+
+
+class OutboundModel:
+    """
+    Outbound pipeline tables filled from SAI create records
+
+    records: SAI records, records of tables not used by the model are ignored
+    schema: P4Schema, loaded from the default spec directory by default
+    underlay_smac, underlay_dmac: appliance MAC and underlay neighbor MAC
+    """
+
+    TABLES = ("vip_entry", "direction_lookup_entry", "eni_ether_address_map_entry", "eni",
+              "outbound_routing_group", "outbound_routing_entry", "outbound_ca_to_pa_entry", "vnet",
+              "route_entry", "outbound_port_map", "outbound_port_map_port_range_entry")
+
+    def __init__(self, records, schema=None, underlay_smac=0, underlay_dmac=0):
+        self.schema = schema or P4Schema()
+        self.underlay_smac = address_to_int(underlay_smac)
+        self.underlay_dmac = address_to_int(underlay_dmac)
+
+        entries = {name: [] for name in self.TABLES}
+        for record in records:
+            if record.get("op", "create") != "create":
+                continue
+            table = self.schema.tables.get(record["type"])
+            if table is not None and table.name in entries:
+                entries[table.name].append(self.schema.entry(record))
+        tables = {name: _Table(table_entries) for name, table_entries in entries.items()}
+        self.counts = {name: len(table) for name, table in tables.items()}
+        size = len(self.schema.oids) + 1
+
+        vip = tables["vip_entry"]
+        self.vip = ExactIndex([vip.ip("vip", key=True)[0][:, 1]])
+
+        direction = tables["direction_lookup_entry"]
+        self.direction = ExactIndex([direction.key("vni")])
+        self.direction_outbound = direction.action(("", "set_outbound_direction")) == 1
+        self.direction_override = direction.param("dash_eni_mac_override_type", np.uint8)
+
+        eni_map = tables["eni_ether_address_map_entry"]
+        self.eni_map = ExactIndex([eni_map.key("address")])
+        self.eni_map_eni = eni_map.param("eni_id", np.int64)
+
+        eni = tables["eni"]
+        self.eni_admin, self.eni_exists = eni.by_oid(eni.param("admin_state", np.bool_), size, np.bool_)
+        self.eni_vnet = eni.by_oid(eni.param("vnet_id"), size)[0]
+        self.eni_vm_vni = eni.by_oid(eni.param("vm_vni"), size)[0]
+        self.eni_group = eni.by_oid(eni.param("outbound_routing_group_id"), size)[0]
+        self.eni_underlay_dip = eni.by_oid(eni.ip("vm_underlay_dip")[0][:, 1], size)[0]
+        self.eni_pl_underlay_sip = eni.by_oid(eni.ip("pl_underlay_sip")[0][:, 1], size)[0]
+        self.eni_pl_sip = eni.by_oid(eni.ip("pl_sip")[0], size)[0]
+        self.eni_pl_sip_mask = eni.by_oid(eni.ip("pl_sip_mask")[0], size)[0]
+
+        group = tables["outbound_routing_group"]
+        self.group_disabled, self.group_exists = group.by_oid(group.param("disabled", np.bool_), size, np.bool_)
+
+        routing = tables["outbound_routing_entry"]
+        self.routing = PrefixTrie()
+        for row, e in enumerate(routing.entries):
+            self.routing.insert(e.key["outbound_routing_group_id"], *e.key["destination"], row)
+        self.routing_action = routing.action(ROUTING_ACTIONS)
+        self.routing_params = {name: routing.param(name) for name in (
+            "dst_vnet_id", "dash_tunnel_id", "meter_class_or", "meter_class_and", "dash_encapsulation", "tunnel_key")}
+        for name in ("overlay_ip", "overlay_dip", "overlay_dip_mask", "overlay_sip", "overlay_sip_mask"):
+            self.routing_params[name], self.routing_params[name + "_is_v6"] = routing.ip(name)
+        for name in ("underlay_sip", "underlay_dip"):
+            self.routing_params[name] = routing.ip(name)[0][:, 1]
+
+        ca_to_pa = tables["outbound_ca_to_pa_entry"]
+        dip, dip_v6 = ca_to_pa.ip("dip", key=True)
+        self.ca_to_pa = ExactIndex([ca_to_pa.key("dst_vnet_id"), dip_v6, dip])
+        self.mapping_action = ca_to_pa.action(MAPPING_ACTIONS)
+        self.mapping_params = {name: ca_to_pa.param(name) for name in (
+            "overlay_dmac", "use_dst_vnet_vni", "meter_class_or", "dash_tunnel_id", "dash_encapsulation", "tunnel_key",
+            "outbound_port_map_id")}
+        self.mapping_params["underlay_dip"] = ca_to_pa.ip("underlay_dip")[0][:, 1]
+        for name in ("overlay_sip", "overlay_sip_mask", "overlay_dip", "overlay_dip_mask"):
+            self.mapping_params[name] = ca_to_pa.ip(name)[0]
+
+        port_map = tables["outbound_port_map"]
+        self.port_map_exists = port_map.by_oid(np.ones(len(port_map), dtype=np.bool_), size, np.bool_)[0]
+        port_range = tables["outbound_port_map_port_range_entry"]
+        ranges = np.array([e.key["dst_port_range"] for e in port_range.entries], dtype=np.uint64).reshape(-1, 2)
+        self.port_ranges = PortRangeIndex(port_range.key("outbound_port_map_id"), ranges[:, 0], ranges[:, 1])
+        self.port_map_action = port_range.action(PORT_MAP_ACTIONS)
+        self.port_map_params = {name: port_range.param(name) for name in ("match_port_base", "backend_port_base")}
+        self.port_map_params["backend_ip"] = port_range.ip("backend_ip")[0]
+
+        vnet = tables["vnet"]
+        self.vnet_vni, self.vnet_exists = vnet.by_oid(vnet.param("vni"), size)
+
+        route = tables["route_entry"]
+        self.underlay = PrefixTrie()
+        for row, e in enumerate(route.entries):
+            self.underlay.insert(0, *e.key["destination"], row)
+        self.underlay_packet_action = route.param("packet_action", np.uint16)
+        self.underlay_next_hop = route.param("next_hop_id", np.uint16)
+
+    def process(self, flows):
+        """
+        Expected output of every flow, structured array of EXPECTED_DTYPE
+        """
+        n = len(flows)
+        out = np.zeros(n, dtype=EXPECTED_DTYPE)
+        reason = np.zeros(n, dtype=np.uint8)
+
+        def drop(mask, name):
+            reason[(reason == 0) & mask] = DROP_CODES[name]
+
+        def pick(values, rows):
+            if not len(values):
+                return np.zeros((len(rows),) + values.shape[1:], dtype=values.dtype)
+            return values[np.maximum(rows, 0)]
+
+        # pre_pipeline: the VIP becomes the encap source IP
+        drop(self.vip.lookup([flows.outer_dip]) < 0, "vip_miss")
+        underlay_sip = flows.outer_dip.copy()
+
+        # direction_lookup: inbound by default, ENI MAC is the source MAC for outbound
+        row = self.direction.lookup([flows.vni])
+        outbound = (row >= 0) & pick(self.direction_outbound, row)
+        override = np.where(row >= 0, pick(self.direction_override, row), 0)
+        drop(~outbound, "inbound")
+        use_smac = (override == 1) | (outbound & (override != 2))
+
+        # eni_lookup and ENI attributes
+        row = self.eni_map.lookup([np.where(use_smac, flows.smac, flows.dmac)])
+        eni = np.where(row >= 0, pick(self.eni_map_eni, row), 0)
+        drop((row < 0) | ~self.eni_exists[eni], "eni_miss")
+        drop(~self.eni_admin[eni], "eni_admin_down")
+        vnet_id = self.eni_vnet[eni]
+        vni = self.eni_vm_vni[eni]
+        underlay_dip = self.eni_underlay_dip[eni]
+        group = self.eni_group[eni]
+
+        # outbound_routing
+        drop(~self.group_exists[group], "routing_group_miss")
+        drop(self.group_disabled[group], "routing_group_disabled")
+        route = self.routing.lookup(group, flows.dip, flows.is_v6)
+        drop(route < 0, "routing_miss")
+        action = np.where(route >= 0, pick(self.routing_action, route), 0)
+        drop(action == ROUTING_ACTIONS.index("drop"), "routing_drop")
+        param = {name: pick(values, route) for name, values in self.routing_params.items()}
+
+        modeled = param["dash_tunnel_id"] == 0
+        meter_or = param["meter_class_or"]
+        meter_and = np.where(route >= 0, param["meter_class_and"], 0xFFFFFFFF)
+
+        vnet = (action == ROUTING_ACTIONS.index("route_vnet"))
+        vnet_direct = (action == ROUTING_ACTIONS.index("route_vnet_direct"))
+        service_tunnel = (action == ROUTING_ACTIONS.index("route_service_tunnel"))
+        lookup_dip = np.where(vnet_direct[:, None], param["overlay_ip"], flows.dip)
+        lookup_v6 = np.where(vnet_direct, param["overlay_ip_is_v6"], flows.is_v6)
+
+        # outbound_mapping for route_vnet and route_vnet_direct
+        mapped = vnet | vnet_direct
+        dst_vnet = param["dst_vnet_id"]
+        row = np.where(mapped, self.ca_to_pa.lookup([dst_vnet, lookup_v6, lookup_dip]), -1)
+        drop(mapped & (row < 0), "ca_to_pa_miss")
+        mapping = np.where(row >= 0, pick(self.mapping_action, row), 0)
+        mparam = {name: pick(values, row) for name, values in self.mapping_params.items()}
+        tunnel = mapping == MAPPING_ACTIONS.index("set_tunnel_mapping")
+        private_link = mapping == MAPPING_ACTIONS.index("set_private_link_mapping")
+        modeled &= np.where(row >= 0, mparam["dash_tunnel_id"] == 0, True)
+        meter_or = meter_or | np.where(row >= 0, mparam["meter_class_or"], 0)
+
+        # set_tunnel_mapping: VNI of the ENI VNET (or destination VNET), overlay DMAC, PA
+        vnet_id = np.where(tunnel & (mparam["use_dst_vnet_vni"] != 0), dst_vnet, vnet_id)
+        vni = np.where(tunnel & self.vnet_exists[vnet_id], self.vnet_vni[vnet_id], vni)
+        dmac = np.where(tunnel, mparam["overlay_dmac"], flows.dmac)
+
+        # Encap parameters: zero keeps the current value
+        key = np.where(private_link, mparam["tunnel_key"], np.where(service_tunnel, param["tunnel_key"], 0))
+        vni = np.where(key != 0, key, vni)
+        new_sip = np.where(private_link, self.eni_pl_underlay_sip[eni],
+                           np.where(service_tunnel, np.where(param["underlay_sip"] != 0, param["underlay_sip"],
+                                                             flows.outer_sip), 0))
+        underlay_sip = np.where(new_sip != 0, new_sip, underlay_sip)
+        new_dip = np.where(tunnel | private_link, mparam["underlay_dip"],
+                           np.where(service_tunnel, np.where(param["underlay_dip"] != 0, param["underlay_dip"],
+                                                             flows.outer_dip), 0))
+        underlay_dip = np.where(new_dip != 0, new_dip, underlay_dip)
+        encap = np.where(tunnel, ENCAP_VXLAN,
+                         np.where(private_link, mparam["dash_encapsulation"],
+                                  np.where(service_tunnel, param["dash_encapsulation"], ENCAP_NONE)))
+
+        # NAT46 of private link and service tunnel, DMAC is the received underlay DMAC
+        nat46 = private_link | service_tunnel
+        dmac = np.where(nat46, flows.outer_dmac, dmac)
+        sip_mask = np.where(private_link[:, None], _words((1 << 96) - 1), param["overlay_sip_mask"])
+        pl_sip = (((flows.sip & ~mparam["overlay_sip_mask"]) | mparam["overlay_sip"])
+                  & ~self.eni_pl_sip_mask[eni]) | self.eni_pl_sip[eni]
+        nat_sip = np.where(private_link[:, None], pl_sip, param["overlay_sip"])
+        nat_dip = np.where(private_link[:, None], mparam["overlay_dip"], param["overlay_dip"])
+        dip_mask = np.where(private_link[:, None], mparam["overlay_dip_mask"], param["overlay_dip_mask"])
+
+        # outbound_port_map of private link mappings: destination port range -> backend IP and port
+        map_id = np.where(private_link, mparam["outbound_port_map_id"], 0)
+        drop((map_id != 0) & ~self.port_map_exists[map_id], "port_map_miss")
+        row = np.where((map_id != 0) & self.port_map_exists[map_id], self.port_ranges.lookup(map_id, flows.dst_port), -1)
+        drop((map_id != 0) & (row < 0), "port_map_range_miss")
+        port_map = np.where(row >= 0, pick(self.port_map_action, row), 0)
+        pparam = {name: pick(values, row) for name, values in self.port_map_params.items()}
+        backend = port_map == PORT_MAP_ACTIONS.index("map_to_private_link_service")
+        underlay_dip = np.where(backend, pparam["backend_ip"][:, 1], underlay_dip)
+        nat_dip = np.where(backend[:, None], (nat_dip & dip_mask) | pparam["backend_ip"], nat_dip)
+        dport = np.where(backend & ((flows.protocol == IP_PROTOCOL_TCP) | (flows.protocol == IP_PROTOCOL_UDP)),
+                         (flows.dst_port - pparam["match_port_base"] + pparam["backend_port_base"]) & np.uint64(0xFFFF),
+                         flows.dst_port)
+        sip = np.where(nat46[:, None], (flows.sip & ~sip_mask) | (nat_sip & sip_mask), flows.sip)
+        dip = np.where(nat46[:, None], (flows.dip & ~dip_mask) | (nat_dip & dip_mask), flows.dip)
+        is_v6 = flows.is_v6 | nat46
+
+        # underlay: encap destination IP, or the customer destination IP without encap,
+        # a miss sends the packet back to its ingress port
+        encap = np.where(reason == 0, encap, ENCAP_NONE)
+        encapped = encap != ENCAP_NONE
+        route = self.underlay.lookup(0, np.where(encapped[:, None], np.stack(
+            [np.zeros(n, dtype=np.uint64), underlay_dip], axis=1), dip), is_v6 & ~encapped)
+        underlay_hit = route >= 0
+        drop(underlay_hit & (pick(self.underlay_packet_action, route) == SAI_PACKET_ACTION_DROP), "underlay_drop")
+        encapped &= reason == 0
+
+        out["drop_reason"] = reason
+        out["dropped"] = reason != 0
+        out["modeled"] = modeled
+        out["eni"] = eni
+        out["routing_action"] = action
+        out["mapping_action"] = mapping
+        out["port_map_action"] = port_map
+        out["meter_class"] = meter_or & meter_and
+        out["underlay_hit"] = underlay_hit
+        out["next_hop"] = np.where(underlay_hit, pick(self.underlay_next_hop, route), 0)
+        out["encap"] = np.where(encapped, encap, ENCAP_NONE)
+        out["vni"] = np.where(encapped, vni, 0)
+        out["outer_smac"] = np.where(encapped, self.underlay_smac, 0)
+        out["outer_dmac"] = np.where(encapped, self.underlay_dmac, 0)
+        out["outer_sip"] = np.where(encapped, underlay_sip, 0)
+        out["outer_dip"] = np.where(encapped, underlay_dip, 0)
+        out["inner_smac"] = flows.smac
+        out["inner_dmac"] = dmac
+        out["inner_ip_version"] = np.where(is_v6, 6, 4)
+        out["inner_sip"] = np.where(is_v6, 0, sip[:, 1])
+        out["inner_dip"] = np.where(is_v6, 0, dip[:, 1])
+        out["inner_sip6"] = np.where(is_v6[:, None], sip, 0)
+        out["inner_dip6"] = np.where(is_v6[:, None], dip, 0)
+        out["inner_dport"] = dport
+        return out
+
+    def summary(self, expected):
+        """
+        Table sizes and counts of expected packets by drop reason and routing action
+        """
+        lines = ["Tables: " + ", ".join("%s %d" % item for item in self.counts.items())]
+        reasons = np.bincount(expected["drop_reason"], minlength=len(DROP_REASONS))
+        lines.append("Drop reasons: " + ", ".join("%s %d" % (DROP_REASONS[code], count)
+                                                  for code, count in enumerate(reasons) if count))
+        actions = np.bincount(expected["routing_action"][~expected["dropped"]], minlength=len(ROUTING_ACTIONS))
+        lines.append("Routing actions: " + ", ".join("%s %d" % (ROUTING_ACTIONS[code], count)
+                                                     for code, count in enumerate(actions) if count))
+        lines.append("Not modeled: %d" % int((~expected["modeled"]).sum()))
+        return "\n".join(lines)
@@ -0,0 +1,73 @@
+"""
+Interval index of L4 port ranges, e.g. the outbound port map port ranges.
+
+PortRangeIndex holds inclusive [min, max] ranges under a table key (e.g. the
+outbound port map), each with an integer value (e.g. the row of the port
+range entry). Tables with single_match_priority, as
+outbound_port_map_port_range, program every range with the same priority, so
+the ranges of a key must not overlap and at most one matches a port; overlaps
+are rejected with ValueError.
+
+Ranges of all keys are one array sorted by (key, min): a batch lookup is one
+searchsorted of (key << 32 | port) for all ports, with the max of the range
+found checked, so tens of thousands of ranges cost no Python loop per packet.
+
+Usage:
+    ranges = PortRangeIndex(map_ids, mins, maxs)
+    rows = ranges.lookup(map_ids_of_packets, dst_ports)   # -1 on miss
+"""
+
+import numpy as np
+
+
+class PortRangeIndex:
+    """
+    Non-overlapping inclusive port ranges by table key, values are the range rows by default
+    """
+
+    def __init__(self, keys, mins, maxs, values=None):
+        keys = np.asarray(keys, dtype=np.uint64)
+        mins = np.asarray(mins, dtype=np.uint64)
+        maxs = np.asarray(maxs, dtype=np.uint64)
+        values = np.arange(len(keys)) if values is None else np.asarray(values, dtype=np.int64)
+        if (mins > maxs).any():
+            row = int(np.flatnonzero(mins > maxs)[0])
+            raise ValueError("Empty port range %d-%d" % (mins[row], maxs[row]))
+        if ((keys >> np.uint64(32)) != 0).any() or ((maxs >> np.uint64(32)) != 0).any():
+            raise ValueError("Keys and ports must fit in 32 bits")
+
+        starts = (keys << np.uint64(32)) | mins
+        order = np.argsort(starts, kind="stable")
+        self.starts = starts[order]
+        self.keys = keys[order]
+        self.maxs = maxs[order]
+        self.values = values[order]
+
+        same_key = self.keys[1:] == self.keys[:-1]
+        overlap = np.flatnonzero(same_key & ((self.starts[1:] & np.uint64(0xFFFFFFFF)) <= self.maxs[:-1]))
+        if len(overlap):
+            row = int(overlap[0])
+            raise ValueError("Port ranges %d-%d and %d-%d of %d overlap" % (
+                self.starts[row] & np.uint64(0xFFFFFFFF), self.maxs[row],
+                self.starts[row + 1] & np.uint64(0xFFFFFFFF), self.maxs[row + 1], self.keys[row]))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return "PortRangeIndex(%d ranges, %d keys)" % (len(self), len(np.unique(self.keys)))
+
+    def lookup(self, keys, ports):
+        """
+        Value of the range containing every port under its key, -1 on miss
+
+        keys: table key of every port (or one for all)
+        """
+        ports = np.asarray(ports, dtype=np.uint64)
+        keys = np.broadcast_to(np.asarray(keys, dtype=np.uint64), ports.shape)
+        if not len(self.starts):
+            return np.full(ports.shape, -1, dtype=np.int64)
+        position = np.searchsorted(self.starts, (keys << np.uint64(32)) | ports, side="right") - 1
+        clipped = np.maximum(position, 0)
+        found = (position >= 0) & (self.keys[clipped] == keys) & (self.maxs[clipped] >= ports)
+        return np.where(found, self.values[clipped], -1)
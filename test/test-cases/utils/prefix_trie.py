@@ -0,0 +1,242 @@
+"""
+Multibit trie for longest prefix match of IPv4 and IPv6 addresses.
+
+PrefixTrie holds prefixes under a table key (e.g. the outbound routing group)
+and an IP version, each with an integer value (e.g. the row of the route
+entry). Every node covers 8 address bits with 256 slots; a prefix is stored in
+the node of its last byte, expanded to the slots its remaining bits cover, so
+an IPv4 lookup visits at most 4 nodes and an IPv6 lookup at most 16.
+
+Nodes are sparse: only used slots are stored, as entries of one open addressing
+hash table keyed by node and slot, with the child node, the value and the
+prefix length of the slot. Route tables leave most slots of deep nodes empty,
+e.g. 100K random /32 routes need ~180K nodes but under 300K slots.
+
+Batch lookups walk all addresses one level at a time with vectorized probes of
+the table, with no per-address Python code. Inserts and deletes are
+incremental; slots emptied by deletes are kept.
+
+Addresses are [high, low] uint64 words, IPv4 in the low word.
+
+Usage:
+    trie = PrefixTrie()
+    trie.insert(group, int(ipaddress.ip_address("10.1.0.0")), 16, False, row)
+    rows = trie.lookup(groups, addresses, is_v6)   # -1 on miss
+"""
+
+import numpy as np
+
+STRIDE = 8
+SLOTS = 1 << STRIDE
+
+# Fibonacci hashing multiplier, 2**64 / golden ratio
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+MAX_LOAD = 0.5
+
+
+class PrefixTrie:
+    """
+    Prefixes and values by (table key, IP version), stride 8 multibit trie
+    """
+
+    def __init__(self, capacity=1024):
+        self.bits = max(1, (capacity - 1).bit_length())
+        size = 1 << self.bits
+        # Slot entries: node * SLOTS + slot, -1 for a free entry
+        self.codes = np.full(size, -1, dtype=np.int64)
+        self.child = np.full(size, -1, dtype=np.int32)
+        self.value = np.full(size, -1, dtype=np.int32)
+        self.length = np.zeros(size, dtype=np.int16)
+        self.used = 0
+        self.nodes = 0
+        # Stored prefixes: (node, first slot, bits in the node) -> value
+        self.prefixes = {}
+        self.roots = {}
+
+    def __len__(self):
+        return len(self.prefixes)
+
+    def __repr__(self):
+        return "PrefixTrie(%d prefixes, %d roots, %d nodes, %d slots, %d KiB)" % (
+            len(self), len(self.roots), self.nodes, self.used, self.nbytes // 1024)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.child.nbytes + self.value.nbytes + self.length.nbytes
+
+    def _hash(self, codes):
+        return ((codes.astype(np.uint64) * np.uint64(HASH_MULTIPLIER)) >> np.uint64(64 - self.bits)).astype(np.int64)
+
+    def _probe(self, codes):
+        """
+        Entries of the slot codes, -1 for codes not in the table
+        """
+        mask = len(self.codes) - 1
+        position = self._hash(codes)
+        entries = np.full(len(codes), -1, dtype=np.int64)
+        active = np.arange(len(codes))
+        while len(active):
+            stored = self.codes[position[active]]
+            found = stored == codes[active]
+            entries[active[found]] = position[active[found]]
+            active = active[~found & (stored >= 0)]
+            position[active] = (position[active] + 1) & mask
+        return entries
+
+    def _grow(self):
+        codes = self.codes[self.codes >= 0]
+        fields = [field[self.codes >= 0] for field in (self.child, self.value, self.length)]
+        self.bits += 1
+        size = 1 << self.bits
+        self.codes = np.full(size, -1, dtype=np.int64)
+        self.child = np.full(size, -1, dtype=np.int32)
+        self.value = np.full(size, -1, dtype=np.int32)
+        self.length = np.zeros(size, dtype=np.int16)
+
+        # Place all entries at once, entries colliding on a free position move to the next one
+        mask = size - 1
+        position = self._hash(codes)
+        pending = np.arange(len(codes))
+        while len(pending):
+            free = self.codes[position[pending]] < 0
+            candidates = pending[free]
+            placed, first = np.unique(position[candidates], return_index=True)
+            winners = candidates[first]
+            self.codes[placed] = codes[winners]
+            for table, field in zip((self.child, self.value, self.length), fields):
+                table[placed] = field[winners]
+            pending = pending[self.codes[position[pending]] != codes[pending]]
+            position[pending] = (position[pending] + 1) & mask
+
+    def _entry(self, node, slot, create):
+        """
+        Table entry of a node slot, -1 if it does not exist and create is False
+        """
+        code = node * SLOTS + slot
+        position = ((code * HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> (64 - self.bits)
+        mask = len(self.codes) - 1
+        while True:
+            stored = int(self.codes[position])
+            if stored == code:
+                return position
+            if stored < 0:
+                if not create:
+                    return -1
+                if self.used + 1 > MAX_LOAD * len(self.codes):
+                    self._grow()
+                    return self._entry(node, slot, create)
+                self.codes[position] = code
+                self.used += 1
+                return position
+            position = (position + 1) & mask
+
+    def _new_node(self):
+        self.nodes += 1
+        return self.nodes - 1
+
+    def _path(self, key, address, length, is_v6, create):
+        """
+        Node storing the prefix, with its first slot and the number of slots it covers
+        """
+        bits = 128 if is_v6 else 32
+        if not 0 <= length <= bits:
+            raise ValueError("Invalid prefix length %d" % length)
+        address = address & ~((1 << (bits - length)) - 1) & ((1 << bits) - 1)
+
+        node = self.roots.get((key, bool(is_v6)))
+        if node is None:
+            if not create:
+                return None
+            node = self.roots[(key, bool(is_v6))] = self._new_node()
+
+        level = max(0, (length - 1) // STRIDE)
+        for depth in range(level):
+            slot = (address >> (bits - STRIDE * (depth + 1))) & (SLOTS - 1)
+            entry = self._entry(node, slot, create)
+            child = int(self.child[entry]) if entry >= 0 else -1
+            if child < 0:
+                if not create:
+                    return None
+                child = self._new_node()
+                self.child[entry] = child
+            node = child
+        rest = length - STRIDE * level
+        first = (address >> (bits - STRIDE * (level + 1))) & (SLOTS - 1) & ~((1 << (STRIDE - rest)) - 1)
+        return node, first, rest
+
+    def insert(self, key, address, length, is_v6, value):
+        """
+        Add a prefix or replace the value of an existing one
+        """
+        if value < 0:
+            raise ValueError("Values must not be negative")
+        node, first, rest = self._path(key, address, length, is_v6, create=True)
+        self.prefixes[(node, first, rest)] = value
+
+        for slot in range(first, first + (1 << (STRIDE - rest))):
+            entry = self._entry(node, slot, create=True)
+            if self.value[entry] < 0 or self.length[entry] <= length:
+                self.value[entry] = value
+                self.length[entry] = length
+
+    def delete(self, key, address, length, is_v6):
+        """
+        Remove a prefix, returns its value, KeyError if the prefix does not exist
+        """
+        path = self._path(key, address, length, is_v6, create=False)
+        if path is None or path not in self.prefixes:
+            raise KeyError("No prefix %x/%d of %s" % (address, length, key))
+        node, first, rest = path
+        value = self.prefixes.pop(path)
+
+        # Slots of the prefix get the longest shorter prefix of the node covering them
+        covering = [(bits, self.prefixes[(node, first & ~((1 << (STRIDE - bits)) - 1), bits)])
+                    for bits in range(rest) if (node, first & ~((1 << (STRIDE - bits)) - 1), bits) in self.prefixes]
+        for slot in range(first, first + (1 << (STRIDE - rest))):
+            entry = self._entry(node, slot, create=False)
+            if self.value[entry] < 0 or self.length[entry] != length:
+                continue
+            if covering:
+                bits, covering_value = covering[-1]
+                self.value[entry] = covering_value
+                self.length[entry] = length - rest + bits
+            else:
+                self.value[entry] = -1
+        return value
+
+    def lookup(self, keys, addresses, is_v6):
+        """
+        Value of the longest prefix matching every address under its key, -1 on miss
+
+        keys: table key of every address (or one for all), addresses: (count, 2) words
+        """
+        count = len(addresses)
+        keys = np.broadcast_to(np.asarray(keys, dtype=np.int64), (count,))
+        is_v6 = np.broadcast_to(np.asarray(is_v6, dtype=np.bool_), (count,))
+        result = np.full(count, -1, dtype=np.int64)
+        if not self.roots:
+            return result
+
+        codes = np.array([2 * key + v6 for key, v6 in self.roots], dtype=np.int64)
+        nodes = np.array(list(self.roots.values()), dtype=np.int64)
+        order = np.argsort(codes)
+        codes, nodes = codes[order], nodes[order]
+        query = 2 * keys + is_v6
+        position = np.minimum(np.searchsorted(codes, query), len(codes) - 1)
+        node = np.where(codes[position] == query, nodes[position], -1)
+
+        for level in range(128 // STRIDE if is_v6.any() else 32 // STRIDE):
+            active = np.flatnonzero(node >= 0)
+            if not len(active):
+                break
+            v6 = is_v6[active]
+            word = np.where(v6, addresses[active, min(level // 8, 1)], addresses[active, 1])
+            shift = np.where(v6, 56 - STRIDE * (level % 8), max(24 - STRIDE * level, 0)).astype(np.uint64)
+            slot = ((word >> shift) & np.uint64(SLOTS - 1)).astype(np.int64)
+            entry = self._probe(node[active] * SLOTS + slot)
+            found = entry >= 0
+            value = np.where(found, self.value[entry], -1)
+            hit = value >= 0
+            result[active[hit]] = value[hit]
+            node[active] = np.where(found, self.child[entry], -1)
+        return result
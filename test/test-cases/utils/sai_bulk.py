@@ -0,0 +1,157 @@
+"""
+Bulk submission of SAI commands.
+
+dpu.process_commands() executes one SAI call per command. BulkCommandProcessor
+groups consecutive "create" (or "remove") commands of the same object type into
+"bulk_create" ("bulk_remove") commands of up to chunk_size records, see
+docs/README-SAIC-DASH-config-spec.md for the bulk command format, so a scale
+config costs one RPC per chunk instead of one RPC per object.
+
+SAI Challenger does not support bulk commands yet, so the default chunk_size
+is 1 and commands are submitted one by one; pass a larger chunk_size for
+targets accepting bulk_create/bulk_remove.
+
+Commands are consumed and submitted on the fly, so generators of any size can
+be passed. A chunk is closed before a record referring ($name) to an object
+created in the same chunk: names are resolved by SAI Challenger once the
+objects are created, so the reference is resolved in a later chunk.
+
+Usage:
+    bulk = BulkCommandProcessor(dpu, chunk_size=1000)
+    results = [*bulk.process_commands(make_create_cmds())]
+    results = [*bulk.process_commands(make_remove_cmds())]
+    print(bulk.summary())
+"""
+
+BULK_OPS = {
+    "create": "bulk_create",
+    "remove": "bulk_remove",
+}
+
+DEFAULT_CHUNK_SIZE = 1
+
+
+def references(value):
+    """
+    Names of the objects referred by "$name" strings in a command key or attributes
+    """
+    if isinstance(value, str):
+        if value.startswith("$"):
+            yield value[1:]
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from references(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from references(item)
+
+
+def make_bulk_command(chunk):
+    """
+    Merge records of one chunk (same op and type) into a single bulk command
+    """
+    op = chunk[0]["op"]
+    command = {
+        "op": BULK_OPS[op],
+        "name": [record["name"] for record in chunk],
+    }
+    if op == "create":
+        command["type"] = chunk[0]["type"]
+        if any("key" in record for record in chunk):
+            command["key"] = [record.get("key", {}) for record in chunk]
+        command["attributes"] = [record.get("attributes", []) for record in chunk]
+    return command
+
+
+class BulkCommandProcessor:
+    """
+    Submit SAI commands through dpu.process_commands() in bulk chunks.
+
+    process_commands() yields one result per submitted record, in order, like
+    dpu.process_commands() does. A chunk fails as a whole when the bulk call
+    raises or does not return one status per record. Records of a failed chunk
+    get result None and are added to `failed` as (record, error); the error is
+    raised again unless stop_on_error is False.
+    """
+
+    def __init__(self, dpu, chunk_size=DEFAULT_CHUNK_SIZE, stop_on_error=True):
+        self.dpu = dpu
+        self.chunk_size = chunk_size
+        self.stop_on_error = stop_on_error
+        # Types of the objects created through this processor, "remove" records carry names only
+        self.name_types = {}
+        self.failed = []
+        self.records = 0
+        self.calls = 0
+
+    def _group(self, record):
+        """
+        Chunk grouping key of the record, None if it is submitted as is
+        """
+        op = record.get("op")
+        if op not in BULK_OPS or self.chunk_size <= 1:
+            return None
+        obj_type = record.get("type") or self.name_types.get(record.get("name"))
+        if obj_type is None:
+            return None
+        return op, obj_type
+
+    def _chunks(self, commands):
+        """
+        Split commands into lists of records submitted by one call
+        """
+        chunk, group, names = [], None, set()
+        for record in commands:
+            record_group = self._group(record)
+            if chunk and (record_group is None or record_group != group or len(chunk) >= self.chunk_size or
+                          not names.isdisjoint(references([record.get("key"), record.get("attributes")]))):
+                yield chunk
+                chunk, names = [], set()
+
+            if record_group is None:
+                yield [record]
+                continue
+
+            chunk.append(record)
+            group = record_group
+            names.add(record.get("name"))
+        if chunk:
+            yield chunk
+
+    def _submit(self, chunk):
+        command = chunk[0] if len(chunk) == 1 else make_bulk_command(chunk)
+        self.calls += 1
+        results = [*self.dpu.process_commands([command])]
+        if len(chunk) == 1:
+            return results
+
+        results = results[0] if len(results) == 1 else results
+        if isinstance(results, (list, tuple)) and len(results) == len(chunk):
+            return list(results)
+        # Statuses of the single records are not known, the chunk may be partially applied
+        raise RuntimeError("%s of %d records returned %r instead of per-record statuses" %
+                           (command["op"], len(chunk), results))
+
+    def process_commands(self, commands):
+        for chunk in self._chunks(commands):
+            try:
+                results = self._submit(chunk)
+            except Exception as e:
+                self.failed.extend((record, e) for record in chunk)
+                if self.stop_on_error:
+                    raise
+                self.records += len(chunk)
+                yield from [None] * len(chunk)
+                continue
+
+            for record in chunk:
+                if record.get("op") == "create" and "type" in record:
+                    self.name_types[record["name"]] = record["type"]
+                elif record.get("op") == "remove":
+                    self.name_types.pop(record.get("name"), None)
+
+            self.records += len(chunk)
+            yield from results
+
+    def summary(self):
+        return "%d records submitted by %d calls, %d failed" % (self.records, self.calls, len(self.failed))
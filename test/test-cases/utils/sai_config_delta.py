@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+"""
+Delta between two SAI configurations, applied instead of a full remove and create.
+
+Objects of both record sets are matched by object type and key (by name for
+objects without a key). Every record is reduced to a fingerprint: a hash of its
+name and attribute values, with a hash per attribute to find the changed ones.
+Only fingerprints of the current config are kept in memory.
+
+Commands are ordered so references ($name) stay valid. Recreated objects are
+removed before they are created again (break before make); objects only deleted
+are removed last, once the target objects exist (make before break):
+    1. remove objects to be recreated and deleted objects referring to them,
+       dependents first (reverse current order)
+    2. create new and recreated objects (target order)
+    3. set changed attributes (target order)
+    4. remove deleted objects, dependents first (reverse current order)
+
+An object is recreated instead of updated when it changes its name, drops an
+attribute or changes one of `recreate_attrs` (create-only attributes), and
+so is every object referring to a recreated one, since its OID changes.
+
+Usage:
+    delta = ConfigDelta(current_records, target_records)
+    results = [*dpu.process_commands(delta.commands())]
+    print(delta.summary())
+
+Standalone:
+    sai_config_delta.py current.json target.json  # Dump delta SAI records as JSON to stdout
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+
+from sai_bulk import references
+
+
+def fingerprint(value):
+    """
+    64-bit hash of a JSON-serializable value
+    """
+    data = json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def record_id(record):
+    """
+    Identity of the object: (type, key) for entries, (type, name) for objects with OID
+    """
+    if "key" in record:
+        return record["type"], fingerprint(record["key"])
+    return record["type"], record["name"]
+
+
+def attr_hashes(record):
+    attrs = record.get("attributes", [])
+    return {attrs[i]: fingerprint(attrs[i + 1]) for i in range(0, len(attrs) - 1, 2)}
+
+
+class RecordIndex:
+    """
+    Fingerprints of the create records of a config, in creation order
+    """
+
+    def __init__(self, records):
+        self.entries = {}
+        for index, record in enumerate(records):
+            if record.get("op", "create") != "create":
+                continue
+            self.entries[record_id(record)] = (index, record["name"], record["type"],
+                                               fingerprint([record["name"], record.get("attributes", [])]),
+                                               attr_hashes(record),
+                                               frozenset(references([record.get("key"), record.get("attributes")])))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, rid):
+        return self.entries.get(rid)
+
+
+class ConfigDelta:
+    """
+    current, target: lists of SAI records or functions returning a new iterable of records.
+    The target records are iterated twice, generators are materialized.
+    """
+
+    def __init__(self, current, target, recreate_attrs=()):
+        self.index = RecordIndex(current() if callable(current) else current)
+        self.target = target if callable(target) else (lambda records=list(target): records)
+        self.recreate_attrs = set(recreate_attrs)
+        self.counts = dict.fromkeys(["create", "recreate", "set", "remove", "unchanged"], 0)
+
+    def _classify(self):
+        """
+        Compare target records with the index.
+        Returns (ids of matched objects, {id: changed attributes}, ids of recreated objects)
+        """
+        matched, changed, recreate = set(), {}, set()
+        recreated_names = set()
+        for record in self.target():
+            rid = record_id(record)
+            current = self.index.get(rid)
+            if current is None:
+                continue
+            matched.add(rid)
+
+            _, name, _, fp, hashes, _ = current
+            new_hashes = attr_hashes(record)
+            if name != record["name"] or not recreated_names.isdisjoint(
+                    references([record.get("key"), record.get("attributes")])):
+                recreate.add(rid)
+            elif fp != fingerprint([record["name"], record.get("attributes", [])]):
+                attrs = [attr for attr, h in new_hashes.items() if hashes.get(attr) != h]
+                if set(hashes) - set(new_hashes) or self.recreate_attrs.intersection(attrs):
+                    recreate.add(rid)
+                else:
+                    changed[rid] = attrs
+
+            if rid in recreate:
+                recreated_names.add(name)
+                recreated_names.add(record["name"])
+        return matched, changed, recreate
+
+    def _removes(self, rids):
+        entries = sorted((self.index.get(rid) for rid in rids), key=lambda entry: entry[0], reverse=True)
+        for _, name, obj_type, _, _, _ in entries:
+            yield {"name": name, "op": "remove", "type": obj_type}
+
+    def commands(self):
+        """
+        Generate the ordered command stream transforming current config into target
+        """
+        matched, changed, recreate = self._classify()
+        deleted = set(self.index.entries) - matched
+
+        # Deleted objects referring to a recreated object go away before it, in current order
+        early = set(recreate)
+        early_names = {self.index.get(rid)[1] for rid in recreate}
+        for rid, (_, name, _, _, _, refs) in sorted(self.index.entries.items(), key=lambda item: item[1][0]):
+            if rid in deleted and not early_names.isdisjoint(refs):
+                early.add(rid)
+                early_names.add(name)
+        deleted -= early
+
+        self.counts.update(recreate=len(recreate), set=0, remove=len(early) - len(recreate) + len(deleted),
+                           unchanged=len(matched) - len(recreate) - len(changed))
+        yield from self._removes(early)
+
+        creates = 0
+        for record in self.target():
+            rid = record_id(record)
+            if rid not in matched or rid in recreate:
+                creates += 1
+                yield dict(record, op="create")
+        self.counts["create"] = creates - len(recreate)
+
+        for record in self.target():
+            attrs = changed.get(record_id(record))
+            if not attrs:
+                continue
+            values = dict(zip(record["attributes"][::2], record["attributes"][1::2]))
+            for attr in attrs:
+                command = {"name": record["name"], "op": "set", "type": record["type"],
+                           "attributes": [attr, values[attr]]}
+                if "key" in record:
+                    command["key"] = record["key"]
+                self.counts["set"] += 1
+                yield command
+
+        yield from self._removes(deleted)
+
+    def summary(self):
+        return ", ".join("%s: %d" % item for item in self.counts.items())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Delta of two DASH SAI configurations')
+    parser.add_argument('current', help='JSON file with SAI records of the applied configuration')
+    parser.add_argument('target', help='JSON file with SAI records of the configuration to apply')
+    parser.add_argument('--recreate-attrs', default='',
+                        help='Comma separated create-only attributes, objects changing them are recreated')
+    args = parser.parse_args()
+
+    with open(args.current) as f:
+        current = json.load(f)
+    with open(args.target) as f:
+        target = json.load(f)
+
+    delta = ConfigDelta(current, target, [attr for attr in args.recreate_attrs.split(',') if attr])
+    print(json.dumps([*delta.commands()], indent=2))
+    print(delta.summary(), file=sys.stderr)
@@ -0,0 +1,72 @@
+"""
+Streaming generation of SAI configuration records.
+
+Scale configurations are produced as a pipeline of generators, so records
+reach dpu.process_commands() as soon as they are generated and memory does
+not grow with the size of the configuration:
+
+    source  -> records of every object type (dpugen generators)
+    stages  -> per-type transforms, e.g. extra attributes for the target
+    sink    -> dpu.process_commands() or JSON output
+
+Removal regenerates the same stream instead of keeping created records:
+object types are removed in reverse creation order, records of one type in
+creation order, since objects of the same type do not depend on each other.
+
+Usage:
+    conf = dpugen.sai.SaiConfig()
+    conf.generate()
+    stages = [extend_attrs({'SAI_OBJECT_TYPE_ENI': ['SAI_ENI_ATTR_DSCP', '0']})]
+    results = [*dpu.process_commands(pipeline(dpugen_sources(conf), stages))]
+    results = [*dpu.process_commands(remove_commands(dpugen_sources(conf)))]
+"""
+
+
+def dpugen_sources(conf):
+    """
+    Per-type record generators of a generated dpugen configuration, in creation order.
+    Returns list of functions, each returns a new generator of records of one object type.
+    """
+    configs = getattr(conf, "configs", None)
+    if configs is None:
+        # Generator with no per-type stages: the whole config is one source
+        return [conf.items]
+    return [config.items for config in configs]
+
+
+def records(sources):
+    for source in sources:
+        yield from source()
+
+
+def extend_attrs(extra_attrs):
+    """
+    Stage appending attributes to records of given types: {sai_object_type: [attr, value, ...]}
+    """
+    def stage(stream):
+        for record in stream:
+            ext = extra_attrs.get(record.get("type"))
+            if ext:
+                record["attributes"] = record.get("attributes", []) + ext
+            yield record
+    return stage
+
+
+def pipeline(sources, stages=()):
+    """
+    Records of all sources passed through the stages, generated on demand
+    """
+    stream = records(sources)
+    for stage in stages:
+        stream = stage(stream)
+    return stream
+
+
+def remove_commands(sources):
+    """
+    Remove commands of the records produced by sources, generated on demand.
+    Object type is kept, so removal of one type can be submitted in bulk.
+    """
+    for source in reversed(sources):
+        for record in source():
+            yield {"name": record["name"], "op": "remove", "type": record["type"]}
@@ -0,0 +1,280 @@
+"""
+P4 table schemas of the DASH SAI APIs, read from dash-pipeline/SAI/specs.
+
+Every SAI API generated from the P4 program carries a SaiApiP4MetaTable: the
+table keys with their match types and bit widths, and the actions with their
+SAI attribute parameters. P4Schema loads these together with the attribute
+types, defaults and enum values, and turns SAI records (as passed to
+dpu.process_commands()) into table entries of parsed values, so models of the
+pipeline use the same table layout as the P4 program.
+
+The spec YAML files are read without the generator classes (utils.sai_spec),
+every tagged object is loaded as a plain dict.
+
+Values are parsed by the SAI type of the key or attribute:
+    sai_object_id_t     object number, "$name" references are numbered in order of appearance,
+                        numbers (e.g. a next hop id "1") are taken as is, null is 0
+    sai_ip_address_t    (address as int, is_v6)
+    sai_ip_prefix_t     (network as int, prefix length, is_v6)
+    sai_mac_t           int
+    bool                bool
+    sai_u32_range_t     (min, max)
+    lists               list of the parsed items
+    enums               enum value
+    integers            int, masked to the width ("-1" is all ones), or the value of an enum name
+
+Usage:
+    schema = P4Schema()
+    entry = schema.entry(record)
+    entry.table.name, entry.key["destination"], entry.action, entry.params["dst_vnet_id"]
+"""
+
+import glob
+import ipaddress
+import os
+
+import yaml
+
+from address_range import address_to_int
+
+SPEC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "..", "..", "..", "dash-pipeline", "SAI", "specs")
+
+NULL_OBJECT_ID = "SAI_NULL_OBJECT_ID"
+
+INT_BITS = {
+    "sai_uint8_t": 8,
+    "sai_uint16_t": 16,
+    "sai_uint32_t": 32,
+    "sai_uint64_t": 64,
+}
+
+# Standard SAI enums referred by the DASH APIs
+SAI_ENUMS = {
+    "sai_ip_addr_family_t": {"SAI_IP_ADDR_FAMILY_IPV4": 0, "SAI_IP_ADDR_FAMILY_IPV6": 1},
+    "sai_packet_action_t": {"SAI_PACKET_ACTION_DROP": 0, "SAI_PACKET_ACTION_FORWARD": 1},
+}
+
+# Defaults chosen by the implementation
+VENDOR_DEFAULTS = ("vendor", "empty")
+
+LIST_ITEM_TYPES = {
+    "sai_ip_prefix_list_t": "sai_ip_prefix_t",
+    "sai_u8_list_t": "sai_uint8_t",
+    "sai_u16_range_list_t": "sai_u16_range_t",
+}
+
+
+def _int(text):
+    if isinstance(text, str):
+        return int(text, 16) if text.lower().startswith("0x") else int(text)
+    return int(text)
+
+
+class _SpecLoader(yaml.SafeLoader):
+    pass
+
+
+_SpecLoader.add_multi_constructor("tag:yaml.org,2002:python/object:",
+                                  lambda loader, suffix, node: loader.construct_mapping(node, deep=True))
+# API group files are loaded one by one instead of included by sai_spec.yaml
+_SpecLoader.add_constructor("!inc", lambda loader, node: None)
+
+
+def load_spec(path):
+    with open(path) as f:
+        return yaml.load(f, Loader=_SpecLoader)
+
+
+class P4Key:
+    def __init__(self, name, match_type, bitwidth, sai_type):
+        self.name = name
+        self.match_type = match_type
+        self.bitwidth = bitwidth
+        self.sai_type = sai_type
+
+    def __repr__(self):
+        return "P4Key(%s, %s, %d bits)" % (self.name, self.match_type, self.bitwidth)
+
+
+class P4Table:
+    """
+    Schema of one SAI API table
+
+    name: SAI API name, e.g. "outbound_routing_entry"
+    object_type: e.g. "SAI_OBJECT_TYPE_OUTBOUND_ROUTING_ENTRY"
+    is_object: entries are objects with OID instead of entries with a key
+    keys: list of P4Key in table key order, empty for objects
+    actions: short action name ("route_vnet") -> short names of its parameters
+    attrs: short attribute name ("dst_vnet_id") -> (SAI type, default value string)
+    """
+
+    def __init__(self, api, p4_table):
+        self.name = api["name"]
+        self.object_type = "SAI_OBJECT_TYPE_" + self.name.upper()
+        self.is_object = api["is_object"]
+        self.attr_prefix = "SAI_%s_ATTR_" % self.name.upper()
+        self.action_prefix = "SAI_%s_ACTION_" % self.name.upper()
+
+        key_types = {}
+        for struct in api.get("structs") or []:
+            for member in struct["members"]:
+                key_types[member["name"].lower()] = member["type"]
+        self.keys = [P4Key(key["name"].lower(), key["match_type"], key["bitwidth"],
+                           key_types.get(key["name"].lower()))
+                     for key in p4_table["keys"] if not key["is_object_key"] and not self.is_object]
+
+        self.attrs = {attr["name"][len(self.attr_prefix):].lower(): (attr["type"], attr["default"])
+                      for attr in api.get("attributes") or []}
+        self.actions = {name[len(self.action_prefix):].lower():
+                        [param[len(self.attr_prefix):].lower() for param in action["attr_params"]]
+                        for name, action in p4_table["actions"].items()}
+
+    def __repr__(self):
+        return "P4Table(%s, keys=%s, actions=%s)" % (self.name, self.keys, list(self.actions))
+
+    @property
+    def default_action(self):
+        if "action" in self.attrs:
+            return self.attrs["action"][1][len(self.action_prefix):].lower()
+        return next(iter(self.actions))
+
+
+class P4Entry:
+    """
+    Table entry of one SAI record: key values by key name, action and its parameter values
+    """
+
+    def __init__(self, table, name, key, action, params):
+        self.table = table
+        self.name = name
+        self.key = key
+        self.action = action
+        self.params = params
+
+    def __repr__(self):
+        return "P4Entry(%s, %s, key=%s, action=%s, params=%s)" % (
+            self.table.name, self.name, self.key, self.action, self.params)
+
+
+class P4Schema:
+    """
+    Tables and enums of all DASH SAI API specs, tables by object type
+    """
+
+    def __init__(self, spec_dir=SPEC_DIR):
+        self.tables = {}
+        self.enums = dict(SAI_ENUMS)
+        self.oids = {}
+
+        for path in sorted(glob.glob(os.path.join(spec_dir, "*.yaml"))):
+            spec = load_spec(path)
+            if os.path.basename(path) == "sai_spec.yaml":
+                for enum in spec.get("enums") or []:
+                    prefix = enum["name"][:-len("_t")].upper() + "_"
+                    self.enums[enum["name"]] = {prefix + member["name"]: int(member["value"])
+                                                for member in enum["members"]}
+                continue
+
+            for api in spec.get("sai_apis") or []:
+                for enum in api.get("enums") or []:
+                    self.enums[enum["name"]] = {member["name"]: int(member["value"])
+                                                for member in enum["members"]}
+                p4_meta = api.get("p4_meta")
+                if p4_meta and p4_meta.get("tables"):
+                    # Tables of one API (e.g. ACL rule stages) share the schema
+                    table = P4Table(api, p4_meta["tables"][0])
+                    self.tables[table.object_type] = table
+
+    def table(self, object_type):
+        try:
+            return self.tables[object_type]
+        except KeyError:
+            raise ValueError("No P4 table for %s" % object_type) from None
+
+    def oid(self, name):
+        """
+        Number of the object "name" (or "$name"), 0 for the null object.
+        Object ids configured as numbers are returned as they are.
+        """
+        if name in (NULL_OBJECT_ID, None):
+            return 0
+        if isinstance(name, int) or not name.startswith("$") and name.strip().isdigit():
+            return int(name)
+        name = name[1:] if name.startswith("$") else name
+        return self.oids.setdefault(name, len(self.oids) + 1)
+
+    def value(self, sai_type, text):
+        """
+        Parse a key or attribute value string of the SAI type
+        """
+        if sai_type == "sai_object_id_t":
+            return self.oid(text)
+        if sai_type == "sai_ip_address_t":
+            address = ipaddress.ip_address(text)
+            return int(address), address.version == 6
+        if sai_type == "sai_ip_prefix_t":
+            network = ipaddress.ip_network(text, strict=False)
+            return int(network.network_address), network.prefixlen, network.version == 6
+        if sai_type == "sai_mac_t":
+            return address_to_int(text, "mac")
+        if sai_type == "bool":
+            return str(text).lower() in ("true", "1")
+        if sai_type in INT_BITS:
+            # Integer attributes of standard SAI objects may be set by enum name, e.g. packet actions
+            if isinstance(text, str) and text.startswith("SAI_"):
+                return self.enum_value(text)
+            return _int(text) & ((1 << INT_BITS[sai_type]) - 1)
+        if sai_type.endswith("_range_t"):
+            low, high = str(text).replace("-", ",").split(",")
+            return _int(low), _int(high)
+        if sai_type.endswith("_list_t"):
+            item_type = LIST_ITEM_TYPES.get(sai_type, "sai_uint32_t")
+            items = text.split(",") if isinstance(text, str) else text
+            return [self.value(item_type, item.strip() if isinstance(item, str) else item) for item in items if item != ""]
+        if sai_type in self.enums:
+            return self.enums[sai_type][text]
+        raise ValueError("Unsupported SAI type %s" % sai_type)
+
+    def enum_value(self, name):
+        for members in self.enums.values():
+            if name in members:
+                return members[name]
+        raise ValueError("Unknown enum value %s" % name)
+
+    def entry(self, record):
+        """
+        Table entry of a create record
+        """
+        table = self.table(record["type"])
+        if table.is_object:
+            key = {"oid": self.oid(record["name"])}
+        else:
+            record_key = {name.lower(): value for name, value in record["key"].items()}
+            missing = [k.name for k in table.keys if k.name not in record_key]
+            if missing:
+                raise ValueError("Key %s of %s missing in %s" % (", ".join(missing), table.name, record["name"]))
+            key = {k.name: self.value(k.sai_type, record_key[k.name]) for k in table.keys}
+
+        attrs = record.get("attributes", [])
+        values = {}
+        for i in range(0, len(attrs) - 1, 2):
+            if not attrs[i].startswith(table.attr_prefix):
+                raise ValueError("Attribute %s does not belong to %s" % (attrs[i], table.name))
+            values[attrs[i][len(table.attr_prefix):].lower()] = attrs[i + 1]
+
+        action = table.default_action
+        if "action" in values:
+            action = values.pop("action")[len(table.action_prefix):].lower()
+        if action not in table.actions:
+            raise ValueError("Unknown action %s of %s" % (action, table.name))
+
+        params = {}
+        for name, (sai_type, default) in table.attrs.items():
+            if name == "action":
+                continue
+            text = values.pop(name, default)
+            params[name] = None if text is None or text in VENDOR_DEFAULTS else self.value(sai_type, text)
+        if values:
+            raise ValueError("Unknown attributes %s of %s" % (", ".join(values), table.name))
+        return P4Entry(table, record["name"], key, action, params)
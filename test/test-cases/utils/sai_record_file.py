@@ -0,0 +1,459 @@
+#!/usr/bin/python3
+"""
+Compact binary file format for SAI command records.
+
+JSON dumps of HERO scale configs are large and slow to parse. This format keeps
+the same records (any JSON-compatible dict, bulk commands included) with:
+    - records of the same structure (keys, nesting and value kinds) sharing a
+      shape, stored once; a record is its shape index and its values packed
+      with one fixed struct layout per shape
+    - strings interned: attribute names, enum values and name prefixes are
+      stored once and referred by index
+    - names like "eni#12" stored as interned prefix and number
+    - IPv4/IPv6 addresses, prefixes and MACs packed into bytes
+    - integers (and canonical integer strings, e.g. "2000") packed as uint32
+      or uint64
+    - every record in a length-prefixed frame, indexed at the end of the
+      file for memory-mapped random access
+
+A shape is compiled once into a struct unpacker and a function building the
+record from the unpacked values, so decoding a record costs one unpack and one
+call, faster than json.load() of the same records.
+
+Values round-trip exactly: a string is packed only if it is formatted back to
+the same text, otherwise it is stored as a string.
+
+File layout:
+    MAGIC, version
+    frames: <kind byte> <varint payload length> <payload>
+        S - interned string, appended to the string table
+        P - shape as JSON, appended to the shape table
+        R - record: varint shape index, values packed by the shape layout
+        T - string table: varint deltas of S frame offsets (written on close)
+        Q - shape table: varint deltas of P frame offsets (written on close)
+        I - record offsets, uint64 each (written on close)
+    trailer: uint64 offset of the T frame, MAGIC
+
+Usage:
+    with SaiRecordWriter("vnet_create.sair") as writer:
+        writer.write_all(make_create_cmds())
+    results = [*dpu.process_commands(SaiRecordFile("vnet_create.sair"))]
+    record = SaiRecordFile("vnet_create.sair")[12345]
+
+Standalone:
+    sai_record_file.py to-bin vnet_create.json vnet_create.sair
+    sai_record_file.py to-json vnet_create.sair > vnet_create.json
+"""
+
+import argparse
+import json
+import mmap
+import re
+import socket
+import struct
+import sys
+
+MAGIC = b"SAIR"
+VERSION = 2
+TRAILER = struct.Struct("<Q4s")
+
+# Frame kinds read while streaming
+STRING, SHAPE, RECORD = b"SPR"
+
+UINT32_MAX = 2**32 - 1
+UINT64_MAX = 2**64 - 1
+
+# Leaf value kinds of a shape: struct fields and expression building the value from them
+LEAVES = {
+    "null": ("", "None"),
+    "true": ("", "True"),
+    "false": ("", "False"),
+    "int": ("I", "{0}"),
+    "int64": ("Q", "{0}"),
+    "neg_int": ("q", "{0}"),
+    "big_int": ("I", "int(S[{0}])"),
+    "float": ("d", "{0}"),
+    "str": ("I", "S[{0}]"),
+    "numbered": ("II", "S[{0}] + str({1})"),
+    "numbered64": ("IQ", "S[{0}] + str({1})"),
+    "int_str": ("I", "str({0})"),
+    "int64_str": ("Q", "str({0})"),
+    "ipv4": ("4s", "inet_ntoa({0})"),
+    "ipv6": ("16s", "inet_ntop(AF_INET6, {0})"),
+    "ipv4_prefix": ("4sB", "inet_ntoa({0}) + '/' + str({1})"),
+    "ipv6_prefix": ("16sB", "inet_ntop(AF_INET6, {0}) + '/' + str({1})"),
+    "mac": ("6s", "{0}.hex(':')"),
+    "mac_upper": ("6s", "{0}.hex(':').upper()"),
+}
+
+LEAF_FIELDS = re.compile(r"\d*[a-zA-Z]")
+
+NUMBERED_PATTERN = re.compile(r"^(.*\D)?(0|[1-9]\d{0,17})$", re.S)
+MAC_PATTERN = re.compile(r"^[0-9a-fA-F]{2}(:[0-9a-fA-F]{2}){5}$")
+IP_PATTERN = re.compile(r"^[0-9a-fA-F.:]+(/\d{1,3})?$")
+
+
+def write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = data[pos]
+    if value < 0x80:
+        return value, pos + 1
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class RecordEncoder:
+    """
+    Encode records into frame payloads, interning strings and shapes.
+    New strings and shapes are returned by take_strings() and take_shapes()
+    to be written before the record.
+    """
+
+    def __init__(self):
+        self.strings = {}
+        self.new_strings = []
+        self.shapes = {}
+        self.new_shapes = []
+        self.layouts = []
+
+    def intern(self, text):
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+            self.new_strings.append(text)
+        return index
+
+    def take_strings(self):
+        new_strings, self.new_strings = self.new_strings, []
+        return new_strings
+
+    def take_shapes(self):
+        new_shapes, self.new_shapes = self.new_shapes, []
+        return new_shapes
+
+    def _string(self, value, args):
+        """
+        Leaf kind of a string, its fields are appended to args
+        """
+        if MAC_PATTERN.match(value):
+            packed = bytes.fromhex(value.replace(":", ""))
+            if value == value.lower():
+                args.append(packed)
+                return "mac"
+            if value == value.upper():
+                args.append(packed)
+                return "mac_upper"
+
+        if IP_PATTERN.match(value) and ("." in value or ":" in value):
+            address, _, prefix = value.partition("/")
+            family = socket.AF_INET6 if ":" in address else socket.AF_INET
+            try:
+                packed = socket.inet_pton(family, address)
+            except OSError:
+                packed = None
+            if packed is not None and socket.inet_ntop(family, packed) == address and \
+                    (not prefix or str(int(prefix)) == prefix and int(prefix) <= len(packed) * 8):
+                kind = "ipv4" if family == socket.AF_INET else "ipv6"
+                args.append(packed)
+                if prefix:
+                    args.append(int(prefix))
+                    kind += "_prefix"
+                return kind
+
+        match = NUMBERED_PATTERN.match(value)
+        if match:
+            prefix, number = match.groups()
+            number = int(number)
+            wide = number > UINT32_MAX
+            if prefix is None:
+                args.append(number)
+                return "int64_str" if wide else "int_str"
+            args += [self.intern(prefix), number]
+            return "numbered64" if wide else "numbered"
+
+        args.append(self.intern(value))
+        return "str"
+
+    def shape_of(self, value, args):
+        """
+        Shape of a value, its packed fields are appended to args.
+        Leaves are kind names, lists ("list", [shapes]), dicts ("dict", [keys], [shapes]).
+        """
+        if value is None:
+            return "null"
+        if value is True:
+            return "true"
+        if value is False:
+            return "false"
+        if isinstance(value, int):
+            if 0 <= value <= UINT32_MAX:
+                args.append(value)
+                return "int"
+            if 0 <= value <= UINT64_MAX:
+                args.append(value)
+                return "int64"
+            if -2**63 <= value < 0:
+                args.append(value)
+                return "neg_int"
+            args.append(self.intern(str(value)))
+            return "big_int"
+        if isinstance(value, float):
+            args.append(value)
+            return "float"
+        if isinstance(value, str):
+            return self._string(value, args)
+        if isinstance(value, (list, tuple)):
+            return ("list", tuple(self.shape_of(item, args) for item in value))
+        if isinstance(value, dict):
+            for key in value:
+                if not isinstance(key, str):
+                    raise TypeError("Unsupported key type %s: %r" % (type(key).__name__, key))
+            return ("dict", tuple(value), tuple(self.shape_of(item, args) for item in value.values()))
+        raise TypeError("Unsupported value type %s: %r" % (type(value).__name__, value))
+
+    def encode(self, record):
+        args = []
+        shape = self.shape_of(record, args)
+        index = self.shapes.get(shape)
+        if index is None:
+            index = self.shapes[shape] = len(self.shapes)
+            self.new_shapes.append(shape)
+            self.layouts.append(struct.Struct(shape_layout(shape)))
+        out = bytearray()
+        write_varint(out, index)
+        out += self.layouts[index].pack(*args)
+        return out
+
+
+def _shape_fields(shape, fields):
+    """
+    Append struct fields of the shape to fields, returns expression building its value
+    from the unpacked values v
+    """
+    if isinstance(shape, str):
+        fmt, expr = LEAVES[shape]
+        first = len(fields)
+        fields += LEAF_FIELDS.findall(fmt)
+        return expr.format(*["v[%d]" % i for i in range(first, len(fields))])
+    if shape[0] == "list":
+        return "[%s]" % "".join(_shape_fields(item, fields) + ", " for item in shape[1])
+    return "{%s}" % "".join("%r: %s, " % (key, _shape_fields(item, fields))
+                            for key, item in zip(shape[1], shape[2]))
+
+
+def shape_layout(shape):
+    fields = []
+    _shape_fields(shape, fields)
+    return "<" + "".join(fields)
+
+
+def compile_shape(shape, strings):
+    """
+    Decoder of the records of a shape: function returning the record at a position
+    of the data, strings is the (possibly still growing) string table
+    """
+    fields = []
+    expr = _shape_fields(shape, fields)
+    unpack = struct.Struct("<" + "".join(fields)).unpack_from
+    scope = {"S": strings, "inet_ntoa": socket.inet_ntoa, "inet_ntop": socket.inet_ntop,
+             "AF_INET6": socket.AF_INET6, "unpack": unpack}
+    exec("def decode(data, pos):\n    v = unpack(data, pos)\n    return %s\n" % expr, scope)
+    return scope["decode"]
+
+
+class SaiRecordWriter:
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.encoder = RecordEncoder()
+        self.offsets = []
+        self.string_offsets = []
+        self.shape_offsets = []
+        self.file.write(MAGIC + bytes([VERSION]))
+
+    def _frame(self, kind, payload):
+        header = bytearray(kind)
+        write_varint(header, len(payload))
+        offset = self.file.tell()
+        self.file.write(header)
+        self.file.write(payload)
+        return offset
+
+    def write(self, record):
+        payload = self.encoder.encode(record)
+        for text in self.encoder.take_strings():
+            self.string_offsets.append(self._frame(b"S", text.encode()))
+        for shape in self.encoder.take_shapes():
+            self.shape_offsets.append(self._frame(b"P", json.dumps(shape).encode()))
+        self.offsets.append(self._frame(b"R", payload))
+
+    def write_all(self, records):
+        for record in records:
+            self.write(record)
+
+    @staticmethod
+    def _table(offsets):
+        table = bytearray()
+        previous = 0
+        for offset in offsets:
+            write_varint(table, offset - previous)
+            previous = offset
+        return table
+
+    def close(self):
+        if self.file is None:
+            return
+        table_offset = self._frame(b"T", self._table(self.string_offsets))
+        self._frame(b"Q", self._table(self.shape_offsets))
+        self._frame(b"I", struct.pack("<%dQ" % len(self.offsets), *self.offsets))
+        self.file.write(TRAILER.pack(table_offset, MAGIC))
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SaiRecordFile:
+    """
+    Memory-mapped reader: iterate records (streamed from the start of the file)
+    or get one by index (through the offsets index at the end of the file).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC or self.data[len(MAGIC)] != VERSION:
+            raise ValueError("%s: not a SAI record file version %d" % (path, VERSION))
+        self._strings = None
+        self._decoders = None
+        self._offsets = None
+
+    def _read_frame(self, pos):
+        """
+        Returns tuple: (kind, payload start, payload end)
+        """
+        kind = self.data[pos:pos + 1]
+        length, start = read_varint(self.data, pos + 1)
+        return kind, start, start + length
+
+    def _load_index(self):
+        table_offset, magic = TRAILER.unpack_from(self.data, len(self.data) - TRAILER.size)
+        if magic != MAGIC:
+            raise ValueError("%s: truncated SAI record file" % self.path)
+
+        strings, end = self._read_table(table_offset)
+        shapes, end = self._read_table(end)
+        self._strings = [text.decode() for text in strings]
+        self._decoders = [compile_shape(json.loads(shape), self._strings) for shape in shapes]
+
+        kind, start, end = self._read_frame(end)
+        self._view = memoryview(self.data)
+        self._offsets = self._view[start:end].cast("Q")
+
+    def _read_table(self, table_offset):
+        """
+        Payloads of the frames listed by a table frame.
+        Returns tuple: (list of payloads, end of the table frame)
+        """
+        kind, pos, end = self._read_frame(table_offset)
+        payloads = []
+        offset = 0
+        while pos < end:
+            delta, pos = read_varint(self.data, pos)
+            offset += delta
+            _, start, stop = self._read_frame(offset)
+            payloads.append(self.data[start:stop])
+        return payloads, end
+
+    def __len__(self):
+        if self._offsets is None:
+            self._load_index()
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        if self._offsets is None:
+            self._load_index()
+        kind, start, end = self._read_frame(self._offsets[index])
+        shape, start = read_varint(self.data, start)
+        return self._decoders[shape](self.data, start)
+
+    def __iter__(self):
+        """
+        Stream records in file order, the string and shape tables are built on the way
+        """
+        data = self.data
+        strings = []
+        decoders = []
+        pos = len(MAGIC) + 1
+        while True:
+            kind = data[pos]
+            length, start = read_varint(data, pos + 1)
+            pos = start + length
+            if kind == RECORD:
+                shape = data[start]
+                if shape < 0x80:
+                    yield decoders[shape](data, start + 1)
+                else:
+                    shape, start = read_varint(data, start)
+                    yield decoders[shape](data, start)
+            elif kind == STRING:
+                strings.append(data[start:pos].decode())
+            elif kind == SHAPE:
+                decoders.append(compile_shape(json.loads(data[start:pos]), strings))
+            else:
+                return
+
+    def close(self):
+        if self._offsets is not None:
+            self._offsets.release()
+            self._view.release()
+            self._offsets = None
+        self.data.close()
+
+
+def json_to_binary(json_path, binary_path):
+    with open(json_path) as f:
+        records = json.load(f)
+    with SaiRecordWriter(binary_path) as writer:
+        writer.write_all(records)
+    return len(records)
+
+
+def binary_to_json(binary_path, out=sys.stdout):
+    records = SaiRecordFile(binary_path)
+    json.dump(list(records), out, indent=2)
+    out.write("\n")
+    records.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert SAI records between JSON and compact binary format')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    to_bin = subparsers.add_parser('to-bin', help='Convert JSON file to binary')
+    to_bin.add_argument('json_file')
+    to_bin.add_argument('binary_file')
+    to_json = subparsers.add_parser('to-json', help='Dump binary file as JSON to stdout')
+    to_json.add_argument('binary_file')
+    args = parser.parse_args()
+
+    if args.command == 'to-bin':
+        count = json_to_binary(args.json_file, args.binary_file)
+        print("%d records written to %s" % (count, args.binary_file), file=sys.stderr)
+    else:
+        binary_to_json(args.binary_file)
@@ -0,0 +1,140 @@
+"""
+Persistent log of created SAI objects, replayed in reverse to tear a config down.
+
+Teardowns used to keep (or regenerate) the full list of create commands just to
+reverse it. RemovalLog records only the object type and name of every create
+command as it passes to dpu.process_commands(), appending them to a file, and
+generates remove commands by reading the file backwards. Memory use does not
+depend on the size of the config, and the log survives the test process, so an
+aborted scale run can be cleaned up by a later one.
+
+Log file format, one line per entry:
+    @<type index> <SAI object type>     declares an object type
+    <type index> <object name>          object created
+
+Usage:
+    log = RemovalLog("vnet_scale.removal.log")
+    results = [*bulk.process_commands(log.track(make_create_cmds()))]
+    ...
+    results = [*bulk.process_commands(log.remove_commands())]
+    log.clear()
+"""
+
+import mmap
+import os
+
+
+class RemovalLog:
+    """
+    Objects are logged before they are created: a record left by a failed or
+    aborted create produces a remove command for an object which may not exist,
+    so replay it with BulkCommandProcessor(stop_on_error=False) after a crash.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.types = []
+        self.type_index = {}
+        self.file = None
+        self._load()
+
+    def _load(self):
+        """
+        Read object types of an existing log and drop a line left incomplete by a crash
+        """
+        if not os.path.exists(self.path):
+            return
+
+        end = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                end += len(line)
+                if line.startswith(b"@"):
+                    index, obj_type = line[1:].decode().split()
+                    self._add_type(obj_type, int(index))
+
+        if end != os.path.getsize(self.path):
+            os.truncate(self.path, end)
+
+    def _add_type(self, obj_type, index):
+        while len(self.types) <= index:
+            self.types.append(None)
+        self.types[index] = obj_type
+        self.type_index[obj_type] = index
+
+    def __len__(self):
+        """
+        Number of objects in the log
+        """
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "rb") as f:
+            return sum(1 for line in f if not line.startswith(b"@"))
+
+    def _open(self):
+        if self.file is None:
+            self.file = open(self.path, "ab")
+        return self.file
+
+    def add(self, obj_type, name):
+        f = self._open()
+        index = self.type_index.get(obj_type)
+        if index is None:
+            index = len(self.types)
+            self._add_type(obj_type, index)
+            f.write(b"@%d %s\n" % (index, obj_type.encode()))
+        f.write(b"%d %s\n" % (index, name.encode()))
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def track(self, commands):
+        """
+        Pass commands through, logging names of the created objects.
+        Writes are buffered and flushed once the commands are consumed or the
+        consumer stops; entries still buffered when the process is killed are lost.
+        """
+        try:
+            for command in commands:
+                if command.get("op") == "create":
+                    self.add(command["type"], command["name"])
+                yield command
+        finally:
+            self.flush()
+
+    def remove_commands(self):
+        """
+        Remove commands of all logged objects, last created first, generated on demand
+        """
+        self.close()
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            return
+
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            end = len(data)
+            while end > 0:
+                start = data.rfind(b"\n", 0, end - 1) + 1
+                line = data[start:end - 1]
+                end = start
+                if line.startswith(b"@"):
+                    continue
+                index, name = line.decode().split(" ", 1)
+                yield {"name": name, "op": "remove", "type": self.types[int(index)]}
+
+    def clear(self):
+        """
+        Forget all objects, call once the teardown succeeded
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.types = []
+        self.type_index = {}
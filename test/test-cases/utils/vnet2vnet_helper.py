@@ -1,6 +1,6 @@
 import snappi
-import saichallenger.common.sai_dataplane.utils.traffic_utils as tu
 from collections import namedtuple
+from address_range import AddressRange
 
 
 def configure_vnet_outbound_packet_flows(sai_dp, vip, dir_lookup, ca_smac, ca_dip, pkt_count=1, pps=50, duration=0):
@@ -22,19 +22,19 @@ def configure_vnet_outbound_packet_flows(sai_dp, vip, dir_lookup, ca_smac, ca_di
     print(f"{vip}\n{dir_lookup}\n{ca_smac}\n{ca_dip}\n")
 
     print("Adding flows {} > {}:".format(sai_dp.configuration.ports[0].name, sai_dp.configuration.ports[1].name))
-    vip_val = vip.start
-    for vip_number in range(0, vip.count):
+    vips = AddressRange(vip.start, vip.step, vip.count).to_list()
+    ca_smacs = AddressRange(ca_smac.start, ca_smac.step, ca_smac.count).to_list()
+    for vip_number, vip_val in enumerate(vips):
         dir_lookup_val = dir_lookup.start
         print(f"\tVIP {vip_val}")
 
         ca_smac_portion = ca_smac.count // dir_lookup.count
         for dir_lookup_number in range(0, dir_lookup.count):
             print(f"\t\tDIR_LOOKUP VNI {dir_lookup_val}")
-            ca_smac_val = ca_smac.start
 
             ca_smac_start_index = dir_lookup_number * ca_smac_portion
             for ca_smac_number in range(ca_smac_start_index, ca_smac_start_index + ca_smac_portion):
-                print(f"\t\t\tCA SMAC: {tu.get_next_mac(ca_smac_val, step=ca_smac.step, number=ca_smac_number)}")
+                print(f"\t\t\tCA SMAC: {ca_smacs[ca_smac_number]}")
                 print(f"\t\t\t\tCA DIP {ca_dip.start}, count: {ca_dip.count}, step: {ca_dip.step}")
                 flow = sai_dp.add_flow("flow {} > {} |vip#{}|dir_lookup#{}|ca_mac#{}|ca_dip#{}".format(
                                             sai_dp.configuration.ports[0].name, sai_dp.configuration.ports[1].name,
@@ -46,7 +46,7 @@ def configure_vnet_outbound_packet_flows(sai_dp, vip, dir_lookup, ca_smac, ca_di
                 sai_dp.add_udp_header(flow, dst_port=80, src_port=11638)
                 sai_dp.add_vxlan_header(flow, vni=dir_lookup_val)
                 sai_dp.add_ethernet_header(flow, dst_mac="02:02:02:02:02:02",
-                                           src_mac=tu.get_next_mac(ca_smac_val, step=ca_smac.step, number=ca_smac_number))
+                                           src_mac=ca_smacs[ca_smac_number])
 
                 sai_dp.add_ipv4_header(flow, dst_ip=ca_dip.start, src_ip="10.1.1.10",
                                        dst_step=ca_dip.step, dst_count=ca_dip.count,
@@ -55,8 +55,6 @@ def configure_vnet_outbound_packet_flows(sai_dp, vip, dir_lookup, ca_smac, ca_di
 
             dir_lookup_val += dir_lookup.step
 
-        vip_val = tu.get_next_ip(vip_val, vip.step)
-
     print(f">>> FLOWS: {len(sai_dp.flows)}")
     for flow in sai_dp.flows:
         print(f">>>: {flow.name}")
@@ -0,0 +1,384 @@
+"""
+Decode captured VXLAN traffic into NumPy structured arrays.
+
+The pcap (or pcapng) data is memory-mapped when read from a file, frame
+boundaries are found by walking the record headers, and the headers of all
+frames are then decoded by array operations over a fixed-size slice of every
+frame. No Python object is created per byte, so captures of millions of frames
+can be checked by vectorized assertions.
+
+Only Ethernet captures are supported. Outer and inner headers may carry one
+VLAN tag. IPv4 addresses are decoded to the uint32 fields (*_sip, *_dip), IPv6
+addresses to [high, low] uint64 word pairs (*_sip6, *_dip6), the same layout
+as AddressRange uses.
+
+Usage:
+    capture = decode_pcap("port1.pcap")
+    encapped = capture.vxlan
+    capture.assert_in_range("inner_dip", "1.128.0.1", "1.128.0.255", mask=encapped)
+    capture.assert_mapped("outer_dip", "vni", {"221.0.1.11": 1000, "221.0.2.11": 2000}, mask=encapped)
+"""
+
+import mmap
+import struct
+
+import numpy as np
+
+from address_range import AddressRange, address_kind, address_to_int, int_to_address
+
+VXLAN_PORT = 4789
+ETHERTYPE_VLAN = 0x8100
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+LINKTYPE_ETHERNET = 1
+
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+PCAPNG_SHB = b"\x0a\x0d\x0d\x0a"
+
+_HEADER_FIELDS = [
+    ("dmac", np.uint64),
+    ("smac", np.uint64),
+    ("vlan", np.uint16),
+    ("ethertype", np.uint16),
+    ("ip_version", np.uint8),
+    ("ttl", np.uint8),
+    ("proto", np.uint8),
+    ("sip", np.uint32),
+    ("dip", np.uint32),
+    ("sip6", np.uint64, (2,)),
+    ("dip6", np.uint64, (2,)),
+    ("sport", np.uint16),
+    ("dport", np.uint16),
+]
+
+FRAME_DTYPE = np.dtype(
+    [("timestamp", np.float64), ("length", np.uint32), ("caplen", np.uint32)] +
+    [("outer_" + field[0],) + field[1:] for field in _HEADER_FIELDS] +
+    [("vxlan", np.bool_), ("vni", np.uint32)] +
+    [("inner_" + field[0],) + field[1:] for field in _HEADER_FIELDS]
+)
+
+
+def _open_buffer(source):
+    """
+    Capture data as uint8 array: file path (memory-mapped), file object or bytes
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            if not f.seek(0, 2):
+                return np.zeros(0, dtype=np.uint8)
+            # The array keeps the mapping open after the file is closed
+            return np.frombuffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), dtype=np.uint8)
+    if hasattr(source, "read"):
+        source = source.read()
+    return np.frombuffer(source, dtype=np.uint8)
+
+
+def _pcap_records(data):
+    """
+    Returns (offsets, caplens, lengths, timestamps) of the frames in pcap data
+    """
+    endian, resolution = PCAP_MAGIC[bytes(data[:4])]
+    linktype = struct.unpack_from(endian + "I", data, 20)[0]
+    if linktype & 0xFFFF != LINKTYPE_ETHERNET:
+        raise ValueError("Unsupported pcap link type %d" % linktype)
+
+    record = struct.Struct(endian + "IIII")
+    offsets, caplens, lengths, seconds, fractions = [], [], [], [], []
+    position, size = 24, len(data)
+    while position + 16 <= size:
+        sec, frac, caplen, length = record.unpack_from(data, position)
+        position += 16
+        offsets.append(position)
+        caplens.append(min(caplen, size - position))
+        lengths.append(length)
+        seconds.append(sec)
+        fractions.append(frac)
+        position += caplen
+
+    timestamps = np.array(seconds, dtype=np.float64) + np.array(fractions, dtype=np.float64) * resolution
+    return offsets, caplens, lengths, timestamps
+
+
+def _pcapng_records(data):
+    """
+    Returns (offsets, caplens, lengths, timestamps) of the frames in pcapng data.
+    Enhanced and simple packet blocks are read, timestamps are in microseconds.
+    """
+    offsets, caplens, lengths, timestamps = [], [], [], []
+    endian, position, size = "<", 0, len(data)
+    while position + 12 <= size:
+        block = bytes(data[position:position + 4])
+        if block == PCAPNG_SHB:
+            endian = "<" if bytes(data[position + 8:position + 12]) == b"\x4d\x3c\x2b\x1a" else ">"
+        block_type, block_length = struct.unpack_from(endian + "II", data, position)
+        if block_length < 12:
+            raise ValueError("Corrupted pcapng block at offset %d" % position)
+
+        if block_type == 1:
+            linktype = struct.unpack_from(endian + "H", data, position + 8)[0]
+            if linktype != LINKTYPE_ETHERNET:
+                raise ValueError("Unsupported pcapng link type %d" % linktype)
+        elif block_type == 6:
+            _, ts_high, ts_low, caplen, length = struct.unpack_from(endian + "IIIII", data, position + 8)
+            offsets.append(position + 28)
+            caplens.append(min(caplen, size - position - 28))
+            lengths.append(length)
+            timestamps.append(((ts_high << 32) | ts_low) * 1e-6)
+        elif block_type == 3:
+            length = struct.unpack_from(endian + "I", data, position + 8)[0]
+            offsets.append(position + 12)
+            caplens.append(min(length, block_length - 16, size - position - 12))
+            lengths.append(length)
+            timestamps.append(np.nan)
+        position += block_length
+
+    return offsets, caplens, lengths, np.array(timestamps, dtype=np.float64)
+
+
+class _Headers:
+    """
+    Big-endian field reads at per-frame offsets of a (frames, snaplen + 1) byte array,
+    the last column is always zero so reads past the captured data return zeros
+    """
+
+    def __init__(self, head):
+        self.head = head
+        self.rows = np.arange(len(head))[:, None]
+        self.limit = head.shape[1] - 1
+
+    def read(self, base, offset, size):
+        columns = np.minimum(base[:, None] + offset + np.arange(size), self.limit)
+        value = np.zeros(len(self.head), dtype=np.uint64)
+        for byte in self.head[self.rows, columns].astype(np.uint64).T:
+            value = (value << np.uint64(8)) | byte
+        return value
+
+    def decode(self, frames, prefix, base, present):
+        """
+        Decode Ethernet, IP and L4 ports starting at `base` into `prefix`_* fields
+        of frames where `present`. Returns the L4 header offsets and the L4 protocol.
+        """
+        ethertype = self.read(base, 12, 2)
+        tagged = ethertype == ETHERTYPE_VLAN
+        vlan = np.where(tagged, self.read(base, 14, 2) & np.uint64(0xFFF), 0)
+        ethertype = np.where(tagged, self.read(base, 16, 2), ethertype)
+        l3 = base + 14 + 4 * tagged
+
+        ipv4 = present & (ethertype == ETHERTYPE_IPV4)
+        ipv6 = present & (ethertype == ETHERTYPE_IPV6)
+        ihl = (self.read(l3, 0, 1) & np.uint64(0xF)) * np.uint64(4)
+        proto = np.where(ipv4, self.read(l3, 9, 1), np.where(ipv6, self.read(l3, 6, 1), 0))
+        l4 = np.where(ipv4, l3 + ihl.astype(np.int64), l3 + 40)
+        ports = (ipv4 | ipv6) & ((proto == 6) | (proto == 17))
+
+        frames[prefix + "dmac"] = np.where(present, self.read(base, 0, 6), 0)
+        frames[prefix + "smac"] = np.where(present, self.read(base, 6, 6), 0)
+        frames[prefix + "vlan"] = np.where(present, vlan, 0)
+        frames[prefix + "ethertype"] = np.where(present, ethertype, 0)
+        frames[prefix + "ip_version"] = np.where(ipv4, 4, np.where(ipv6, 6, 0))
+        frames[prefix + "ttl"] = np.where(ipv4, self.read(l3, 8, 1), np.where(ipv6, self.read(l3, 7, 1), 0))
+        frames[prefix + "proto"] = proto
+        frames[prefix + "sip"] = np.where(ipv4, self.read(l3, 12, 4), 0)
+        frames[prefix + "dip"] = np.where(ipv4, self.read(l3, 16, 4), 0)
+        for field, offset in (("sip6", 8), ("dip6", 24)):
+            frames[prefix + field][:, 0] = np.where(ipv6, self.read(l3, offset, 8), 0)
+            frames[prefix + field][:, 1] = np.where(ipv6, self.read(l3, offset + 8, 8), 0)
+        frames[prefix + "sport"] = np.where(ports, self.read(l4, 0, 2), 0)
+        frames[prefix + "dport"] = np.where(ports, self.read(l4, 2, 2), 0)
+        return l4, proto
+
+
+def _decode_chunk(data, offsets, caplens, snaplen, vxlan_port):
+    frames = np.zeros(len(offsets), dtype=FRAME_DTYPE)
+    if not len(offsets):
+        return frames
+
+    columns = np.arange(snaplen)
+    index = np.minimum(offsets[:, None] + columns, len(data) - 1)
+    head = np.zeros((len(offsets), snaplen + 1), dtype=np.uint8)
+    head[:, :snaplen] = np.where(columns < caplens[:, None], data[index], 0)
+    headers = _Headers(head)
+
+    present = caplens >= 14
+    l4, proto = headers.decode(frames, "outer_", np.zeros(len(offsets), dtype=np.int64), present)
+    vxlan = (proto == 17) & (frames["outer_dport"] == vxlan_port) & \
+        (headers.read(l4, 8, 1) & np.uint64(0x08) != 0)
+    frames["vxlan"] = vxlan
+    frames["vni"] = np.where(vxlan, headers.read(l4, 12, 3), 0)
+    headers.decode(frames, "inner_", l4 + 16, vxlan)
+    return frames
+
+
+def decode_pcap(source, snaplen=160, vxlan_port=VXLAN_PORT, chunk=1 << 16):
+    """
+    Decode pcap or pcapng data: file path, file object or bytes, e.g. the
+    result of snappi api.get_capture(). Returns VxlanCapture.
+
+    snaplen: bytes of every frame decoded, enough for outer IPv6 + VXLAN + inner IPv6 headers
+    chunk: frames decoded at once, bounds the temporary arrays to chunk * snaplen bytes
+    """
+    data = _open_buffer(source)
+    if not len(data):
+        return VxlanCapture(np.zeros(0, dtype=FRAME_DTYPE))
+    if bytes(data[:4]) in PCAP_MAGIC:
+        offsets, caplens, lengths, timestamps = _pcap_records(data)
+    elif bytes(data[:4]) == PCAPNG_SHB:
+        offsets, caplens, lengths, timestamps = _pcapng_records(data)
+    else:
+        raise ValueError("Unknown capture format, magic %s" % bytes(data[:4]).hex())
+
+    offsets = np.array(offsets, dtype=np.int64)
+    caplens = np.array(caplens, dtype=np.int64)
+    frames = np.concatenate([np.zeros(0, dtype=FRAME_DTYPE)] + [
+        _decode_chunk(data, offsets[i:i + chunk], caplens[i:i + chunk], snaplen, vxlan_port)
+        for i in range(0, len(offsets), chunk)])
+    frames["timestamp"] = timestamps
+    frames["length"] = lengths
+    frames["caplen"] = caplens
+    return VxlanCapture(frames, data, offsets)
+
+
+def _address_values(frames, field, address):
+    """
+    Values of the address field matching the kind of `address` and the address as integer
+    """
+    kind = address_kind(address) if isinstance(address, str) else None
+    if kind == "ipv6":
+        return frames[field + "6"], address_to_int(address, kind)
+    return frames[field], address_to_int(address, kind)
+
+
+def _format(field, value):
+    if isinstance(value, np.ndarray) and value.shape == (2,):
+        return int_to_address((int(value[0]) << 64) | int(value[1]), "ipv6")
+    if field.endswith("mac"):
+        return int_to_address(int(value), "mac")
+    if field.endswith("sip") or field.endswith("dip"):
+        return int_to_address(int(value), "ipv4")
+    return str(value)
+
+
+class VxlanCapture:
+    """
+    Decoded frames of one capture
+
+    frames: structured array of FRAME_DTYPE, one row per frame
+    data, offsets: raw capture bytes and frame offsets, frame(i) returns the bytes of frame i
+    mask: every assertion takes an optional boolean mask of the frames to check
+    """
+
+    def __init__(self, frames, data=None, offsets=None):
+        self.frames = frames
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, field):
+        return self.frames[field]
+
+    def __repr__(self):
+        return "VxlanCapture(frames=%d, vxlan=%d)" % (len(self), int(self.vxlan.sum()))
+
+    @property
+    def vxlan(self):
+        return self.frames["vxlan"]
+
+    def frame(self, index):
+        start = int(self.offsets[index])
+        return self.data[start:start + int(self.frames["caplen"][index])].tobytes()
+
+    def _fail(self, message, field, failed, values):
+        first = int(np.flatnonzero(failed)[0])
+        raise AssertionError("%s: %d of %d frames, first is frame %d with %s %s" % (
+            message, int(failed.sum()), len(failed), first, field, _format(field, values[first])))
+
+    def _masked(self, mask):
+        if mask is None:
+            return np.ones(len(self), dtype=np.bool_)
+        return np.asarray(mask, dtype=np.bool_)
+
+    def assert_count(self, expected, mask=None):
+        count = int(self._masked(mask).sum())
+        assert count == expected, "Expected %d frames, captured %d" % (expected, count)
+
+    def assert_in_range(self, field, start, end=None, mask=None):
+        """
+        All values of the field are in [start, end], or in the AddressRange `start`.
+        Addresses may be given as strings or integers.
+        """
+        mask = self._masked(mask)
+        if isinstance(start, AddressRange):
+            values = self.frames[field + "6"] if start.kind == "ipv6" else self.frames[field]
+            if start.kind == "ipv6":
+                keys = (values[:, 0].astype(object) << 64) | values[:, 1].astype(object)
+                allowed = np.array(start.ints(), dtype=object)
+            else:
+                keys, allowed = values, start.values
+            failed = mask & ~np.isin(keys, allowed)
+            if failed.any():
+                self._fail("Not in %r" % start, field, failed, values)
+            return
+
+        values, low = _address_values(self.frames, field, start)
+        high = low if end is None else address_to_int(end)
+        if values.ndim == 2:
+            low_words = np.array([low >> 64, low & ((1 << 64) - 1)], dtype=np.uint64)
+            high_words = np.array([high >> 64, high & ((1 << 64) - 1)], dtype=np.uint64)
+            below = (values[:, 0] < low_words[0]) | ((values[:, 0] == low_words[0]) & (values[:, 1] < low_words[1]))
+            above = (values[:, 0] > high_words[0]) | ((values[:, 0] == high_words[0]) & (values[:, 1] > high_words[1]))
+            failed = mask & (below | above)
+        else:
+            failed = mask & ((values < low) | (values > high))
+        if failed.any():
+            self._fail("Not in [%s, %s]" % (start, end if end is not None else start), field, failed, values)
+
+    def assert_equal(self, field, expected, mask=None):
+        """
+        All values of the field equal `expected`: one value, address string or
+        per-frame array, e.g. expected values computed for every captured flow
+        """
+        mask = self._masked(mask)
+        values = self.frames[field]
+        if isinstance(expected, str):
+            values, expected = _address_values(self.frames, field, expected)
+            if values.ndim == 2:
+                expected = np.array([expected >> 64, expected & ((1 << 64) - 1)], dtype=np.uint64)
+        failed = values != expected
+        if failed.ndim == 2:
+            failed = failed.any(axis=1)
+        failed &= mask
+        if failed.any():
+            self._fail("Not equal to expected", field, failed, values)
+
+    def assert_mapped(self, key_field, value_field, mapping, mask=None):
+        """
+        value_field of every frame is the one mapped from its key_field, e.g.
+        VNI rewritten per outer DIP: assert_mapped("outer_dip", "vni", {"221.0.1.11": 1000})
+        Frames with keys missing from the mapping fail.
+        """
+        mask = self._masked(mask)
+        keys = np.array([address_to_int(key) for key in mapping], dtype=np.uint64)
+        mapped = np.array(list(mapping.values()), dtype=np.uint64)
+        order = np.argsort(keys)
+        keys, mapped = keys[order], mapped[order]
+
+        values = self.frames[key_field].astype(np.uint64)
+        position = np.minimum(np.searchsorted(keys, values), max(len(keys) - 1, 0))
+        known = (keys[position] == values) if len(keys) else np.zeros(len(values), dtype=np.bool_)
+        failed = mask & ~known
+        if failed.any():
+            self._fail("Not in mapping", key_field, failed, values)
+        failed = mask & (self.frames[value_field] != mapped[position])
+        if failed.any():
+            first = int(np.flatnonzero(failed)[0])
+            raise AssertionError("Wrong %s: %d of %d frames, first is frame %d with %s %s and %s %s, expected %s" % (
+                value_field, int(failed.sum()), len(failed), first, key_field, _format(key_field, values[first]),
+                value_field, self.frames[value_field][first], mapped[position][first]))